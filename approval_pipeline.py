@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+分阶段处理流水线
+
+每个阶段一个工作线程，阶段之间用有界队列连接。任务项是 (任务, 数据)，
+阶段处理函数返回交给下一阶段的数据；任务结束标记按顺序跟在该任务的所有数据之后
+流经每个阶段，最后一个阶段收到结束标记时任务完成。
+队列满时上游阶段阻塞等待，内存占用有上限。
+"""
+
+import queue
+import threading
+
+# 各阶段之间队列的默认容量
+STAGE_QUEUE_SIZE = 20
+
+# 任务结束标记和流水线停止标记
+JOB_END = object()
+_STOP = object()
+
+
+class PipelineJob:
+    """流水线任务：在各阶段之间共享状态，最后一个阶段完成后通知等待方"""
+
+    def __init__(self):
+        self.failed = False
+        self.result = None
+        self._done = threading.Event()
+
+    def mark_failed(self):
+        """标记任务有数据处理失败"""
+        self.failed = True
+
+    def finish(self, result=None):
+        """设置结果并唤醒等待方"""
+        self.result = result
+        self._done.set()
+
+    def is_done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        """等待任务完成，返回结果"""
+        self._done.wait(timeout)
+        return self.result
+
+
+class Pipeline:
+    def __init__(self, stages, queue_size=STAGE_QUEUE_SIZE, logger=None):
+        """stages: [(名称, 处理函数, 结束处理函数)]
+
+        处理函数接收 (任务, 数据)，返回可迭代的下游数据（可以是生成器，下游队列满时自动等待）；
+        结束处理函数接收任务，在该任务的全部数据处理完后调用，返回值同样交给下一阶段，可以为None。
+        """
+        self.stages = stages
+        self.logger = logger
+        self.queues = [queue.Queue(maxsize=queue_size) for _ in stages]
+        self.threads = [
+            threading.Thread(target=self._run_stage, args=(index,), name=f'pipeline-{name}', daemon=True)
+            for index, (name, _, _) in enumerate(stages)
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def submit(self, job, item):
+        """把数据交给第一个阶段"""
+        self.queues[0].put((job, item))
+
+    def end(self, job):
+        """提交任务结束标记，之前提交的数据处理完后任务完成"""
+        self.queues[0].put((job, JOB_END))
+
+    def stop(self, timeout=None):
+        """处理完已提交的数据后停止所有阶段"""
+        self.queues[0].put(_STOP)
+        for thread in self.threads:
+            thread.join(timeout)
+
+    def _run_stage(self, index):
+        """阶段工作线程"""
+        name, handler, end_handler = self.stages[index]
+        inbox = self.queues[index]
+        outbox = self.queues[index + 1] if index + 1 < len(self.queues) else None
+
+        while True:
+            entry = inbox.get()
+            if entry is _STOP:
+                if outbox is not None:
+                    outbox.put(_STOP)
+                return
+
+            job, item = entry
+            if item is JOB_END:
+                if end_handler:
+                    self._call(name, job, self._forward, job, outbox, end_handler, job)
+                if outbox is not None:
+                    outbox.put(entry)
+                continue
+
+            self._call(name, job, self._forward, job, outbox, handler, job, item)
+
+    def _forward(self, job, outbox, handler, *args):
+        """调用处理函数，把结果逐个交给下一阶段"""
+        for output in handler(*args) or ():
+            if outbox is not None:
+                outbox.put((job, output))
+
+    def _call(self, name, job, func, *args):
+        """调用阶段函数，异常时记录日志并标记任务失败，不影响后续数据"""
+        try:
+            func(*args)
+        except Exception as e:
+            job.mark_failed()
+            if self.logger:
+                self.logger.error(f"流水线阶段 {name} 处理失败: {e}")
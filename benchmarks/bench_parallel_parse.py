@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+并行解析正文的基准测试
+
+生成一个临时mbox文件，对不同数量的待解析邮件分别测量：
+  顺序解析（parse_workers = 1）、使用已启动进程池的并行解析、以及首次并行解析（包含启动进程池）。
+另外用单个工作进程测出并行解析本身的开销，估算有足够CPU时并行解析开始快于顺序解析的邮件数，
+CPU较少的机器上也可以得到持平点。
+PARALLEL_PARSE_MIN_EMAILS按这里测出的持平点设置。
+
+用法: python benchmarks/bench_parallel_parse.py [--workers N] [--sizes 25,50,100,...] [--repeat N]
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from email_auto_approve import EmailAutoApprover  # noqa: E402
+
+DEFAULT_SIZES = [5, 10, 20, 50, 100, 200, 400]
+
+
+def make_message(number):
+    """生成一封与ServiceNow审批邮件结构相同的邮件"""
+    return (
+        f"From - Mon Sep 01 10:00:00 2025\n"
+        f"Message-ID: <bench{number}@service-now.com>\n"
+        f"From: ServiceNow <luluprod@service-now.com>\n"
+        f"To: eli23@lululemon.com\n"
+        f"Subject: RITM{number:07d} - approval request\n"
+        f"Content-Type: text/plain; charset=utf-8\n"
+        f"\n"
+        f"Short Description: China Cloud Account and Permission Request\n"
+        f"Requested by: User {number} <user{number}@lululemon.com>\n"
+        f"Permission regards to environment: Production\n"
+        f"Required permissions:\n"
+        + "  - read access to resource group rg-china-{0}\n".format(number) * 20
+        + "Reason for application: quarterly audit of china cloud resources\n"
+        + "Approval history: pending approval from the china devops team\n" * 40
+        + "\n"
+    ).encode()
+
+
+def write_config(work_dir, workers):
+    config_file = os.path.join(work_dir, f'bench_{workers}.ini')
+    with open(config_file, 'w', encoding='utf-8') as f:
+        f.write(
+            "[DEFAULT]\n"
+            f"thunderbird_profile_path = {work_dir}\n"
+            f"parse_workers = {workers}\n"
+            "log_level = ERROR\n"
+        )
+    return config_file
+
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, default=max(os.cpu_count() or 1, 2))
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)))
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(',')]
+
+    work_dir = tempfile.mkdtemp(prefix='bench_parse_')
+    os.chdir(work_dir)
+    mbox_path = os.path.join(work_dir, 'NeedApprove')
+    with open(mbox_path, 'wb') as f:
+        for number in range(max(sizes)):
+            f.write(make_message(number))
+
+    serial = EmailAutoApprover(write_config(work_dir, 1))
+    parallel = EmailAutoApprover(write_config(work_dir, args.workers))
+    overhead = EmailAutoApprover(write_config(work_dir, 1))
+    emails = list(serial.iter_mbox_emails(mbox_path, headers_only=True))
+
+    def fresh(count):
+        return [dict(email_info) for email_info in emails[:count]]
+
+    def median_ms(func):
+        return statistics.median(timed(func) for _ in range(args.repeat)) * 1000
+
+    print(f"CPU: {os.cpu_count()}  工作进程: {args.workers}  每组重复: {args.repeat}")
+    cold = timed(lambda: parallel._load_email_bodies_parallel(fresh(sizes[0]), args.workers))
+    print(f"首次并行解析 {sizes[0]} 封（包含启动进程池）: {cold * 1000:.1f} ms")
+
+    try:
+        # 单个工作进程没有并行收益，与顺序解析的差就是并行解析本身的开销（分块、传递偏移、传回结果）；
+        # 在W个CPU上并行解析的耗时约为 顺序耗时/W + 这部分开销，CPU较少的机器上也能估算持平点
+        overhead._load_email_bodies_parallel(fresh(1), 1)
+        print(f"{'邮件数':>8} {'顺序(ms)':>10} {'单进程池(ms)':>12} {'估算并行(ms)':>12} {'实测并行(ms)':>12}")
+        estimated_break_even = measured_break_even = None
+        for count in sizes:
+            serial_ms = median_ms(lambda: serial.load_email_bodies(fresh(count)))
+            single_ms = median_ms(lambda: overhead._load_email_bodies_parallel(fresh(count), 1))
+            parallel_ms = median_ms(lambda: parallel._load_email_bodies_parallel(fresh(count), args.workers))
+            estimated_ms = serial_ms / args.workers + (single_ms - serial_ms)
+            print(f"{count:>8} {serial_ms:>10.1f} {single_ms:>12.1f} {estimated_ms:>12.1f} {parallel_ms:>12.1f}")
+            if estimated_break_even is None and estimated_ms < serial_ms:
+                estimated_break_even = count
+            if measured_break_even is None and parallel_ms < serial_ms:
+                measured_break_even = count
+    finally:
+        parallel.shutdown_parse_executor()
+        overhead.shutdown_parse_executor()
+
+    print(f"估算持平点（{args.workers} 个CPU）: {estimated_break_even or '测试范围内没有'}")
+    if (os.cpu_count() or 1) < args.workers:
+        print("CPU数少于工作进程数，实测并行结果没有参考意义")
+    else:
+        print(f"实测持平点: {measured_break_even or '测试范围内没有'}")
+
+
+if __name__ == "__main__":
+    main()
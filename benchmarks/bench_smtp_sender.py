@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+SMTP发送的基准测试
+
+在本机启动一个模拟网络往返延迟的SMTP服务器（建立连接和每次收到客户端的一批命令后都等待 --rtt 毫秒再应答），
+比较三种发送方式每封邮件的耗时：
+  每封邮件新建连接、复用连接（服务器不支持PIPELINING）、复用连接并使用PIPELINING。
+这里没有TLS和登录，真实的中继服务器上新建连接的代价更高。
+
+用法: python benchmarks/bench_smtp_sender.py [--messages N] [--rtt 毫秒]
+"""
+
+import os
+import sys
+import time
+import socket
+import argparse
+import threading
+import socketserver
+from email.mime.text import MIMEText
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from smtp_sender import SMTPSender  # noqa: E402
+
+
+class DelayedSMTPHandler(socketserver.BaseRequestHandler):
+    """逐批处理命令：一次读到的所有完整命令处理完后，等待一个往返时间再一起应答"""
+
+    def handle(self):
+        server = self.server
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        with server.lock:
+            server.connections += 1
+        # 建立TCP连接本身需要一个往返
+        time.sleep(server.rtt)
+        self.request.sendall(b'220 bench\r\n')
+        buffer = b''
+        in_data = False
+        while True:
+            data = self.request.recv(65536)
+            if not data:
+                return
+            buffer += data
+            replies = []
+            while b'\n' in buffer:
+                line, buffer = buffer.split(b'\n', 1)
+                line = line.rstrip(b'\r')
+                if in_data:
+                    if line == b'.':
+                        in_data = False
+                        replies.append('250 queued')
+                    continue
+                verb = line.split(b' ', 1)[0].split(b':', 1)[0].upper()
+                if verb == b'EHLO':
+                    replies.append('250-bench')
+                    replies.append('250 PIPELINING' if server.pipelining else '250 HELP')
+                elif verb == b'DATA':
+                    in_data = True
+                    replies.append('354 go ahead')
+                elif verb == b'QUIT':
+                    replies.append('221 bye')
+                else:
+                    replies.append('250 OK')
+            if replies:
+                time.sleep(server.rtt)
+                self.request.sendall(''.join(reply + '\r\n' for reply in replies).encode())
+                if replies[-1].startswith('221'):
+                    return
+
+
+class DelayedSMTPServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, rtt, pipelining):
+        super().__init__(('127.0.0.1', 0), DelayedSMTPHandler)
+        self.rtt = rtt
+        self.pipelining = pipelining
+        self.lock = threading.Lock()
+        self.connections = 0
+
+
+def make_reply(number):
+    msg = MIMEText("Ref:MSG85395759", 'plain', 'utf-8')
+    msg['From'] = "Edward Li <eli23@lululemon.com>"
+    msg['To'] = "luluprod@service-now.com"
+    msg['Subject'] = f"Re: RITM{number:07d} - approve"
+    return msg
+
+
+def run(messages, rtt, pipelining, reuse):
+    """返回 (每封邮件的平均耗时ms, 建立的连接数)"""
+    server = DelayedSMTPServer(rtt, pipelining)
+    thread = threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+    thread.start()
+    # idle_timeout为负数时空闲连接一律不复用，相当于每封邮件新建连接
+    sender = SMTPSender('127.0.0.1', server.server_address[1], security='none',
+                        idle_timeout=60 if reuse else -1)
+    replies = [make_reply(number) for number in range(messages)]
+    try:
+        start = time.perf_counter()
+        for reply in replies:
+            sender.send_message(reply)
+        elapsed = time.perf_counter() - start
+    finally:
+        sender.close()
+        server.shutdown()
+        server.server_close()
+    return elapsed / messages * 1000, server.connections
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--messages', type=int, default=100)
+    parser.add_argument('--rtt', type=float, default=5.0, help='模拟的往返延迟（毫秒）')
+    args = parser.parse_args()
+    rtt = args.rtt / 1000
+
+    print(f"{args.messages} 封邮件，往返延迟 {args.rtt:g} ms")
+    print(f"{'发送方式':<24} {'每封(ms)':>10} {'连接数':>8}")
+    for label, pipelining, reuse in [
+        ('每封邮件新建连接', True, False),
+        ('复用连接，无PIPELINING', False, True),
+        ('复用连接+PIPELINING', True, True),
+    ]:
+        per_message_ms, connections = run(args.messages, rtt, pipelining, reuse)
+        print(f"{label:<24} {per_message_ms:>10.1f} {connections:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -14,19 +14,358 @@ import json
 import logging
 import subprocess
 import platform
+import threading
 from pathlib import Path
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.utils import formatdate, make_msgid
+from email.parser import BytesParser, BytesHeaderParser
+from email.policy import compat32
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 import configparser
+from concurrent.futures import ProcessPoolExecutor
+from mbox_utils import (iter_mbox_messages, iter_mbox_messages_mmap, message_head, split_envelope, split_headers,
+                        mbox_fingerprint, resume_offset, compact_mbox, shift_offset, set_mozilla_status_flag,
+                        parse_mozilla_status, MOZILLA_STATUS_EXPUNGED)
+from mbox_index import MboxIndex, read_message
+from processed_store import ProcessedEmailStore
+from summary_store import (open_summary_store, migrate_legacy_summary, LEGACY_SUMMARY_FILE, REQUEST_TYPES,
+                           OTHER_REQUEST_TYPE)
+from send_pacer import SendPacer
+from reply_dispatcher import ReplyDispatcher
+from approval_pipeline import Pipeline, PipelineJob, STAGE_QUEUE_SIZE
+from field_extractor import scan_fields, first_value, extract_block, normalize_whitespace
 
-class EmailAutoApprover:
+# 待解析邮件少于这个数量时不启用多进程（分块和传回结果的开销大于收益）
+# benchmarks/bench_parallel_parse.py：进程池已启动时2个进程约5封持平，取20留出余量；
+# 进程池只在首次并行解析时启动一次（约20-60ms），之后一直复用
+PARALLEL_PARSE_MIN_EMAILS = 20
+
+# 可以并发发送的邮件发送方式（不操作图形界面）
+CONCURRENT_EMAIL_CLIENTS = ('smtp',)
+
+# 流水线扫描阶段每次交给解析阶段的邮件数：顺序解析每封约1ms，发送阶段最多等待约0.1秒拿到第一封回复，
+# 全量扫描上万封邮件时也只需要一百多次分块（配置了parse_workers时每块在已启动的进程池中并行解析）
+PIPELINE_EXTRACT_CHUNK = 100
+
+# 导出Excel时用于估算列宽的行数
+EXCEL_WIDTH_SAMPLE_ROWS = 1000
+
+# 导出CSV/Parquet时的列，以及列式格式每块的行数
+SUMMARY_EXPORT_COLUMNS = [
+    'processed_time', 'ticket_number', 'short_description', 'subject', 'from', 'message_id', 'requested_by',
+    'environment', 'required_permissions', 'reason_for_application', 'is_china_cloud'
+]
+EXPORT_CHUNK_ROWS = 10000
+
+class EmailBodyParser:
+    """解析邮件正文并提取字段，只依赖日志，不需要配置，可以在并行解析的工作进程中单独使用"""
+    
+    def __init__(self, logger=None):
+        self.logger = logger or logging.getLogger(__name__)
+        self._field_scan_cache = (None, {})
+    
+    def extract_body_fields(self, message_bytes):
+        """解析邮件正文并提取字段，返回字段字典"""
+        msg = BytesParser(policy=compat32).parsebytes(message_bytes)
+        fields = {
+            'raw_message': message_bytes.decode('utf-8', errors='ignore'),
+            'body_loaded': True
+        }
+        
+        # 提取正文内容
+        body = ""
+        if msg.is_multipart():
+            for part in msg.walk():
+                if part.get_content_type() == "text/plain":
+                    try:
+                        body = part.get_payload(decode=True).decode('utf-8', errors='ignore')
+                        break
+                    except:
+                        continue
+        else:
+            try:
+                payload = msg.get_payload()
+                if isinstance(payload, bytes):
+                    body = payload.decode('utf-8', errors='ignore')
+                else:
+                    # BytesParser以surrogateescape保存非ASCII字节，还原为UTF-8文本
+                    body = str(payload).encode('utf-8', errors='surrogateescape').decode('utf-8', errors='ignore')
+            except:
+                body = str(msg.get_payload())
+        
+        fields['body'] = body
+        
+        # 提取Short description字段
+        short_description = self.extract_short_description(body)
+        fields['short_description'] = short_description
+        
+        # 如果是China Cloud相关邮件，提取额外字段
+        if short_description and (short_description.lower().startswith('china cloud account and permission request') or 
+                                 short_description.lower().startswith('china cloud resource request')):
+            if short_description.lower().startswith('china cloud account and permission request'):
+                china_cloud_fields = self.extract_china_cloud_fields(body)
+            else:  # China Cloud Resource Request
+                china_cloud_fields = self.extract_china_cloud_resource_fields(body)
+            fields.update(china_cloud_fields)
+        
+        # 如果是CN-Server & DB Access Control邮件，提取额外字段
+        elif short_description and short_description.lower().startswith('cn-server & db access control'):
+            cn_server_fields = self.extract_cn_server_db_access_fields(body)
+            fields.update(cn_server_fields)
+        
+        return fields
+    
+    def scan_body_fields(self, body):
+        """扫描正文中的全部字段（同一封邮件的多个提取方法共享一次扫描结果）"""
+        cached_body, cached_fields = self._field_scan_cache
+        if cached_body is body:
+            return cached_fields
+        fields = scan_fields(body)
+        self._field_scan_cache = (body, fields)
+        return fields
+    
+    def extract_short_description(self, body):
+        """从邮件正文中提取Short description字段"""
+        if not body:
+            return ""
+        
+        fields = self.scan_body_fields(body)
+        
+        # 寻找Short description的模式，按优先级依次尝试
+        for name in ('short_description', 'description', 'request'):
+            match = fields.get(name)
+            if match:
+                description = match.group(1).strip()
+                # 清理多余的空白字符和特殊字符
+                description = normalize_whitespace(description)
+                # 过滤掉太短或明显错误的匹配
+                if len(description) > 3 and not description.startswith('字段'):
+                    return description
+        
+        # 如果没找到，返回空字符串
+        return ""
+    
+    def _extract_requested_by(self, fields, result):
+        """提取Requested by字段"""
+        _, result['requested_by'] = first_value(
+            fields, ('requested_by', 'requested_for', 'request_by', 'request_for')
+        )
+        if result['requested_by']:
+            self.logger.info(f"提取到Requested by: {result['requested_by']}")
+        else:
+            self.logger.warning("未找到Requested by字段")
+    
+    def _extract_environment(self, fields, result, names):
+        """按给定的模式优先级提取Environment字段"""
+        _, result['environment'] = first_value(fields, names)
+        if result['environment']:
+            self.logger.info(f"提取到Environment: {result['environment']}")
+        else:
+            self.logger.warning("未找到Environment字段")
+    
+    def _log_empty_fields(self, result, body, request_type):
+        """如果所有字段都为空，输出邮件正文片段供调试"""
+        if not any(result.values()):
+            self.logger.warning(f"所有{request_type}字段都为空，邮件正文片段:")
+            # 输出前500个字符用于调试
+            debug_text = body[:500].replace('\n', '\\n').replace('\r', '\\r')
+            self.logger.warning(f"邮件正文: {debug_text}")
+    
+    def extract_china_cloud_fields(self, body):
+        """从邮件正文中提取China Cloud相关字段"""
+        if not body:
+            return {}
+        
+        result = {
+            'environment': '',
+            'required_permissions': '',
+            'reason_for_application': '',
+            'requested_by': ''
+        }
+        
+        # 调试：记录正在处理的China Cloud邮件
+        self.logger.info("正在提取China Cloud字段...")
+        fields = self.scan_body_fields(body)
+        
+        self._extract_requested_by(fields, result)
+        
+        # 提取Environment (Permission regards to environment的值)
+        self._extract_environment(fields, result, ('permission_environment', 'environment', 'regards_environment'))
+        
+        # 提取Required permissions - 支持多行内容，使用与Resource Info相同的策略
+        required_match = fields.get('required_permissions_start')
+        if required_match:
+            required_text = extract_block(body, required_match, 'required_permissions')
+            if required_text:
+                result['required_permissions'] = required_text
+                self.logger.info(f"提取到Required Permissions (多行策略): {result['required_permissions']}")
+        else:
+            # 备用简单提取方法
+            name, result['required_permissions'] = first_value(
+                fields, ('required_permissions', 'permissions_required', 'permission', 'required_permission')
+            )
+            if name:
+                self.logger.info(f"提取到Required Permissions (单行备用): {result['required_permissions']}")
+        
+        if not result['required_permissions']:
+            self.logger.warning("未找到Required Permissions字段")
+        
+        # 提取Reason for application
+        _, result['reason_for_application'] = first_value(
+            fields, ('reason_for_application', 'application_reason', 'reason', 'justification')
+        )
+        if result['reason_for_application']:
+            self.logger.info(f"提取到Reason: {result['reason_for_application']}")
+        else:
+            self.logger.warning("未找到Reason for Application字段")
+        
+        self._log_empty_fields(result, body, 'China Cloud')
+        return result
+    
+    def extract_china_cloud_resource_fields(self, body):
+        """从邮件正文中提取China Cloud Resource Request相关字段"""
+        if not body:
+            return {}
+        
+        result = {
+            'environment': '',
+            'required_permissions': '',
+            'reason_for_application': '',
+            'requested_by': ''
+        }
+        
+        # 调试：记录正在处理的China Cloud Resource Request邮件
+        self.logger.info("正在提取China Cloud Resource Request字段...")
+        fields = self.scan_body_fields(body)
+        
+        self._extract_requested_by(fields, result)
+        
+        # 提取Environment字段
+        self._extract_environment(fields, result, ('environment', 'env'))
+        
+        # 提取Resource Info作为Required permissions - 支持多行内容，更宽泛的策略
+        resource_match = fields.get('resource_info_start')
+        if resource_match:
+            resource_text = extract_block(body, resource_match, 'resource_info')
+            if resource_text:
+                result['required_permissions'] = resource_text
+                self.logger.info(f"提取到Resource Info (多行策略): {result['required_permissions']}")
+        else:
+            # 备用简单提取方法
+            name, result['required_permissions'] = first_value(
+                fields, ('resource_info', 'resource_information', 'resource', 'resources')
+            )
+            if name:
+                self.logger.info(f"提取到Resource Info (单行备用): {result['required_permissions']}")
+        
+        if not result['required_permissions']:
+            self.logger.warning("未找到Resource Info字段")
+        
+        # 提取Reason for application
+        _, result['reason_for_application'] = first_value(
+            fields, ('reason_for_application', 'application_reason', 'reason', 'justification')
+        )
+        if result['reason_for_application']:
+            self.logger.info(f"提取到Reason: {result['reason_for_application']}")
+        else:
+            self.logger.warning("未找到Reason for Application字段")
+        
+        self._log_empty_fields(result, body, 'China Cloud Resource Request')
+        return result
+    
+    def extract_cn_server_db_access_fields(self, body):
+        """从邮件正文中提取CN-Server & DB Access Control相关字段"""
+        if not body:
+            return {}
+        
+        result = {
+            'environment': '',
+            'required_permissions': '',
+            'reason_for_application': '',
+            'requested_by': ''
+        }
+        
+        # 调试：记录正在处理的CN-Server & DB Access Control邮件
+        self.logger.info("正在提取CN-Server & DB Access Control字段...")
+        fields = self.scan_body_fields(body)
+        
+        self._extract_requested_by(fields, result)
+        
+        # 首先检查"What System do you need access to?"是否为Bastion
+        system_match = fields.get('system_access')
+        if system_match:
+            system_value = system_match.group(1).strip()
+            self.logger.info(f"找到System access值: {system_value}")
+            
+            if system_value.lower() != 'bastion':
+                self.logger.info(f"System access不是Bastion，跳过CN-Server & DB Access Control字段提取")
+                return result
+        else:
+            self.logger.warning("未找到'What System do you need access to?'字段")
+            return result
+        
+        # 提取Environment字段
+        self._extract_environment(fields, result, ('environment', 'env'))
+        
+        # 提取Authorization time作为Required permissions - 支持多行内容
+        auth_time_match = fields.get('authorization_time_start')
+        if auth_time_match:
+            auth_time_text = extract_block(body, auth_time_match, 'authorization_time')
+            if auth_time_text:
+                result['required_permissions'] = auth_time_text
+                self.logger.info(f"提取到Authorization time (多行策略): {result['required_permissions']}")
+        else:
+            # 备用简单提取方法
+            name, result['required_permissions'] = first_value(
+                fields, ('authorization_time', 'auth_time', 'authorization')
+            )
+            if name:
+                self.logger.info(f"提取到Authorization time (单行备用): {result['required_permissions']}")
+        
+        if not result['required_permissions']:
+            self.logger.warning("未找到Authorization time字段")
+        
+        # 提取Reason for application (including reason for Authorization time)
+        reason_match = fields.get('reason_including_time_start') or fields.get('reason_for_application_start')
+        if reason_match:
+            reason_text = extract_block(body, reason_match, 'reason_for_application')
+            if reason_text:
+                result['reason_for_application'] = reason_text
+                self.logger.info(f"提取到Reason (多行策略): {result['reason_for_application']}")
+        else:
+            # 备用简单提取方法
+            name, result['reason_for_application'] = first_value(
+                fields, ('reason_for_application', 'application_reason', 'reason', 'justification')
+            )
+            if name:
+                self.logger.info(f"提取到Reason (单行备用): {result['reason_for_application']}")
+        
+        if not result['reason_for_application']:
+            self.logger.warning("未找到Reason for application字段")
+        
+        self._log_empty_fields(result, body, 'CN-Server & DB Access Control')
+        return result
+
+
+class EmailAutoApprover(EmailBodyParser):
     def __init__(self, config_file='config.ini'):
         self.config_file = config_file
         self.config = self.load_config()
         self.setup_logging()
+        super().__init__(self.logger)
+        self.mbox_index = None
+        self.processed_store = None
+        self.summary_store = None
+        self.send_pacer = None
+        self.reply_dispatcher = None
+        self.email_senders = {}  # 按邮件客户端缓存的发送后端，SMTP连接在多次发送之间复用
+        self.parse_executor = None  # 并行解析正文的进程池，首次使用时创建，stop_pipeline时关闭
+        self.pipeline = None
+        self._pipeline_lock = threading.Lock()
+        self._scan_locks = {}  # 每个mbox一把锁，同一mbox的扫描依次执行
+        self._scan_locks_lock = threading.Lock()
         
     def load_config(self):
         """加载配置文件"""
@@ -38,7 +377,7 @@ class EmailAutoApprover:
             config['DEFAULT'] = {
                 'thunderbird_profile_path': self.get_default_thunderbird_path(),
                 'watch_folder': 'Archive/ServiceNow/NeedApprove',
-                'processed_emails': 'processed_emails.json',
+                'processed_emails_db': 'processed_emails.db',
                 'log_level': 'INFO',
                 'auto_approve_enabled': 'True'
             }
@@ -206,50 +545,120 @@ class EmailAutoApprover:
         )
         self.logger = logging.getLogger(__name__)
     
-    def load_processed_emails(self):
-        """加载已处理的邮件列表"""
-        processed_file = self.config.get('DEFAULT', 'processed_emails')
+    def get_processed_store(self):
+        """获取已处理邮件记录（首次使用时打开，并导入旧的processed_emails.json）"""
+        if self.processed_store is None:
+            db_file = self.config.get('DEFAULT', 'processed_emails_db', fallback='processed_emails.db')
+            bloom_file = None
+            if self.config.getboolean('DEFAULT', 'processed_bloom_filter', fallback=False):
+                bloom_file = os.path.splitext(db_file)[0] + '.bloom'
+            self.processed_store = ProcessedEmailStore(db_file, bloom_path=bloom_file)
+            legacy_file = self.config.get('DEFAULT', 'processed_emails', fallback='processed_emails.json')
+            try:
+                imported = self.processed_store.migrate_json(legacy_file)
+                if imported:
+                    self.logger.info(f"已从 {legacy_file} 导入 {imported} 条已处理邮件记录")
+            except Exception as e:
+                self.logger.error(f"导入已处理邮件列表失败: {e}")
+        return self.processed_store
+    
+    def close_processed_store(self):
+        """关闭已处理邮件记录（布隆过滤器分批写回磁盘，关闭时写回剩余的部分）"""
+        store, self.processed_store = self.processed_store, None
+        if store is not None:
+            try:
+                store.close()
+            except Exception as e:
+                self.logger.error(f"关闭已处理邮件记录失败: {e}")
+    
+    def load_mbox_checkpoints(self):
+        """加载mbox增量扫描检查点"""
+        checkpoint_file = self.config.get('DEFAULT', 'mbox_checkpoints', fallback='mbox_checkpoints.json')
         try:
-            if os.path.exists(processed_file):
-                with open(processed_file, 'r', encoding='utf-8') as f:
-                    return set(json.load(f))
+            if os.path.exists(checkpoint_file):
+                with open(checkpoint_file, 'r', encoding='utf-8') as f:
+                    return json.load(f)
         except Exception as e:
-            self.logger.error(f"加载已处理邮件列表失败: {e}")
-        return set()
+            self.logger.error(f"加载mbox扫描检查点失败: {e}")
+        return {}
     
-    def save_processed_emails(self, processed_emails):
-        """保存已处理的邮件列表"""
-        processed_file = self.config.get('DEFAULT', 'processed_emails')
+    def save_mbox_checkpoints(self, checkpoints):
+        """保存mbox增量扫描检查点"""
+        checkpoint_file = self.config.get('DEFAULT', 'mbox_checkpoints', fallback='mbox_checkpoints.json')
         try:
-            with open(processed_file, 'w', encoding='utf-8') as f:
-                json.dump(list(processed_emails), f, ensure_ascii=False, indent=2)
+            with open(checkpoint_file, 'w', encoding='utf-8') as f:
+                json.dump(checkpoints, f, ensure_ascii=False, indent=2)
         except Exception as e:
-            self.logger.error(f"保存已处理邮件列表失败: {e}")
+            self.logger.error(f"保存mbox扫描检查点失败: {e}")
     
-    def load_processing_summary(self):
-        """加载处理汇总记录"""
-        summary_file = 'processing_summary.json'
+    def get_mbox_index(self):
+        """获取mbox邮件索引（首次使用时打开）"""
+        if self.mbox_index is None:
+            index_file = self.config.get('DEFAULT', 'mbox_index', fallback='mbox_index.db')
+            self.mbox_index = MboxIndex(index_file)
+        return self.mbox_index
+    
+    def refresh_mbox_index(self, mbox_path):
+        """增量更新mbox邮件索引"""
         try:
-            if os.path.exists(summary_file):
-                with open(summary_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+            use_mmap = self.config.get('DEFAULT', 'mbox_scan_mode', fallback='stream').strip().lower() == 'mmap'
+            indexed = self.get_mbox_index().refresh(mbox_path, use_mmap=use_mmap)
+            self.logger.debug(f"mbox索引已更新，新索引 {indexed} 封邮件: {mbox_path}")
         except Exception as e:
-            self.logger.error(f"加载处理汇总记录失败: {e}")
-        return []
+            self.logger.error(f"更新mbox索引失败 {mbox_path}: {e}")
+    
+    def find_pending_ticket(self, ticket_number):
+        """通过索引查找指定单号的邮件是否仍在监控文件夹中"""
+        watch_folder = self.config.get('DEFAULT', 'watch_folder')
+        full_watch_path = self.find_thunderbird_mail_folder(watch_folder)
+        if not full_watch_path:
+            print(f"错误: 找不到Thunderbird邮件文件夹: {watch_folder}")
+            return []
+        
+        mbox_file = os.path.join(full_watch_path, watch_folder.split('/')[-1])
+        self.refresh_mbox_index(mbox_file)
+        matches = self.get_mbox_index().find_by_ticket(mbox_file, ticket_number)
+        
+        if matches:
+            print(f"📌 {ticket_number} 仍在 {watch_folder} 中:")
+            for match in matches:
+                print(f"   偏移: {match['offset']}  长度: {match['length']}  "
+                      f"X-Mozilla-Status: {match['mozilla_status']:04x}  Message-ID: {match['message_id']}")
+        else:
+            print(f"✅ {ticket_number} 不在 {watch_folder} 中")
+        return matches
+    
+    def get_summary_store(self):
+        """获取处理汇总存储（首次使用时打开，并导入旧的processing_summary.json）"""
+        if self.summary_store is None:
+            backend = self.config.get('DEFAULT', 'summary_backend', fallback='sqlite')
+            summary_file = self.config.get('DEFAULT', 'summary_file', fallback=None)
+            self.summary_store = open_summary_store(backend, summary_file)
+            try:
+                imported = migrate_legacy_summary(self.summary_store)
+                if imported:
+                    self.logger.info(f"已从 {LEGACY_SUMMARY_FILE} 导入 {imported} 条处理汇总记录")
+            except Exception as e:
+                self.logger.error(f"导入处理汇总记录失败: {e}")
+        return self.summary_store
     
-    def save_processing_summary(self, summary_data):
-        """保存处理汇总记录"""
-        summary_file = 'processing_summary.json'
+    def iter_processing_summary(self, start_date=None, end_date=None):
+        """逐条读取处理汇总记录，用于导出大量记录"""
         try:
-            with open(summary_file, 'w', encoding='utf-8') as f:
-                json.dump(summary_data, f, ensure_ascii=False, indent=2)
+            yield from self.get_summary_store().iter_query(start_date=start_date, end_date=end_date)
         except Exception as e:
-            self.logger.error(f"保存处理汇总记录失败: {e}")
+            self.logger.error(f"读取处理汇总记录失败: {e}")
+    
+    def load_processing_summary(self, start_date=None, end_date=None):
+        """加载处理汇总记录，可按处理日期范围（YYYY-MM-DD，含两端）通过索引过滤"""
+        try:
+            return self.get_summary_store().query(start_date=start_date, end_date=end_date)
+        except Exception as e:
+            self.logger.error(f"加载处理汇总记录失败: {e}")
+        return []
     
     def add_to_processing_summary(self, email_info, processed_time, ticket_number):
         """添加记录到处理汇总"""
-        summary_data = self.load_processing_summary()
-        
         # 提取单号（RITM或CHG）
         import re
         subject = email_info.get('subject', '')
@@ -281,8 +690,10 @@ class EmailAutoApprover:
         else:
             summary_record['is_china_cloud'] = False
         
-        summary_data.append(summary_record)
-        self.save_processing_summary(summary_data)
+        try:
+            self.get_summary_store().append(summary_record)
+        except Exception as e:
+            self.logger.error(f"保存处理汇总记录失败: {e}")
         
         # 打印汇总信息
         print(f"📊 处理汇总已更新:")
@@ -291,103 +702,87 @@ class EmailAutoApprover:
         print(f"   描述: {email_info.get('short_description', 'N/A')}")
     
     def export_summary_to_excel(self, summary_data, title, filename):
-        """将汇总数据导出为Excel文件"""
-        import datetime
+        """将汇总数据导出为Excel文件
         
-        if not summary_data:
-            return False
+        使用openpyxl的只写模式逐行写入，summary_data可以是记录列表，也可以是
+        每次调用都返回新迭代器的函数（例如直接读取汇总存储），内存占用不随记录数增长。
+        列宽根据表头和前EXCEL_WIDTH_SAMPLE_ROWS行估算。
+        """
+        import datetime
         
         try:
             # 尝试导入openpyxl
             try:
                 from openpyxl import Workbook
+                from openpyxl.cell import WriteOnlyCell
                 from openpyxl.styles import Font, Alignment, PatternFill
                 from openpyxl.utils import get_column_letter
             except ImportError:
                 self.logger.error("需要安装openpyxl库: pip install openpyxl")
                 return False
             
-            # 创建工作簿
-            wb = Workbook()
-            ws = wb.active
-            ws.title = "邮件处理汇总"
-            
-            # 设置标题
-            ws['A1'] = title
-            ws['A2'] = f"导出时间: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
-            
-            # 标题样式
-            title_font = Font(size=14, bold=True)
-            ws['A1'].font = title_font
-            ws['A2'].font = Font(size=10)
-            
             # 检查是否有China Cloud邮件
-            has_china_cloud = any(record.get('is_china_cloud', False) for record in summary_data)
+            has_records, has_china_cloud = check_summary_records(summary_data)
+            if not has_records:
+                return False
             
             # 设置表头
             if has_china_cloud:
                 headers = ['序号', '处理时间', '单号', 'Short Description', 'Requested by', 'Environment', 'Required Permissions', 'Reason']
-                row_start = 4
             else:
                 headers = ['序号', '处理时间', '单号', 'Short Description', 'Requested by']
-                row_start = 4
             
-            # 写入表头
+            rows = (
+                summary_row(i, record, has_china_cloud)
+                for i, record in enumerate(iter_summary_records(summary_data), 1)
+            )
+            
+            # 先读取一部分行估算列宽（只写模式必须在写入数据前设置列宽）
+            sample = []
+            for row in rows:
+                sample.append(row)
+                if len(sample) >= EXCEL_WIDTH_SAMPLE_ROWS:
+                    break
+            # 创建只写工作簿
+            wb = Workbook(write_only=True)
+            ws = wb.create_sheet("邮件处理汇总")
+            
+            # 设置列宽，限制最大宽度为50
             for col, header in enumerate(headers, 1):
-                cell = ws.cell(row=row_start, column=col, value=header)
+                max_length = max([len(str(header))] + [len(str(row[col - 1])) for row in sample if row[col - 1]])
+                ws.column_dimensions[get_column_letter(col)].width = min(max_length + 2, 50)
+            
+            # 标题和样式
+            title_cell = WriteOnlyCell(ws, value=title)
+            title_cell.font = Font(size=14, bold=True)
+            time_cell = WriteOnlyCell(ws, value=f"导出时间: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+            time_cell.font = Font(size=10)
+            ws.append([title_cell])
+            ws.append([time_cell])
+            ws.append([])
+            
+            # 写入表头
+            header_cells = []
+            for header in headers:
+                cell = WriteOnlyCell(ws, value=header)
                 cell.font = Font(bold=True)
                 cell.fill = PatternFill(start_color="CCCCCC", end_color="CCCCCC", fill_type="solid")
                 cell.alignment = Alignment(horizontal="center")
+                header_cells.append(cell)
+            ws.append(header_cells)
             
             # 写入数据
-            for i, record in enumerate(summary_data, 1):
-                row = row_start + i
-                processed_time = record.get('processed_time', 'N/A')
-                ticket_number = record.get('ticket_number', 'N/A')
-                short_description = record.get('short_description', 'N/A')
-                requested_by = record.get('requested_by', 'N/A')
-                
-                # 写入基本列
-                ws.cell(row=row, column=1, value=i)
-                ws.cell(row=row, column=2, value=processed_time)
-                ws.cell(row=row, column=3, value=ticket_number)
-                ws.cell(row=row, column=4, value=short_description)
-                ws.cell(row=row, column=5, value=requested_by)
-                
-                # 如果有China Cloud字段，写入额外列
-                if has_china_cloud:
-                    if record.get('is_china_cloud', False):
-                        environment = record.get('environment', 'N/A')
-                        required = record.get('required_permissions', 'N/A') 
-                        reason = record.get('reason_for_application', 'N/A')
-                        
-                        ws.cell(row=row, column=6, value=environment)
-                        ws.cell(row=row, column=7, value=required)
-                        ws.cell(row=row, column=8, value=reason)
-                    else:
-                        # 非China Cloud邮件
-                        ws.cell(row=row, column=6, value="-")
-                        ws.cell(row=row, column=7, value="-")
-                        ws.cell(row=row, column=8, value="-")
-            
-            # 自动调整列宽
-            for column in ws.columns:
-                max_length = 0
-                column_letter = get_column_letter(column[0].column)
-                for cell in column:
-                    if cell.value:
-                        cell_length = len(str(cell.value))
-                        if cell_length > max_length:
-                            max_length = cell_length
-                
-                # 设置列宽，限制最大宽度为50
-                adjusted_width = min(max_length + 2, 50)
-                ws.column_dimensions[column_letter].width = adjusted_width
+            total = 0
+            for batch in (sample, rows):
+                for row in batch:
+                    ws.append(row)
+                    total += 1
             
             # 添加汇总行
-            total_row = row_start + len(summary_data) + 2
-            ws.cell(row=total_row, column=1, value=f"总计处理邮件: {len(summary_data)} 封")
-            ws.cell(row=total_row, column=1).font = Font(bold=True)
+            ws.append([])
+            total_cell = WriteOnlyCell(ws, value=f"总计处理邮件: {total} 封")
+            total_cell.font = Font(bold=True)
+            ws.append([total_cell])
             
             # 保存文件
             wb.save(filename)
@@ -401,18 +796,103 @@ class EmailAutoApprover:
         """将汇总数据输出到文件"""
         if format_type.lower() == 'xlsx':
             return self.export_summary_to_excel(summary_data, title, filename)
+        elif format_type.lower() == 'csv':
+            return self.export_summary_to_csv(summary_data, filename)
+        elif format_type.lower() == 'parquet':
+            return self.export_summary_to_columnar(summary_data, filename)
         else:
             return self.export_summary_to_txt(summary_data, title, filename)
     
+    def export_summary_to_csv(self, summary_data, filename):
+        """将汇总数据逐行导出为CSV文件（UTF-8带BOM，Excel可以直接打开）"""
+        import csv
+        
+        try:
+            total = 0
+            with open(filename, 'w', encoding='utf-8-sig', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(SUMMARY_EXPORT_COLUMNS)
+                for record in iter_summary_records(summary_data):
+                    writer.writerow(summary_export_values(record))
+                    total += 1
+            if not total:
+                os.remove(filename)
+                return False
+            return True
+        except Exception as e:
+            self.logger.error(f"导出CSV文件失败: {e}")
+            return False
+    
+    def export_summary_to_columnar(self, summary_data, filename):
+        """将汇总数据按列式格式分块导出
+        
+        安装了pyarrow时导出Parquet文件；否则使用numpy导出.npz文件，
+        每EXPORT_CHUNK_ROWS行为一块，数组名为 列名_块序号。
+        """
+        import importlib.util
+
+        if importlib.util.find_spec('pyarrow'):
+            return self._export_summary_to_parquet(summary_data, filename)
+        if importlib.util.find_spec('numpy'):
+            return self._export_summary_to_npz(summary_data, filename)
+        self.logger.error("导出Parquet需要安装pyarrow库（或安装numpy导出.npz）: pip install pyarrow")
+        return False
+    
+    def _export_summary_to_parquet(self, summary_data, filename):
+        """使用pyarrow分块写入Parquet文件"""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        
+        schema = pa.schema([
+            (column, pa.bool_() if column == 'is_china_cloud' else pa.string())
+            for column in SUMMARY_EXPORT_COLUMNS
+        ])
+        try:
+            total = 0
+            with pq.ParquetWriter(filename, schema, compression='zstd') as writer:
+                for chunk in iter_summary_chunks(summary_data):
+                    writer.write_table(pa.Table.from_pydict(chunk, schema=schema))
+                    total += len(chunk['ticket_number'])
+            if not total:
+                os.remove(filename)
+                return False
+            return True
+        except Exception as e:
+            self.logger.error(f"导出Parquet文件失败: {e}")
+            return False
+    
+    def _export_summary_to_npz(self, summary_data, filename):
+        """使用numpy分块写入.npz文件（每块的每一列写成一个数组，不需要一次性加载全部记录）"""
+        import zipfile
+        import numpy as np
+        
+        try:
+            chunk_index = 0
+            with zipfile.ZipFile(filename, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+                for chunk in iter_summary_chunks(summary_data):
+                    for column in SUMMARY_EXPORT_COLUMNS:
+                        values = chunk[column]
+                        array = np.array(values, dtype=bool if column == 'is_china_cloud' else str)
+                        with zf.open(f"{column}_{chunk_index:05d}.npy", 'w', force_zip64=True) as f:
+                            np.lib.format.write_array(f, array, allow_pickle=False)
+                    chunk_index += 1
+            if not chunk_index:
+                os.remove(filename)
+                return False
+            return True
+        except Exception as e:
+            self.logger.error(f"导出npz文件失败: {e}")
+            return False
+    
     def export_summary_to_txt(self, summary_data, title, filename):
-        """将汇总数据输出到文本文件"""
+        """将汇总数据输出到文本文件（summary_data可以是记录列表或返回迭代器的函数）"""
         import datetime
         
-        if not summary_data:
-            return False
+        # 检查是否有记录以及是否有China Cloud邮件
+        has_records, has_china_cloud = check_summary_records(summary_data)
         
-        # 检查是否有China Cloud邮件
-        has_china_cloud = any(record.get('is_china_cloud', False) for record in summary_data)
+        if not has_records:
+            return False
         
         try:
             with open(filename, 'w', encoding='utf-8') as f:
@@ -420,13 +900,15 @@ class EmailAutoApprover:
                 f.write(f"{title}\n")
                 f.write(f"导出时间: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
                 
+                total = 0
                 if has_china_cloud:
                     # 使用扩展格式 - 完整显示所有信息，不截断
                     f.write("=" * 350 + "\n")
                     f.write(f"{'序号':<4} {'处理时间':<20} {'单号':<15} {'Short Description':<60} {'Requested by':<30} {'Environment':<40} {'Required Permissions':<50} {'Reason':<40}\n")
                     f.write("-" * 350 + "\n")
                     
-                    for i, record in enumerate(summary_data, 1):
+                    for i, record in enumerate(iter_summary_records(summary_data), 1):
+                        total = i
                         processed_time = record.get('processed_time', 'N/A')[:19]
                         ticket_number = record.get('ticket_number', 'N/A')
                         short_description = record.get('short_description', 'N/A')
@@ -449,7 +931,8 @@ class EmailAutoApprover:
                     f.write(f"{'序号':<4} {'处理时间':<20} {'单号':<15} {'Short Description':<70} {'Requested by':<60}\n")
                     f.write("-" * 170 + "\n")
                     
-                    for i, record in enumerate(summary_data, 1):
+                    for i, record in enumerate(iter_summary_records(summary_data), 1):
+                        total = i
                         processed_time = record.get('processed_time', 'N/A')[:19]
                         ticket_number = record.get('ticket_number', 'N/A')
                         short_description = record.get('short_description', 'N/A')
@@ -459,7 +942,7 @@ class EmailAutoApprover:
                     
                     f.write("-" * 170 + "\n")
                 
-                f.write(f"总计处理邮件: {len(summary_data)} 封\n")
+                f.write(f"总计处理邮件: {total} 封\n")
                 f.write("=" * (350 if has_china_cloud else 170) + "\n")
             
             return True
@@ -468,29 +951,28 @@ class EmailAutoApprover:
             return False
     
     def print_processing_summary(self, export_to_file=False, export_format='txt'):
-        """打印处理汇总报告"""
-        summary_data = self.load_processing_summary()
+        """打印处理汇总报告（逐条读取汇总存储，全部历史记录也不会一次性加载到内存）"""
+        summary_data = self.iter_processing_summary
         
-        if not summary_data:
+        # 检查是否有记录以及是否有China Cloud邮件
+        has_records, has_china_cloud = check_summary_records(summary_data)
+        
+        if not has_records:
             print("📊 暂无处理记录")
             return
         
         # 导出到文件（如果需要）
         if export_to_file:
             import datetime
-            if export_format.lower() == 'xlsx':
-                filename = f"processing_summary_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-            else:
-                filename = f"processing_summary_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
+            extension = export_file_extension(export_format)
+            filename = f"processing_summary_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
                 
             if self.export_summary_to_file(summary_data, "📊 邮件处理汇总报告", filename, export_format):
                 print(f"📁 汇总已导出到文件: {filename}")
             else:
                 print("❌ 导出文件失败")
         
-        # 检查是否有China Cloud邮件
-        has_china_cloud = any(record.get('is_china_cloud', False) for record in summary_data)
-        
+        total = 0
         if has_china_cloud:
             # 使用扩展格式显示China Cloud邮件
             print("\n" + "=" * 300)
@@ -499,7 +981,8 @@ class EmailAutoApprover:
             print(f"{'序号':<4} {'处理时间':<20} {'单号':<15} {'Short Description':<60} {'Requested by':<30} {'Environment':<40} {'Required Permissions':<50} {'Reason':<40}")
             print("-" * 300)
             
-            for i, record in enumerate(summary_data, 1):
+            for i, record in enumerate(summary_data(), 1):
+                total = i
                 processed_time = record.get('processed_time', 'N/A')[:19]  # 只显示到秒
                 ticket_number = record.get('ticket_number', 'N/A')
                 short_description = record.get('short_description', 'N/A')
@@ -516,7 +999,7 @@ class EmailAutoApprover:
                     print(f"{i:<4} {processed_time:<20} {ticket_number:<15} {short_description:<60} {requested_by:<30} {'-':<40} {'-':<50} {'-':<40}")
             
             print("-" * 300)
-            print(f"总计处理邮件: {len(summary_data)} 封")
+            print(f"总计处理邮件: {total} 封")
             print("=" * 300)
         else:
             # 使用标准格式
@@ -526,7 +1009,8 @@ class EmailAutoApprover:
             print(f"{'序号':<4} {'处理时间':<20} {'单号':<15} {'Short Description':<70} {'Requested by':<60}")
             print("-" * 170)
             
-            for i, record in enumerate(summary_data, 1):
+            for i, record in enumerate(summary_data(), 1):
+                total = i
                 processed_time = record.get('processed_time', 'N/A')[:19]  # 只显示到秒
                 ticket_number = record.get('ticket_number', 'N/A')
                 short_description = record.get('short_description', 'N/A')
@@ -535,24 +1019,27 @@ class EmailAutoApprover:
                 print(f"{i:<4} {processed_time:<20} {ticket_number:<15} {short_description:<70} {requested_by:<60}")
             
             print("-" * 170)
-            print(f"总计处理邮件: {len(summary_data)} 封")
+            print(f"总计处理邮件: {total} 封")
             print("=" * 170)
     
-    def print_daily_processing_summary(self, target_date=None, export_to_file=False, export_format='txt'):
-        """打印指定日期的处理汇总报告"""
+    def print_daily_processing_summary(self, target_date=None, export_to_file=False, export_format='txt', end_date=None):
+        """打印指定日期（或日期范围）的处理汇总报告
+        
+        指定end_date时打印target_date到end_date（含两端）的记录；target_date为None且
+        指定了end_date时从最早的记录开始。
+        """
         import datetime
         
-        if target_date is None:
+        if target_date is None and end_date is None:
             target_date = datetime.date.today().strftime('%Y-%m-%d')
         
-        summary_data = self.load_processing_summary()
-        
-        # 按日期过滤
-        daily_records = []
-        for record in summary_data:
-            processed_time = record.get('processed_time', '')
-            if processed_time.startswith(target_date):
-                daily_records.append(record)
+        if end_date is None or end_date == target_date:
+            daily_records = self.load_processing_summary(start_date=target_date, end_date=target_date)
+            file_label = target_date
+        else:
+            daily_records = self.load_processing_summary(start_date=target_date, end_date=end_date)
+            file_label = f"{target_date or 'start'}_{end_date}"
+            target_date = f"{target_date or '最早'} 至 {end_date}"
         
         if not daily_records:
             print(f"📊 {target_date} 暂无处理记录")
@@ -560,10 +1047,7 @@ class EmailAutoApprover:
         
         # 导出到文件（如果需要）
         if export_to_file:
-            if export_format.lower() == 'xlsx':
-                filename = f"daily_summary_{target_date}.xlsx"
-            else:
-                filename = f"daily_summary_{target_date}.txt"
+            filename = f"daily_summary_{file_label}.{export_file_extension(export_format)}"
             if self.export_summary_to_file(daily_records, f"📊 {target_date} 邮件处理汇总报告", filename, export_format):
                 print(f"📁 {target_date} 汇总已导出到文件: {filename}")
             else:
@@ -619,651 +1103,204 @@ class EmailAutoApprover:
             print(f"{target_date} 处理邮件: {len(daily_records)} 封")
             print("=" * 170)
     
+    def print_processing_stats(self, period='day', start_date=None, end_date=None):
+        """打印按天或按周的处理统计（只读取预先累加的汇总计数）"""
+        try:
+            rollups = self.get_summary_store().rollups(period, start_date=start_date, end_date=end_date)
+        except Exception as e:
+            self.logger.error(f"读取处理统计失败: {e}")
+            return
+        
+        if not rollups:
+            print("📊 暂无处理统计")
+            return
+        
+        type_names = [name for _, name in REQUEST_TYPES] + [OTHER_REQUEST_TYPE]
+        period_label = '周起始日期' if period == 'week' else '日期'
+        
+        print("\n" + "=" * 150)
+        print(f"📊 邮件处理统计（按{'周' if period == 'week' else '天'}）")
+        print("=" * 150)
+        print(f"{period_label:<12} {'总数':<8} " + ' '.join(f"{name:<32}" for name in type_names))
+        print("-" * 150)
+        
+        total = 0
+        requesters = {}
+        for start, counts in rollups:
+            count = counts.get('total', {}).get('', 0)
+            total += count
+            type_counts = counts.get('type', {})
+            print(f"{start:<12} {count:<8} " + ' '.join(f"{type_counts.get(name, 0):<32}" for name in type_names))
+            for requester, requester_count in counts.get('requester', {}).items():
+                requesters[requester] = requesters.get(requester, 0) + requester_count
+        
+        print("-" * 150)
+        print(f"总计处理邮件: {total} 封")
+        print("\n按申请人统计:")
+        for requester, count in sorted(requesters.items(), key=lambda item: (-item[1], item[0])):
+            print(f"   {requester:<40} {count}")
+        print("=" * 150)
+    
     def parse_mbox_file(self, mbox_path):
         """解析Thunderbird的mbox文件"""
-        emails = []
-        
+        emails = list(self.iter_mbox_emails(mbox_path, headers_only=True))
+        self.load_email_bodies(emails)
+        return [email_info for email_info in emails if email_info.get('body_loaded')]
+    
+    def iter_mbox_emails(self, mbox_path, start_offset=0, headers_only=False):
+        """流式解析mbox文件，逐封产出邮件信息
+        
+        headers_only为True时只解析邮件头部并记录偏移，不保留邮件内容，正文解码和字段提取推迟到load_email_body，
+        已处理或不需要批准的邮件可以跳过这部分开销。
+        配置 mbox_scan_mode = mmap 时通过内存映射扫描，不需要逐块读取文件。
+        """
+        use_mmap = self.config.get('DEFAULT', 'mbox_scan_mode', fallback='stream').strip().lower() == 'mmap'
+        scanner = iter_mbox_messages_mmap if use_mmap else iter_mbox_messages
         try:
-            with open(mbox_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
-            
-            # 按照mbox格式分割邮件 - 但跳过Mozilla头部
-            lines = content.split('\n')
-            current_email_lines = []
-            emails_raw = []
-            
-            in_mozilla_headers = True
-            found_real_headers = False
-            
-            for line in lines:
-                # 检查是否是新邮件的开始（mbox分隔符）
-                if line.startswith('From ') and not line.startswith('>>From '):
-                    # 如果有当前邮件内容并且找到了真实邮件头，保存它
-                    if current_email_lines and found_real_headers:
-                        emails_raw.append('\n'.join(current_email_lines))
-                    current_email_lines = []  # 不包含mbox分隔符行
-                    in_mozilla_headers = True
-                    found_real_headers = False
-                    continue
-                
-                # 跳过Mozilla特定的头部
-                if in_mozilla_headers and (
-                    line.startswith('X-Mozilla-Status') or 
-                    line.startswith('X-Mozilla-Keys') or
-                    line.strip() == ''
-                ):
-                    continue
-                
-                # 一旦遇到标准邮件头，就不再是Mozilla头部了
-                if in_mozilla_headers and (
-                    line.startswith('Received:') or
-                    line.startswith('From:') or
-                    line.startswith('To:') or
-                    line.startswith('Subject:') or
-                    line.startswith('Date:')
-                ):
-                    in_mozilla_headers = False
-                    found_real_headers = True
-                
-                # 添加到当前邮件内容（如果不在Mozilla头部）
-                if not in_mozilla_headers:
-                    current_email_lines.append(line)
-            
-            # 添加最后一封邮件
-            if current_email_lines and found_real_headers:
-                emails_raw.append('\n'.join(current_email_lines))
-            
-            # 解析每封邮件
-            for raw_email in emails_raw:
+            for start, end, raw in scanner(mbox_path, start_offset):
                 try:
-                    msg = email.message_from_string(raw_email)
-                    
-                    email_info = {
-                        'message_id': msg.get('Message-ID', ''),
-                        'from': msg.get('From', ''),
-                        'to': msg.get('To', ''),
-                        'subject': msg.get('Subject', ''),
-                        'date': msg.get('Date', ''),
-                        'reply_to': msg.get('Reply-To') or msg.get('From', ''),
-                        'file_path': mbox_path,
-                        'raw_message': raw_email
-                    }
-                    
-                    # 提取正文内容
-                    body = ""
-                    if msg.is_multipart():
-                        for part in msg.walk():
-                            if part.get_content_type() == "text/plain":
-                                try:
-                                    body = part.get_payload(decode=True).decode('utf-8', errors='ignore')
-                                    break
-                                except:
-                                    continue
-                    else:
-                        try:
-                            payload = msg.get_payload()
-                            if isinstance(payload, bytes):
-                                body = payload.decode('utf-8', errors='ignore')
-                            else:
-                                body = str(payload)
-                        except:
-                            body = str(msg.get_payload())
+                    # 只解析头部时不保留邮件内容，内存只取决于最大的单封邮件，需要正文时按偏移重新读取
+                    email_info = self._parse_message_headers(raw, mbox_path, start, end, keep_bytes=not headers_only)
                     
-                    email_info['body'] = body
+                    # 只产出有效的邮件（至少有主题或发件人）
+                    if not email_info or not (email_info['subject'] or email_info['from']):
+                        continue
                     
-                    # 提取Short description字段
-                    short_description = self.extract_short_description(body)
-                    email_info['short_description'] = short_description
-                    
-                    # 如果是China Cloud相关邮件，提取额外字段
-                    if short_description and (short_description.lower().startswith('china cloud account and permission request') or 
-                                             short_description.lower().startswith('china cloud resource request')):
-                        if short_description.lower().startswith('china cloud account and permission request'):
-                            china_cloud_fields = self.extract_china_cloud_fields(body)
-                        else:  # China Cloud Resource Request
-                            china_cloud_fields = self.extract_china_cloud_resource_fields(body)
-                        email_info.update(china_cloud_fields)
-                    
-                    # 如果是CN-Server & DB Access Control邮件，提取额外字段
-                    elif short_description and short_description.lower().startswith('cn-server & db access control'):
-                        cn_server_fields = self.extract_cn_server_db_access_fields(body)
-                        email_info.update(cn_server_fields)
-                    
-                    # 只添加有效的邮件（至少有主题或发件人）
-                    if email_info['subject'] or email_info['from']:
-                        emails.append(email_info)
-                        
+                    if not headers_only:
+                        self.load_email_body(email_info)
                 except Exception as e:
                     self.logger.warning(f"解析邮件失败: {e}")
                     continue
+                
+                yield email_info
                     
         except Exception as e:
             self.logger.error(f"解析mbox文件失败 {mbox_path}: {e}")
-            
-        return emails
     
-    def extract_short_description(self, body):
-        """从邮件正文中提取Short description字段"""
-        import re
-        
-        if not body:
-            return ""
+    def _parse_message_headers(self, raw, mbox_path, start, end, keep_bytes=True):
+        """只解析单封邮件的头部
         
-        # 寻找Short description的模式，更精确的匹配
-        patterns = [
-            r'Short\s+description[:\s]*([^\r\n]+)',
-            r'Short\s+Description[:\s]*([^\r\n]+)', 
-            r'(?:^|\n)\s*Description[:\s]*([^\r\n]+)',
-            r'(?:^|\n)\s*Request[:\s]*([^\r\n]+)'
-        ]
+        raw可以是bytes或memoryview；keep_bytes为False时不保留邮件内容，
+        load_email_body会按偏移从文件中重新读取。
+        """
+        envelope, message_head_bytes = split_envelope(message_head(raw))
         
-        for pattern in patterns:
-            match = re.search(pattern, body, re.IGNORECASE | re.MULTILINE)
-            if match:
-                description = match.group(1).strip()
-                # 清理多余的空白字符和特殊字符
-                description = re.sub(r'\s+', ' ', description)
-                # 过滤掉太短或明显错误的匹配
-                if len(description) > 3 and not description.startswith('字段'):
-                    return description
+        # 跳过分隔行之后的空行
+        header_bytes = message_head_bytes.lstrip(b'\r\n')
+        if not header_bytes:
+            return None
+        body_offset = len(envelope) + len(message_head_bytes) - len(header_bytes)
         
-        # 如果没找到，返回空字符串
-        return ""
-    
-    def extract_china_cloud_fields(self, body):
-        """从邮件正文中提取China Cloud相关字段"""
-        import re
+        headers = BytesHeaderParser(policy=compat32).parsebytes(split_headers(header_bytes))
         
-        if not body:
-            return {}
+        # 跳过已设置删除标志、等待Thunderbird压缩清理的邮件
+        if parse_mozilla_status(headers.get('X-Mozilla-Status')) & MOZILLA_STATUS_EXPUNGED:
+            return None
         
-        fields = {
-            'environment': '',
-            'required_permissions': '',
-            'reason_for_application': '',
-            'requested_by': ''
+        email_info = {
+            'message_id': headers.get('Message-ID', ''),
+            'from': headers.get('From', ''),
+            'to': headers.get('To', ''),
+            'subject': headers.get('Subject', ''),
+            'date': headers.get('Date', ''),
+            'reply_to': headers.get('Reply-To') or headers.get('From', ''),
+            'file_path': mbox_path,
+            'mbox_start': start,
+            'mbox_end': end,
+            'body_offset': body_offset,
+            'body_loaded': False
         }
-        
-        # 调试：记录正在处理的China Cloud邮件
-        self.logger.info("正在提取China Cloud字段...")
-        
-        # 提取Requested by字段
-        requested_by_patterns = [
-            r'Requested\s+by[:\s]*([^\r\n]+)',
-            r'Requested\s+for[:\s]*([^\r\n]+)',
-            r'Request\s+by[:\s]*([^\r\n]+)',
-            r'Request\s+for[:\s]*([^\r\n]+)'
-        ]
-        
-        for pattern in requested_by_patterns:
-            match = re.search(pattern, body, re.IGNORECASE | re.MULTILINE)
-            if match:
-                fields['requested_by'] = match.group(1).strip()
-                self.logger.info(f"提取到Requested by: {fields['requested_by']}")
-                break
-        
-        if not fields['requested_by']:
-            self.logger.warning("未找到Requested by字段")
-        
-        # 提取Environment (Permission regards to environment的值)
-        env_patterns = [
-            r'Permission\s+regards\s+to\s+environm?e?nt[:\s]*([^\r\n]+)',  # 支持 environmnt 或 environment
-            r'Environment[:\s]*([^\r\n]+)',
-            r'Regards\s+to\s+environm?e?nt[:\s]*([^\r\n]+)'  # 支持 environmnt 或 environment
-        ]
-        
-        for pattern in env_patterns:
-            match = re.search(pattern, body, re.IGNORECASE | re.MULTILINE)
-            if match:
-                fields['environment'] = match.group(1).strip()
-                self.logger.info(f"提取到Environment: {fields['environment']}")
-                break
-        
-        if not fields['environment']:
-            self.logger.warning("未找到Environment字段")
-        
-        # 提取Required permissions - 支持多行内容，使用与Resource Info相同的策略
-        required_start_pattern = r'Required\s+permissions[:\s]*'
-        required_match = re.search(required_start_pattern, body, re.IGNORECASE | re.MULTILINE)
-        
-        if required_match:
-            start_pos = required_match.end()
-            remaining_text = body[start_pos:]
-            
-            # 寻找下一个字段的开始
-            next_field_patterns = [
-                r'\n\s*Environment\s*:',
-                r'\n\s*Reason\s+for\s+application\s*:',
-                r'\n\s*Justification\s*:',
-                r'\n\s*Notes\s*:',
-                r'\n\s*Comments\s*:',
-                r'\n\s*Additional\s+information\s*:',
-                r'\n\s*Permission\s+regards\s+to\s+environment\s*:',
-                r'\n\s*[A-Za-z]+\s+[A-Za-z]+\s*:'  # 通用的字段模式
-            ]
-            
-            end_pos = len(remaining_text)
-            for pattern in next_field_patterns:
-                match = re.search(pattern, remaining_text, re.IGNORECASE | re.MULTILINE)
-                if match:
-                    end_pos = min(end_pos, match.start())
-            
-            required_text = remaining_text[:end_pos].strip()
-            
-            # 清理文本
-            lines = required_text.split('\n')
-            cleaned_lines = []
-            for line in lines:
-                line = line.strip()
-                # 过滤掉空行、分隔符行和明显的格式化字符
-                if (line and 
-                    not line.startswith('=') and 
-                    not line.startswith('-') and
-                    not re.match(r'^[\s\-=_]+$', line) and
-                    len(line.replace(' ', '').replace('\t', '')) > 0):
-                    cleaned_lines.append(line)
-            
-            if cleaned_lines:
-                required_text = ' '.join(cleaned_lines)
-                required_text = re.sub(r'\s+', ' ', required_text)  # 压缩多个空格
-                fields['required_permissions'] = required_text.strip()
-                self.logger.info(f"提取到Required Permissions (多行策略): {fields['required_permissions']}")
-        else:
-            # 备用简单提取方法
-            perm_patterns = [
-                r'Required\s+permissions[:\s]*([^\r\n]+)',
-                r'Permissions\s+required[:\s]*([^\r\n]+)',
-                r'Permission[:\s]*([^\r\n]+)',
-                r'Required\s+permission[:\s]*([^\r\n]+)'  # 单数形式
-            ]
-            
-            for pattern in perm_patterns:
-                match = re.search(pattern, body, re.IGNORECASE | re.MULTILINE)
-                if match:
-                    fields['required_permissions'] = match.group(1).strip()
-                    self.logger.info(f"提取到Required Permissions (单行备用): {fields['required_permissions']}")
-                    break
-        
-        if not fields['required_permissions']:
-            self.logger.warning("未找到Required Permissions字段")
-        
-        # 提取Reason for application
-        reason_patterns = [
-            r'Reason\s+for\s+application[:\s]*([^\r\n]+)',
-            r'Application\s+reason[:\s]*([^\r\n]+)',
-            r'Reason[:\s]*([^\r\n]+)',
-            r'Justification[:\s]*([^\r\n]+)'  # 添加另一种可能的字段名
-        ]
-        
-        for pattern in reason_patterns:
-            match = re.search(pattern, body, re.IGNORECASE | re.MULTILINE)
-            if match:
-                fields['reason_for_application'] = match.group(1).strip()
-                self.logger.info(f"提取到Reason: {fields['reason_for_application']}")
-                break
-        
-        if not fields['reason_for_application']:
-            self.logger.warning("未找到Reason for Application字段")
-        
-        # 调试：如果所有字段都为空，输出邮件正文片段供调试
-        if not any(fields.values()):
-            self.logger.warning("所有China Cloud字段都为空，邮件正文片段:")
-            # 输出前500个字符用于调试
-            debug_text = body[:500].replace('\n', '\\n').replace('\r', '\\r')
-            self.logger.warning(f"邮件正文: {debug_text}")
-        
-        return fields
+        if keep_bytes:
+            email_info['message_bytes'] = bytes(raw[body_offset:])
+        return email_info
     
-    def extract_china_cloud_resource_fields(self, body):
-        """从邮件正文中提取China Cloud Resource Request相关字段"""
-        import re
-        
-        if not body:
-            return {}
-        
-        fields = {
-            'environment': '',
-            'required_permissions': '',
-            'reason_for_application': '',
-            'requested_by': ''
-        }
-        
-        # 调试：记录正在处理的China Cloud Resource Request邮件
-        self.logger.info("正在提取China Cloud Resource Request字段...")
-        
-        # 提取Requested by字段
-        requested_by_patterns = [
-            r'Requested\s+by[:\s]*([^\r\n]+)',
-            r'Requested\s+for[:\s]*([^\r\n]+)',
-            r'Request\s+by[:\s]*([^\r\n]+)',
-            r'Request\s+for[:\s]*([^\r\n]+)'
-        ]
-        
-        for pattern in requested_by_patterns:
-            match = re.search(pattern, body, re.IGNORECASE | re.MULTILINE)
-            if match:
-                fields['requested_by'] = match.group(1).strip()
-                self.logger.info(f"提取到Requested by: {fields['requested_by']}")
-                break
-        
-        if not fields['requested_by']:
-            self.logger.warning("未找到Requested by字段")
-        
-        # 提取Environment字段
-        env_patterns = [
-            r'Environment[:\s]*([^\r\n]+)',
-            r'Env[:\s]*([^\r\n]+)',
-            r'Environment\s*[:\s]*([^\r\n]+)'
-        ]
-        
-        for pattern in env_patterns:
-            match = re.search(pattern, body, re.IGNORECASE | re.MULTILINE)
-            if match:
-                fields['environment'] = match.group(1).strip()
-                self.logger.info(f"提取到Environment: {fields['environment']}")
-                break
-        
-        if not fields['environment']:
-            self.logger.warning("未找到Environment字段")
-        
-        # 提取Resource Info作为Required permissions - 支持多行内容，更宽泛的策略
-        resource_start_pattern = r'Resource\s+Info[:\s]*'
-        resource_match = re.search(resource_start_pattern, body, re.IGNORECASE | re.MULTILINE)
-        
-        if resource_match:
-            start_pos = resource_match.end()
-            remaining_text = body[start_pos:]
-            
-            # 寻找下一个字段的开始（Environment, Reason for application等）
-            next_field_patterns = [
-                r'\n\s*Environment\s*:',
-                r'\n\s*Reason\s+for\s+application\s*:',
-                r'\n\s*Justification\s*:',
-                r'\n\s*Notes\s*:',
-                r'\n\s*Comments\s*:',
-                r'\n\s*Additional\s+information\s*:',
-                r'\n\s*[A-Za-z]+\s+[A-Za-z]+\s*:'  # 通用的字段模式
-            ]
-            
-            end_pos = len(remaining_text)
-            for pattern in next_field_patterns:
-                match = re.search(pattern, remaining_text, re.IGNORECASE | re.MULTILINE)
-                if match:
-                    end_pos = min(end_pos, match.start())
-            
-            resource_text = remaining_text[:end_pos].strip()
-            
-            # 清理文本
-            lines = resource_text.split('\n')
-            cleaned_lines = []
-            for line in lines:
-                line = line.strip()
-                # 过滤掉空行、分隔符行和明显的格式化字符
-                if (line and 
-                    not line.startswith('=') and 
-                    not line.startswith('-') and
-                    not re.match(r'^[\s\-=_]+$', line) and
-                    len(line.replace(' ', '').replace('\t', '')) > 0):
-                    cleaned_lines.append(line)
-            
-            if cleaned_lines:
-                resource_text = ' '.join(cleaned_lines)
-                resource_text = re.sub(r'\s+', ' ', resource_text)  # 压缩多个空格
-                fields['required_permissions'] = resource_text.strip()
-                self.logger.info(f"提取到Resource Info (多行策略): {fields['required_permissions']}")
-        else:
-            # 备用简单提取方法
-            resource_patterns = [
-                r'Resource\s+Info[:\s]*([^\r\n]+)',
-                r'Resource\s+Information[:\s]*([^\r\n]+)',
-                r'Resource[:\s]*([^\r\n]+)',
-                r'Resources[:\s]*([^\r\n]+)'
-            ]
-            
-            for pattern in resource_patterns:
-                match = re.search(pattern, body, re.IGNORECASE | re.MULTILINE)
-                if match:
-                    fields['required_permissions'] = match.group(1).strip()
-                    self.logger.info(f"提取到Resource Info (单行备用): {fields['required_permissions']}")
-                    break
-        
-        if not fields['required_permissions']:
-            self.logger.warning("未找到Resource Info字段")
-        
-        # 提取Reason for application
-        reason_patterns = [
-            r'Reason\s+for\s+application[:\s]*([^\r\n]+)',
-            r'Application\s+reason[:\s]*([^\r\n]+)',
-            r'Reason[:\s]*([^\r\n]+)',
-            r'Justification[:\s]*([^\r\n]+)'
-        ]
-        
-        for pattern in reason_patterns:
-            match = re.search(pattern, body, re.IGNORECASE | re.MULTILINE)
-            if match:
-                fields['reason_for_application'] = match.group(1).strip()
-                self.logger.info(f"提取到Reason: {fields['reason_for_application']}")
-                break
-        
-        if not fields['reason_for_application']:
-            self.logger.warning("未找到Reason for Application字段")
-        
-        # 调试：如果所有字段都为空，输出邮件正文片段供调试
-        if not any(fields.values()):
-            self.logger.warning("所有China Cloud Resource Request字段都为空，邮件正文片段:")
-            # 输出前500个字符用于调试
-            debug_text = body[:500].replace('\n', '\\n').replace('\r', '\\r')
-            self.logger.warning(f"邮件正文: {debug_text}")
-        
-        return fields
+    def load_email_body(self, email_info):
+        """解析邮件正文并提取Short description等字段"""
+        if email_info.get('body_loaded'):
+            return email_info
+        
+        message_bytes = email_info.pop('message_bytes', None)
+        if message_bytes is None:
+            # 只解析了头部时按偏移读取邮件内容（body_offset相对于邮件起始位置）
+            message_bytes = read_email_bytes(
+                email_info['file_path'], email_info['mbox_start'], email_info['mbox_end'], email_info['body_offset']
+            )
+        email_info.update(self.extract_body_fields(message_bytes))
+        return email_info
     
-    def extract_cn_server_db_access_fields(self, body):
-        """从邮件正文中提取CN-Server & DB Access Control相关字段"""
-        import re
-        
-        if not body:
-            return {}
-        
-        fields = {
-            'environment': '',
-            'required_permissions': '',
-            'reason_for_application': '',
-            'requested_by': ''
-        }
-        
-        # 调试：记录正在处理的CN-Server & DB Access Control邮件
-        self.logger.info("正在提取CN-Server & DB Access Control字段...")
-        
-        # 提取Requested by字段
-        requested_by_patterns = [
-            r'Requested\s+by[:\s]*([^\r\n]+)',
-            r'Requested\s+for[:\s]*([^\r\n]+)',
-            r'Request\s+by[:\s]*([^\r\n]+)',
-            r'Request\s+for[:\s]*([^\r\n]+)'
-        ]
-        
-        for pattern in requested_by_patterns:
-            match = re.search(pattern, body, re.IGNORECASE | re.MULTILINE)
-            if match:
-                fields['requested_by'] = match.group(1).strip()
-                self.logger.info(f"提取到Requested by: {fields['requested_by']}")
-                break
-        
-        if not fields['requested_by']:
-            self.logger.warning("未找到Requested by字段")
-        
-        # 首先检查"What System do you need access to?"是否为Bastion
-        system_access_pattern = r'What\s+System\s+do\s+you\s+need\s+access\s+to\?[:\s]*([^\r\n]+)'
-        system_match = re.search(system_access_pattern, body, re.IGNORECASE | re.MULTILINE)
-        
-        if system_match:
-            system_value = system_match.group(1).strip()
-            self.logger.info(f"找到System access值: {system_value}")
-            
-            if system_value.lower() != 'bastion':
-                self.logger.info(f"System access不是Bastion，跳过CN-Server & DB Access Control字段提取")
-                return fields
-        else:
-            self.logger.warning("未找到'What System do you need access to?'字段")
-            return fields
-        
-        # 提取Environment字段
-        env_patterns = [
-            r'Environment[:\s]*([^\r\n]+)',
-            r'Env[:\s]*([^\r\n]+)',
-            r'Environment\s*[:\s]*([^\r\n]+)'
+    def load_email_bodies(self, emails):
+        """批量解析邮件正文
+        
+        配置 parse_workers 大于1且待解析邮件足够多时，按文件顺序把邮件切分成连续的块，
+        交给进程池并行解码和提取字段，结果按文件顺序合并回原来的邮件信息。
+        """
+        pending = [email_info for email_info in emails if not email_info.get('body_loaded')]
+        workers = self.config.getint('DEFAULT', 'parse_workers', fallback=1)
+        if workers <= 0:
+            workers = os.cpu_count() or 1
+        
+        if workers > 1 and len(pending) >= PARALLEL_PARSE_MIN_EMAILS:
+            try:
+                self._load_email_bodies_parallel(pending, workers)
+                return emails
+            except Exception as e:
+                self.logger.warning(f"并行解析邮件失败，改为顺序解析: {e}")
+                # 进程池可能已经损坏，下次使用时重新创建
+                self.shutdown_parse_executor()
+        
+        for email_info in pending:
+            if email_info.get('body_loaded'):
+                continue
+            try:
+                self.load_email_body(email_info)
+            except Exception as e:
+                self.logger.warning(f"解析邮件失败: {e}")
+        return emails
+    
+    def _load_email_bodies_parallel(self, pending, workers):
+        """用进程池并行解析邮件正文"""
+        pending = sorted(pending, key=lambda email_info: (email_info['file_path'], email_info['mbox_start']))
+        # 每个进程分到若干块，平衡不同大小邮件带来的负载差异
+        chunk_size = max(len(pending) // (workers * 4), 1)
+        chunks = [pending[i:i + chunk_size] for i in range(0, len(pending), chunk_size)]
+        
+        self.logger.info(f"使用 {workers} 个进程并行解析 {len(pending)} 封邮件（{len(chunks)} 块）")
+        executor = self.get_parse_executor(workers)
+        futures = [
+            executor.submit(_parse_bodies_worker, [
+                (email_info['file_path'], email_info['mbox_start'], email_info['mbox_end'], email_info['body_offset'])
+                for email_info in chunk
+            ])
+            for chunk in chunks
         ]
-        
-        for pattern in env_patterns:
-            match = re.search(pattern, body, re.IGNORECASE | re.MULTILINE)
-            if match:
-                fields['environment'] = match.group(1).strip()
-                self.logger.info(f"提取到Environment: {fields['environment']}")
-                break
-        
-        if not fields['environment']:
-            self.logger.warning("未找到Environment字段")
-        
-        # 提取Authorization time作为Required permissions - 支持多行内容
-        auth_time_start_pattern = r'Authorization\s+time[:\s]*'
-        auth_time_match = re.search(auth_time_start_pattern, body, re.IGNORECASE | re.MULTILINE)
-        
-        if auth_time_match:
-            start_pos = auth_time_match.end()
-            remaining_text = body[start_pos:]
-            
-            # 寻找下一个字段的开始
-            next_field_patterns = [
-                r'\n\s*Environment\s*:',
-                r'\n\s*Reason\s+for\s+application\s*:',
-                r'\n\s*What\s+System\s*:',
-                r'\n\s*Justification\s*:',
-                r'\n\s*Notes\s*:',
-                r'\n\s*Comments\s*:',
-                r'\n\s*[A-Za-z]+\s+[A-Za-z]+\s*:'  # 通用的字段模式
-            ]
-            
-            end_pos = len(remaining_text)
-            for pattern in next_field_patterns:
-                match = re.search(pattern, remaining_text, re.IGNORECASE | re.MULTILINE)
-                if match:
-                    end_pos = min(end_pos, match.start())
-            
-            auth_time_text = remaining_text[:end_pos].strip()
-            
-            # 清理文本
-            lines = auth_time_text.split('\n')
-            cleaned_lines = []
-            for line in lines:
-                line = line.strip()
-                # 过滤掉空行、分隔符行和明显的格式化字符
-                if (line and 
-                    not line.startswith('=') and 
-                    not line.startswith('-') and
-                    not re.match(r'^[\s\-=_]+$', line) and
-                    len(line.replace(' ', '').replace('\t', '')) > 0):
-                    cleaned_lines.append(line)
-            
-            if cleaned_lines:
-                auth_time_text = ' '.join(cleaned_lines)
-                auth_time_text = re.sub(r'\s+', ' ', auth_time_text)  # 压缩多个空格
-                fields['required_permissions'] = auth_time_text.strip()
-                self.logger.info(f"提取到Authorization time (多行策略): {fields['required_permissions']}")
-        else:
-            # 备用简单提取方法
-            auth_time_patterns = [
-                r'Authorization\s+time[:\s]*([^\r\n]+)',
-                r'Auth\s+time[:\s]*([^\r\n]+)',
-                r'Authorization[:\s]*([^\r\n]+)'
-            ]
-            
-            for pattern in auth_time_patterns:
-                match = re.search(pattern, body, re.IGNORECASE | re.MULTILINE)
-                if match:
-                    fields['required_permissions'] = match.group(1).strip()
-                    self.logger.info(f"提取到Authorization time (单行备用): {fields['required_permissions']}")
-                    break
-        
-        if not fields['required_permissions']:
-            self.logger.warning("未找到Authorization time字段")
-        
-        # 提取Reason for application (including reason for Authorization time)
-        reason_start_pattern = r'Reason\s+for\s+application\s*\(including\s+reason\s+for\s+Authorization\s+time\)[:\s]*'
-        reason_match = re.search(reason_start_pattern, body, re.IGNORECASE | re.MULTILINE)
-        
-        if not reason_match:
-            # 尝试更简单的模式
-            reason_start_pattern = r'Reason\s+for\s+application[:\s]*'
-            reason_match = re.search(reason_start_pattern, body, re.IGNORECASE | re.MULTILINE)
-        
-        if reason_match:
-            start_pos = reason_match.end()
-            remaining_text = body[start_pos:]
-            
-            # 寻找下一个字段的开始或文本结尾
-            next_field_patterns = [
-                r'\n\s*Environment\s*:',
-                r'\n\s*Authorization\s+time\s*:',
-                r'\n\s*What\s+System\s*:',
-                r'\n\s*Justification\s*:',
-                r'\n\s*Notes\s*:',
-                r'\n\s*Comments\s*:',
-                r'\n\s*[A-Za-z]+\s+[A-Za-z]+\s*:'  # 通用的字段模式
-            ]
-            
-            end_pos = len(remaining_text)
-            for pattern in next_field_patterns:
-                match = re.search(pattern, remaining_text, re.IGNORECASE | re.MULTILINE)
-                if match:
-                    end_pos = min(end_pos, match.start())
-            
-            reason_text = remaining_text[:end_pos].strip()
-            
-            # 清理文本
-            lines = reason_text.split('\n')
-            cleaned_lines = []
-            for line in lines:
-                line = line.strip()
-                # 过滤掉空行、分隔符行和明显的格式化字符
-                if (line and 
-                    not line.startswith('=') and 
-                    not line.startswith('-') and
-                    not re.match(r'^[\s\-=_]+$', line) and
-                    len(line.replace(' ', '').replace('\t', '')) > 0):
-                    cleaned_lines.append(line)
-            
-            if cleaned_lines:
-                reason_text = ' '.join(cleaned_lines)
-                reason_text = re.sub(r'\s+', ' ', reason_text)  # 压缩多个空格
-                fields['reason_for_application'] = reason_text.strip()
-                self.logger.info(f"提取到Reason (多行策略): {fields['reason_for_application']}")
-        else:
-            # 备用简单提取方法
-            reason_patterns = [
-                r'Reason\s+for\s+application[:\s]*([^\r\n]+)',
-                r'Application\s+reason[:\s]*([^\r\n]+)',
-                r'Reason[:\s]*([^\r\n]+)',
-                r'Justification[:\s]*([^\r\n]+)'
-            ]
-            
-            for pattern in reason_patterns:
-                match = re.search(pattern, body, re.IGNORECASE | re.MULTILINE)
-                if match:
-                    fields['reason_for_application'] = match.group(1).strip()
-                    self.logger.info(f"提取到Reason (单行备用): {fields['reason_for_application']}")
-                    break
-        
-        if not fields['reason_for_application']:
-            self.logger.warning("未找到Reason for application字段")
-        
-        # 调试：如果所有字段都为空，输出邮件正文片段供调试
-        if not any(fields.values()):
-            self.logger.warning("所有CN-Server & DB Access Control字段都为空，邮件正文片段:")
-            # 输出前500个字符用于调试
-            debug_text = body[:500].replace('\n', '\\n').replace('\r', '\\r')
-            self.logger.warning(f"邮件正文: {debug_text}")
-        
-        return fields
+        # 按提交顺序（即文件顺序）合并结果
+        for chunk, future in zip(chunks, futures):
+            for email_info, fields in zip(chunk, future.result()):
+                email_info.pop('message_bytes', None)
+                email_info.update(fields)
+    
+    def get_parse_executor(self, workers):
+        """获取并行解析正文的进程池
+        
+        进程池在首次使用时创建，之后一直复用到stop_pipeline，避免每批邮件都承担启动进程的开销。
+        """
+        if self.parse_executor is None:
+            self.parse_executor = ProcessPoolExecutor(max_workers=workers)
+        return self.parse_executor
+    
+    def shutdown_parse_executor(self):
+        """关闭并行解析的进程池"""
+        executor, self.parse_executor = self.parse_executor, None
+        if executor:
+            executor.shutdown(wait=True)
+    
+    def get_email_key(self, email_info):
+        """获取邮件的去重标识"""
+        message_id = email_info.get('message_id', '')
+        if not message_id:
+            # 如果没有Message-ID，使用主题和发件人作为标识
+            message_id = f"{email_info.get('subject', '')}|{email_info.get('from', '')}"
+        return message_id
     
     def is_approval_needed(self, email_info):
         """判断是否需要批准"""
@@ -1359,40 +1396,59 @@ class EmailAutoApprover:
     
     def move_processed_email(self, email_info, source_mbox_path):
         """将已处理的邮件移动到目标文件夹"""
+        return self.move_processed_emails([email_info], source_mbox_path) is not None
+    
+    def move_processed_emails(self, emails, source_mbox_path):
+        """批量将已处理的邮件移动到目标文件夹
+        
+        所有邮件一次追加到目标mbox，再一次压缩从源文件删除。
+        返回从源文件删除的字节区间列表，移动失败时返回None。
+        """
         try:
             # 检查是否启用邮件移动
             if not self.config.getboolean('DEFAULT', 'move_processed_emails', fallback=False):
-                return True
-            
-            processed_destination = self.config.get('DEFAULT', 'processed_destination', fallback='')
-            if not processed_destination:
-                self.logger.warning("未配置processed_destination，跳过邮件移动")
-                return True
+                return []
             
-            # 查找目标文件夹路径
-            target_path = self.find_thunderbird_mail_folder(processed_destination)
-            if not target_path:
-                self.logger.warning(f"找不到目标文件夹: {processed_destination}，尝试创建...")
-                
-                # 尝试创建目标文件夹路径
-                if self._create_target_folder(processed_destination):
-                    target_path = self.find_thunderbird_mail_folder(processed_destination)
-                    if not target_path:
-                        self.logger.error("创建目标文件夹后仍然找不到路径")
-                        return False
-                else:
-                    return False
-            
-            # 获取目标mbox文件路径
-            folder_name = processed_destination.split('/')[-1]
-            target_mbox = os.path.join(target_path, folder_name)
+            target_mbox = self.get_processed_mbox_path()
+            if target_mbox is None:
+                return None
+            if not target_mbox or not emails:
+                return []
             
             # 移动邮件：将邮件内容追加到目标文件，然后从源文件删除
-            return self._move_email_between_mbox(email_info, source_mbox_path, target_mbox)
+            return self._move_emails_between_mbox(emails, source_mbox_path, target_mbox)
             
         except Exception as e:
             self.logger.error(f"移动邮件失败: {e}")
-            return False
+            return None
+    
+    def get_processed_mbox_path(self):
+        """获取Processed文件夹的mbox文件路径，必要时创建文件夹
+        
+        未配置processed_destination时返回空字符串，找不到也无法创建时返回None。
+        """
+        processed_destination = self.config.get('DEFAULT', 'processed_destination', fallback='')
+        if not processed_destination:
+            self.logger.warning("未配置processed_destination，跳过邮件移动")
+            return ''
+        
+        # 查找目标文件夹路径
+        target_path = self.find_thunderbird_mail_folder(processed_destination)
+        if not target_path:
+            self.logger.warning(f"找不到目标文件夹: {processed_destination}，尝试创建...")
+            
+            # 尝试创建目标文件夹路径
+            if self._create_target_folder(processed_destination):
+                target_path = self.find_thunderbird_mail_folder(processed_destination)
+                if not target_path:
+                    self.logger.error("创建目标文件夹后仍然找不到路径")
+                    return None
+            else:
+                return None
+        
+        # 获取目标mbox文件路径
+        folder_name = processed_destination.split('/')[-1]
+        return os.path.join(target_path, folder_name)
     
     def _create_target_folder(self, folder_path):
         """创建目标文件夹结构"""
@@ -1458,77 +1514,259 @@ class EmailAutoApprover:
     
     def _move_email_between_mbox(self, email_info, source_mbox, target_mbox):
         """在mbox文件之间移动单封邮件"""
+        return self._move_emails_between_mbox([email_info], source_mbox, target_mbox) is not None
+    
+    def _move_emails_between_mbox(self, emails, source_mbox, target_mbox):
+        """在mbox文件之间批量移动邮件，返回从源文件删除的字节区间，失败返回None
+        
+        邮件按源文件中的原始字节（包括分隔行和X-Mozilla头部）原样复制，
+        一次缓冲写入目标文件后再一次压缩源文件。
+        """
         try:
-            raw_message = email_info.get('raw_message', '')
-            if not raw_message:
-                self.logger.error("邮件内容为空，无法移动")
-                return False
+            moved = []
+            chunks = []
+            for email_info in emails:
+                email_range = self._locate_email_range(email_info, source_mbox)
+                if not email_range:
+                    self.logger.error(f"在源文件中找不到要移动的邮件: {email_info.get('subject', 'N/A')}")
+                    continue
+                raw_bytes = read_message(source_mbox, email_range[0], email_range[1] - email_range[0])
+                if not raw_bytes.startswith(b'From '):
+                    raw_bytes = f"From - {time.strftime('%a %b %d %H:%M:%S %Y')}\n".encode() + raw_bytes
+                if not raw_bytes.endswith(b'\n'):
+                    raw_bytes += b'\n'
+                chunks.append(raw_bytes)
+                moved.append((email_info, email_range))
+            
+            if not moved:
+                return None
             
-            # 确保目标文件存在
-            if not os.path.exists(target_mbox):
-                with open(target_mbox, 'w', encoding='utf-8') as f:
-                    f.write('')
+            # 确保目标文件存在，并且追加的第一封邮件从新行开始
+            prefix = b''
+            if os.path.exists(target_mbox) and os.path.getsize(target_mbox) > 0:
+                with open(target_mbox, 'rb') as f:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b'\n':
+                        prefix = b'\n'
             
-            # 添加到目标文件
-            with open(target_mbox, 'a', encoding='utf-8', errors='ignore') as f:
-                # 添加mbox分隔符
-                if os.path.getsize(target_mbox) > 0:
-                    f.write('\n')
-                import time
-                f.write(f"From - {time.strftime('%a %b %d %Y %H:%M:%S')}\n")
-                f.write(raw_message)
-                if not raw_message.endswith('\n'):
-                    f.write('\n')
+            # 一次写入目标文件
+            with open(target_mbox, 'ab') as f:
+                f.write(prefix + b''.join(chunks))
+                f.flush()
+                os.fsync(f.fileno())
             
-            # 从源文件删除（通过重写文件，排除当前邮件）
-            self._remove_email_from_mbox(email_info, source_mbox)
+            # 一次性从源文件删除
+            dropped_ranges = self._remove_email_ranges(source_mbox, [email_range for _, email_range in moved])
             
-            self.logger.info(f"✅ 邮件已移动到Processed: {email_info.get('subject', 'N/A')}")
-            return True
+            for email_info, _ in moved:
+                self.logger.info(f"✅ 邮件已移动到Processed: {email_info.get('subject', 'N/A')}")
+            self.logger.info(f"📁 {len(moved)} 封邮件已移动到Processed文件夹")
+            return dropped_ranges
             
         except Exception as e:
             self.logger.error(f"移动邮件内容失败: {e}")
-            return False
+            return None
     
     def _remove_email_from_mbox(self, email_to_remove, mbox_path):
         """从mbox文件中删除指定邮件"""
+        return bool(self._remove_emails_from_mbox([email_to_remove], mbox_path))
+    
+    def _remove_emails_from_mbox(self, emails_to_remove, mbox_path):
+        """一次压缩从mbox文件中删除多封邮件，返回实际删除的字节区间"""
         try:
-            # 重新解析mbox文件，排除要删除的邮件
-            all_emails = self.parse_mbox_file(mbox_path)
-            
-            # 过滤掉要删除的邮件
-            remaining_emails = []
-            target_message_id = email_to_remove.get('message_id', '')
-            target_subject = email_to_remove.get('subject', '')
-            target_from = email_to_remove.get('from', '')
-            
-            for email in all_emails:
-                # 使用多个字段进行匹配以确保准确性
-                if (email.get('message_id', '') == target_message_id and target_message_id) or \
-                   (email.get('subject', '') == target_subject and email.get('from', '') == target_from):
-                    continue  # 跳过要删除的邮件
-                remaining_emails.append(email)
-            
-            # 重写mbox文件
-            with open(mbox_path, 'w', encoding='utf-8', errors='ignore') as f:
-                for i, email in enumerate(remaining_emails):
-                    if i > 0:
-                        f.write('\n')
-                    import time
-                    f.write(f"From - {time.strftime('%a %b %d %Y %H:%M:%S')}\n")
-                    f.write(email.get('raw_message', ''))
-                    if not email.get('raw_message', '').endswith('\n'):
-                        f.write('\n')
-            
-            self.logger.info(f"从源文件删除邮件: {target_subject}")
-            return True
+            drop_ranges = []
+            for email_info in emails_to_remove:
+                email_range = self._locate_email_range(email_info, mbox_path)
+                if email_range:
+                    drop_ranges.append(email_range)
+                else:
+                    self.logger.warning(f"在源文件中找不到要删除的邮件: {email_info.get('subject', 'N/A')}")
+            
+            return self._remove_email_ranges(mbox_path, drop_ranges)
             
         except Exception as e:
             self.logger.error(f"从mbox删除邮件失败: {e}")
+            return []
+    
+    def _remove_email_ranges(self, mbox_path, ranges):
+        """按配置的删除方式删除mbox中的邮件区间，返回被压缩掉（文件中实际移除）的区间
+        
+        remove_mode = flag 时原地设置X-Mozilla-Status删除标志，文件长度不变，
+        由Thunderbird在压缩文件夹时清理；没有该头部的邮件仍然通过压缩删除。
+        """
+        if not ranges:
+            return []
+        
+        remove_mode = self.config.get('DEFAULT', 'remove_mode', fallback='compact').strip().lower()
+        if remove_mode == 'flag':
+            flagged = set(set_mozilla_status_flag(mbox_path, ranges))
+            if flagged:
+                self.logger.info(f"已为 {len(flagged)} 封邮件设置删除标志")
+                self._mark_index_flagged(mbox_path, flagged)
+            ranges = [email_range for email_range in ranges if tuple(email_range) not in flagged]
+            if not ranges:
+                return []
+        
+        removed = compact_mbox(mbox_path, ranges)
+        self.logger.info(f"从源文件删除 {len(ranges)} 封邮件，共 {removed} 字节")
+        return ranges
+    
+    def _mark_index_flagged(self, mbox_path, flagged_ranges):
+        """设置删除标志后同步更新mbox索引，更新失败时删除该mbox的索引，下次刷新时重建"""
+        try:
+            self.get_mbox_index().set_status_flag(mbox_path, [start for start, _ in flagged_ranges])
+        except Exception as e:
+            self.logger.error(f"更新mbox索引中的删除标志失败 {mbox_path}: {e}")
+            try:
+                self.get_mbox_index().drop(mbox_path)
+            except Exception as e2:
+                self.logger.error(f"删除mbox索引失败 {mbox_path}: {e2}")
+    
+    def _locate_email_range(self, email_info, mbox_path):
+        """确定邮件在mbox中的字节区间
+        
+        优先使用解析时记录的偏移，内容不匹配（文件已被其他程序修改）时通过索引重新定位。
+        """
+        start = email_info.get('mbox_start')
+        end = email_info.get('mbox_end')
+        same_file = os.path.abspath(email_info.get('file_path', '')) == os.path.abspath(mbox_path)
+        if same_file and start is not None and self._range_has_email(mbox_path, start, end, email_info):
+            return (start, end)
+        
+        message_id = email_info.get('message_id', '')
+        if not message_id:
+            return None
+        self.refresh_mbox_index(mbox_path)
+        for match in self.get_mbox_index().find_by_message_id(mbox_path, message_id):
+            return (match['offset'], match['offset'] + match['length'])
+        return None
+    
+    def _range_has_email(self, mbox_path, start, end, email_info):
+        """检查字节区间中是否仍然是指定的邮件"""
+        try:
+            _, message_bytes = split_envelope(read_message(mbox_path, start, end - start))
+            headers = BytesHeaderParser(policy=compat32).parsebytes(split_headers(message_bytes.lstrip(b'\r\n')))
+        except Exception:
             return False
+        return (headers.get('Message-ID', '') == email_info.get('message_id', '') and
+                headers.get('Subject', '') == email_info.get('subject', ''))
+    
+    def get_email_sender(self, email_client):
+        """获取邮件客户端对应的发送后端（每种只创建一次）
+        
+        发送后端都提供 send_reply(reply_msg, to_addr, subject, body_text, auto_send)。
+        """
+        email_client = email_client.lower()
+        sender = self.email_senders.get(email_client)
+        if sender is None:
+            if email_client == 'outlook':
+                # 使用Outlook PWA发送
+                from outlook_sender import OutlookPWASender
+                browser = self.config.get('DEFAULT', 'outlook_browser', fallback='Safari')
+                sender = OutlookPWASender(browser=browser)
+            elif email_client == 'smtp':
+                # 直接通过SMTP中继发送，连接保持在连接池中
+                from smtp_sender import SMTPSender
+                sender = SMTPSender(
+                    self.config.get('SMTP', 'host', fallback='localhost'),
+                    self.config.getint('SMTP', 'port', fallback=25),
+                    username=self.config.get('SMTP', 'username', fallback='') or None,
+                    password=self.config.get('SMTP', 'password', fallback='') or None,
+                    security=self.config.get('SMTP', 'security', fallback='none'),
+                    # 并发发送时每个发送线程都需要一个连接
+                    pool_size=max(self.config.getint('SMTP', 'pool_size', fallback=2),
+                                  self.config.getint('DEFAULT', 'send_concurrency', fallback=1)),
+                    timeout=self.config.getfloat('SMTP', 'timeout', fallback=30),
+                    idle_timeout=self.config.getfloat('SMTP', 'idle_timeout', fallback=60),
+                    logger=self.logger
+                )
+            elif email_client == 'thunderbird_compose':
+                # 用thunderbird -compose打开填好内容的撰写窗口，只自动化发送动作
+                from thunderbird_compose_sender import ThunderbirdComposeSender
+                sender = ThunderbirdComposeSender(
+                    self.config.get('DEFAULT', 'thunderbird_command', fallback='') or None
+                )
+            else:
+                # 使用Thunderbird发送 (默认)
+                from thunderbird_sender import ThunderbirdSender
+                sender = ThunderbirdSender()
+            self.email_senders[email_client] = sender
+        return sender
     
-    def send_reply_via_email_client(self, reply_msg, original_email):
-        """通过配置的邮件客户端发送回复邮件"""
+    def close_email_senders(self):
+        """关闭发送后端保持的连接"""
+        for sender in self.email_senders.values():
+            if hasattr(sender, 'close'):
+                try:
+                    sender.close()
+                except Exception as e:
+                    self.logger.error(f"关闭邮件发送连接失败: {e}")
+        self.email_senders = {}
+    
+    def get_reply_body_text(self, reply_msg):
+        """提取回复邮件的纯文本内容"""
+        body_text = ""
+        if reply_msg.is_multipart():
+            for part in reply_msg.walk():
+                if part.get_content_type() == "text/plain":
+                    try:
+                        payload = part.get_payload(decode=True)
+                        if payload:
+                            body_text = payload.decode('utf-8', errors='ignore')
+                            break
+                    except:
+                        continue
+        
+        if not body_text:
+            # 备用：从配置生成简单正文
+            approval_msg = self.config.get('EMAIL', 'approval_message')
+            body_text = approval_msg
+        return body_text
+    
+    def get_send_batch_size(self):
+        """Thunderbird一次AppleScript发送的邮件数，其他发送方式总是1"""
+        email_client = self.config.get('DEFAULT', 'email_client', fallback='thunderbird').lower()
+        if email_client != 'thunderbird':
+            return 1
+        return max(self.config.getint('DEFAULT', 'send_batch_size', fallback=1), 1)
+    
+    def send_replies_batch(self, items):
+        """通过Thunderbird在一次AppleScript中发送多封回复，返回每封是否发送成功
+        
+        items: [(原邮件信息, 回复邮件)]
+        """
+        send_mode = self.config.get('DEFAULT', 'send_mode', fallback='auto')
+        auto_send = (send_mode.lower() == 'auto')
+        replies = [
+            (reply_msg['To'], reply_msg['Subject'], self.get_reply_body_text(reply_msg))
+            for _, reply_msg in items
+        ]
+        self.logger.info(f"批量发送 {len(replies)} 封回复邮件（单次AppleScript）")
+        
+        sender = self.get_email_sender('thunderbird')
+        try:
+            sent_count = sender.send_emails_batch(
+                replies, auto_send=auto_send,
+                compose_delay=self.config.getfloat('DEFAULT', 'batch_compose_delay', fallback=2)
+            )
+        except NotImplementedError:
+            # 不支持AppleScript的系统逐封处理（保存草稿文件）
+            return [self.send_reply_via_email_client(reply_msg, email_info) for email_info, reply_msg in items]
+        except Exception as e:
+            self.logger.error(f"批量发送回复邮件失败: {e}")
+            sent_count = 0
+        
+        if sent_count < len(replies):
+            self.logger.warning(f"⚠️ 批量发送只完成 {sent_count}/{len(replies)} 封")
+        else:
+            self.logger.info(f"✅ 批量发送完成 {sent_count} 封")
+        return [index < sent_count for index in range(len(replies))]
+    
+    def send_reply_via_email_client(self, reply_msg, original_email, save_draft=True):
+        """通过配置的邮件客户端发送回复邮件
+        
+        save_draft为True时发送出错会保存草稿文件并视为成功；为False时只有确认发送才返回True。
+        """
         try:
             # 获取邮件客户端配置
             email_client = self.config.get('DEFAULT', 'email_client', fallback='thunderbird')
@@ -1536,24 +1774,7 @@ class EmailAutoApprover:
             # 提取邮件信息
             to_addr = reply_msg['To']
             subject = reply_msg['Subject']
-            
-            # 提取纯文本内容
-            body_text = ""
-            if reply_msg.is_multipart():
-                for part in reply_msg.walk():
-                    if part.get_content_type() == "text/plain":
-                        try:
-                            payload = part.get_payload(decode=True)
-                            if payload:
-                                body_text = payload.decode('utf-8', errors='ignore')
-                                break
-                        except:
-                            continue
-            
-            if not body_text:
-                # 备用：从配置生成简单正文
-                approval_msg = self.config.get('EMAIL', 'approval_message')
-                body_text = approval_msg
+            body_text = self.get_reply_body_text(reply_msg)
             
             # 检查发送模式
             send_mode = self.config.get('DEFAULT', 'send_mode', fallback='auto')
@@ -1565,19 +1786,8 @@ class EmailAutoApprover:
             self.logger.info(f"发送模式: {'自动发送' if auto_send else '只准备，需手动发送'}")
             
             # 根据配置选择邮件客户端
-            if email_client.lower() == 'outlook':
-                # 使用Outlook PWA发送
-                from outlook_sender import OutlookPWASender
-                browser = self.config.get('DEFAULT', 'outlook_browser', fallback='Safari')
-                sender = OutlookPWASender(browser=browser)
-                success = sender.send_email(to_addr, subject, body_text, auto_send=auto_send)
-            else:
-                # 使用Thunderbird发送 (默认)
-                from thunderbird_sender import ThunderbirdSender
-                sender = ThunderbirdSender()
-                success = sender.send_email_via_applescript_with_confirmation(
-                    to_addr, subject, body_text, auto_send=auto_send
-                )
+            sender = self.get_email_sender(email_client)
+            success = sender.send_reply(reply_msg, to_addr, subject, body_text, auto_send=auto_send)
             
             if success:
                 if auto_send:
@@ -1591,6 +1801,8 @@ class EmailAutoApprover:
                 
         except Exception as e:
             self.logger.error(f"发送回复邮件失败: {e}")
+            if not save_draft:
+                return False
             
             # 备用方案：保存为草稿文件
             try:
@@ -1604,134 +1816,350 @@ class EmailAutoApprover:
                 self.logger.error(f"保存草稿文件也失败: {e2}")
                 return False
     
-    def process_mbox_file(self, mbox_path, show_daily_summary=False):
-        """处理mbox邮件文件"""
-        try:
-            self.logger.info(f"处理mbox文件: {mbox_path}")
-            
-            # 解析mbox文件中的所有邮件
-            emails = self.parse_mbox_file(mbox_path)
-            
-            if not emails:
-                self.logger.info("mbox文件中没有找到邮件")
-                return {"processed_count": 0, "processed_emails": []}
-            
-            processed_emails = self.load_processed_emails()
-            processed_count = 0
-            current_batch_processed = []  # 记录本次处理的邮件
-            
-            for email_info in emails:
-                # 检查是否需要批准
-                if not self.is_approval_needed(email_info):
-                    continue
-                
-                # 检查是否已经处理过
-                message_id = email_info.get('message_id', '')
-                if not message_id:
-                    # 如果没有Message-ID，使用主题和发件人作为标识
-                    message_id = f"{email_info.get('subject', '')}|{email_info.get('from', '')}"
-                
-                if message_id in processed_emails:
-                    continue
-                
-                # 检查是否启用自动批准
-                if not self.config.getboolean('DEFAULT', 'auto_approve_enabled', fallback=True):
-                    self.logger.info("自动批准功能已禁用")
-                    continue
-                
-                # 如果不是第一封邮件，等待足够时间确保前一封邮件处理完成
-                if processed_count > 0:
-                    wait_time = 15  # 等待15秒确保前一封邮件完全处理完成
-                    self.logger.info(f"等待 {wait_time} 秒，确保前一封邮件处理完成...")
-                    import time
-                    time.sleep(wait_time)
-                
-                self.logger.info(f"处理需要批准的邮件: {email_info['subject']}")
-                self.logger.info(f"发件人: {email_info['from']}")
-                
-                # 记录Short description
-                short_description = email_info.get('short_description', '')
-                if short_description:
-                    self.logger.info(f"Short description: {short_description}")
-                    print(f"📋 Short description: {short_description}")
-                else:
-                    self.logger.warning("未找到Short description字段")
-                    print("⚠️ 未找到Short description字段")
-                
-                # 创建回复邮件
-                reply_msg = self.create_approval_reply(email_info)
-                if not reply_msg:
-                    continue
-                
-                # 发送回复邮件
-                if self.send_reply_via_email_client(reply_msg, email_info):
-                    # 记录已处理的邮件
-                    processed_emails.add(message_id)
-                    processed_count += 1
-                    self.logger.info(f"成功处理邮件 {processed_count}: {email_info['subject']}")
-                    
-                    # 添加到处理汇总
-                    import time
-                    processed_time = time.strftime('%Y-%m-%d %H:%M:%S')
-                    import re
-                    subject = email_info.get('subject', '')
-                    ticket_match = re.search(r'(RITM\d+|CHG\d+)', subject, re.IGNORECASE)
-                    ticket_number = ticket_match.group(1) if ticket_match else None
-                    self.add_to_processing_summary(email_info, processed_time, ticket_number)
-                    
-                    # 记录本次处理的邮件信息
-                    batch_record = {
-                        'ticket_number': ticket_number or 'N/A',
-                        'short_description': email_info.get('short_description', 'N/A'),
-                        'processed_time': processed_time,
-                        'subject': email_info.get('subject', 'N/A'),
-                        'requested_by': email_info.get('requested_by', 'N/A')
-                    }
-                    
-                    # 如果是China Cloud或CN-Server & DB Access Control邮件，添加额外字段
-                    short_desc_lower = email_info.get('short_description', '').lower()
-                    if (short_desc_lower.startswith('china cloud account and permission request') or 
-                        short_desc_lower.startswith('china cloud resource request') or
-                        short_desc_lower.startswith('cn-server & db access control')):
-                        batch_record.update({
-                            'environment': email_info.get('environment', 'N/A'),
-                            'required_permissions': email_info.get('required_permissions', 'N/A'),
-                            'reason_for_application': email_info.get('reason_for_application', 'N/A'),
-                            'is_china_cloud': True
-                        })
-                    else:
-                        batch_record['is_china_cloud'] = False
-                    
-                    current_batch_processed.append(batch_record)
-                    
-                    # 立即保存已处理的邮件记录，防止意外中断时丢失进度
-                    self.save_processed_emails(processed_emails)
-                    
-                    # 移动已处理的邮件到Processed文件夹
-                    move_success = self.move_processed_email(email_info, mbox_path)
-                    if move_success:
-                        self.logger.info(f"📁 邮件已移动到Processed文件夹")
-                    else:
-                        self.logger.warning(f"⚠️ 邮件处理成功，但移动到Processed文件夹失败")
-                else:
-                    self.logger.error(f"发送回复失败: {email_info['subject']}")
-                    # 发送失败时也等待一下，避免快速重试造成更多问题
-                    import time
-                    time.sleep(5)
+    def get_send_pacer(self):
+        """获取发送节奏控制（首次使用时查找发件箱和已发送文件夹，用于检测发送完成）"""
+        if self.send_pacer is None:
+            folder_paths = []
+            for option, default in (('outbox_folder', 'Mail/Local Folders/Unsent Messages'),
+                                    ('sent_folder', 'Mail/Local Folders/Sent')):
+                folder = self.config.get('DEFAULT', option, fallback=default)
+                folder_dir = self.find_thunderbird_mail_folder(folder) if folder else None
+                folder_paths.append(os.path.join(folder_dir, folder.split('/')[-1]) if folder_dir else None)
+            self.send_pacer = SendPacer(
+                min_interval=self.config.getfloat('DEFAULT', 'send_interval_min', fallback=2),
+                max_interval=self.config.getfloat('DEFAULT', 'send_interval_max', fallback=15),
+                backoff_factor=self.config.getfloat('DEFAULT', 'send_backoff_factor', fallback=2),
+                outbox_path=folder_paths[0],
+                sent_path=folder_paths[1],
+                logger=self.logger
+            )
+        return self.send_pacer
+    
+    def get_pipeline(self):
+        """获取批准处理流水线（首次使用时启动扫描、解析、发送、归档四个阶段的线程）"""
+        with self._pipeline_lock:
+            if self.pipeline is None:
+                queue_size = max(self.config.getint('DEFAULT', 'pipeline_queue_size', fallback=STAGE_QUEUE_SIZE), 1)
+                self.pipeline = Pipeline([
+                    ('scanner', self._scan_stage, None),
+                    ('extractor', self._extract_stage, None),
+                    ('sender', self._send_stage, self._finish_sends),
+                    ('archiver', self._archive_stage, self._finish_scan_job),
+                ], queue_size=queue_size, logger=self.logger)
+            return self.pipeline
+    
+    def stop_pipeline(self):
+        """处理完已提交的邮件后停止流水线线程、并发发送线程和并行解析的进程池"""
+        with self._pipeline_lock:
+            pipeline, self.pipeline = self.pipeline, None
+        if pipeline:
+            pipeline.stop()
+        if self.reply_dispatcher:
+            self.reply_dispatcher.close()
+            self.reply_dispatcher = None
+        self.shutdown_parse_executor()
+    
+    def _send_reply_confirmed(self, reply_msg, email_info):
+        """并发发送使用：发送出错时不保存草稿，只有确认发送的邮件才记录为已处理"""
+        return self.send_reply_via_email_client(reply_msg, email_info, save_draft=False)
+    
+    def get_reply_dispatcher(self):
+        """获取并发发送器，发送方式不支持并发或send_concurrency为1时返回None（逐封发送）"""
+        email_client = self.config.get('DEFAULT', 'email_client', fallback='thunderbird').lower()
+        concurrency = self.config.getint('DEFAULT', 'send_concurrency', fallback=1)
+        if email_client not in CONCURRENT_EMAIL_CLIENTS or concurrency <= 1:
+            return None
+        if self.reply_dispatcher is None:
+            # 先创建发送后端，避免多个发送线程同时创建
+            self.get_email_sender(email_client)
+            self.reply_dispatcher = ReplyDispatcher(
+                self._send_reply_confirmed,
+                concurrency=concurrency,
+                recipient_interval=self.config.getfloat('DEFAULT', 'recipient_send_interval', fallback=0),
+                logger=self.logger
+            )
+        return self.reply_dispatcher
+    
+    def process_mbox_file(self, mbox_path, show_daily_summary=False, incremental=False):
+        """处理mbox邮件文件
+        
+        incremental为True时从上次的检查点开始只解析新追加的邮件，
+        检查点指纹不匹配（文件被压缩或截断）时自动退回全量扫描。
+        
+        邮件依次经过流水线的扫描、解析、发送、归档阶段，解析下一批邮件与发送当前邮件同时进行；
+        本方法等待这次扫描的全部邮件处理完后返回。同一mbox的多次调用依次执行。
+        """
+        with self._scan_locks_lock:
+            scan_lock = self._scan_locks.setdefault(os.path.abspath(mbox_path), threading.Lock())
+        
+        with scan_lock:
+            job = MboxScanJob(mbox_path, incremental)
+            pipeline = self.get_pipeline()
+            pipeline.submit(job, mbox_path)
+            pipeline.end(job)
+            return job.wait()
+    
+    def _scan_stage(self, job, mbox_path):
+        """扫描阶段：只解析邮件头部，筛选需要批准且未处理过的邮件，分批交给解析阶段"""
+        self.logger.info(f"处理mbox文件: {mbox_path}")
+        
+        checkpoints = self.load_mbox_checkpoints()
+        start_offset = 0
+        if job.incremental:
+            start_offset = resume_offset(mbox_path, checkpoints.get(os.path.abspath(mbox_path)))
+            if start_offset:
+                self.logger.info(f"从检查点增量扫描，起始偏移: {start_offset}")
+            else:
+                self.logger.info("没有可用的检查点，全量扫描mbox文件")
+        
+        # 第一阶段只解析邮件头部，正文在确认需要处理后再解析
+        job.emails = list(self.iter_mbox_emails(mbox_path, start_offset, headers_only=True))
+        
+        if not job.emails:
+            self.logger.info("mbox文件中没有找到邮件")
+            return
+        
+        # 检查点停在最后一封邮件的开头，下次扫描会重新解析它，防止遗漏写入到一半的邮件
+        job.checkpoint = mbox_fingerprint(mbox_path, job.emails[-1]['mbox_start'])
+        
+        processed_emails = self.get_processed_store()
+        auto_approve_enabled = self.config.getboolean('DEFAULT', 'auto_approve_enabled', fallback=True)
+        candidates = []
+        for email_info in job.emails:
+            # 检查是否需要批准
+            if not self.is_approval_needed(email_info):
+                continue
             
-            if processed_count > 0:
-                self.save_processed_emails(processed_emails)
-                self.logger.info(f"本次处理了 {processed_count} 封邮件")
+            # 检查是否已经处理过
+            if self.get_email_key(email_info) in processed_emails:
+                continue
             
-            # 返回处理结果和本次处理的邮件列表
-            return {
-                "processed_count": processed_count,
-                "processed_emails": current_batch_processed
-            }
+            # 检查是否启用自动批准
+            if not auto_approve_enabled:
+                self.logger.info("自动批准功能已禁用")
+                job.mark_failed()
+                continue
             
+            candidates.append(email_info)
+        
+        for i in range(0, len(candidates), PIPELINE_EXTRACT_CHUNK):
+            yield candidates[i:i + PIPELINE_EXTRACT_CHUNK]
+    
+    def _extract_stage(self, job, emails):
+        """解析阶段：批量解析正文（邮件较多时并行），提取字段并创建回复邮件"""
+        # 读取邮件内容时不能与归档阶段压缩mbox同时进行
+        with job.file_lock:
+            self.load_email_bodies(emails)
+        
+        for email_info in emails:
+            if not email_info.get('body_loaded'):
+                # 正文读取或解析失败（load_email_bodies已记录），只跳过这一封
+                job.mark_failed()
+                continue
+            reply_msg = self.create_approval_reply(email_info)
+            if not reply_msg:
+                job.mark_failed()
+                continue
+            yield email_info, reply_msg
+    
+    def _send_stage(self, job, item):
+        """发送阶段：发送回复邮件，记录已处理邮件和处理汇总
+        
+        支持并发的发送方式交给并发发送器，确认发送成功后才记录并交给归档阶段。
+        """
+        email_info, reply_msg = item
+        dispatcher = self.get_reply_dispatcher()
+        batch_size = self.get_send_batch_size()
+        
+        # 距离上一封邮件发送完成不足当前间隔时等待（并发发送时按收件人间隔控制，批量发送时按批等待）
+        pacer = self.get_send_pacer()
+        if not dispatcher and batch_size == 1:
+            pacer.wait_before_send()
+        
+        self.logger.info(f"处理需要批准的邮件: {email_info['subject']}")
+        self.logger.info(f"发件人: {email_info['from']}")
+        
+        # 记录Short description
+        short_description = email_info.get('short_description', '')
+        if short_description:
+            self.logger.info(f"Short description: {short_description}")
+            print(f"📋 Short description: {short_description}")
+        else:
+            self.logger.warning("未找到Short description字段")
+            print("⚠️ 未找到Short description字段")
+        
+        if dispatcher:
+            job.pending_sends.append((email_info, dispatcher.submit(reply_msg, email_info)))
+            yield from self._collect_sends(job)
+            return
+        
+        if batch_size > 1:
+            job.pending_batch.append((email_info, reply_msg))
+            if len(job.pending_batch) >= batch_size:
+                yield from self._flush_send_batch(job)
+            return
+        
+        # 发送回复邮件，只准备不自动发送时不检测邮件客户端的发送完成，SMTP提交成功即发送完成
+        success = self.send_reply_via_email_client(reply_msg, email_info)
+        auto_send = self.config.get('DEFAULT', 'send_mode', fallback='auto').lower() == 'auto'
+        email_client = self.config.get('DEFAULT', 'email_client', fallback='thunderbird').lower()
+        pacer.record_send(success, check_completion=auto_send and email_client != 'smtp')
+        if self._record_send_result(job, email_info, success):
+            yield email_info
+    
+    def _collect_sends(self, job, wait=False):
+        """取出已完成的并发发送结果（wait为True时等待全部完成），返回发送成功的邮件"""
+        remaining = []
+        for email_info, future in job.pending_sends:
+            if not wait and not future.done():
+                remaining.append((email_info, future))
+                continue
+            if self._record_send_result(job, email_info, future.result()):
+                yield email_info
+        job.pending_sends = remaining
+    
+    def _flush_send_batch(self, job):
+        """批量发送累积的回复邮件，返回发送成功的邮件"""
+        items, job.pending_batch = job.pending_batch, []
+        if not items:
+            return
+        
+        pacer = self.get_send_pacer()
+        pacer.wait_before_send()
+        results = self.send_replies_batch(items)
+        auto_send = self.config.get('DEFAULT', 'send_mode', fallback='auto').lower() == 'auto'
+        pacer.record_send(any(results), check_completion=auto_send)
+        for (email_info, _), success in zip(items, results):
+            if self._record_send_result(job, email_info, success):
+                yield email_info
+    
+    def _finish_sends(self, job):
+        """发送阶段收到扫描结束标记：发送剩余的批量邮件，等待并发发送的邮件全部完成"""
+        yield from self._flush_send_batch(job)
+        yield from self._collect_sends(job, wait=True)
+    
+    def _record_send_result(self, job, email_info, success):
+        """发送成功时记录已处理邮件和处理汇总，返回是否成功"""
+        if not success:
+            self.logger.error(f"发送回复失败: {email_info['subject']}")
+            # 未处理成功的邮件需要下次全量扫描时重试
+            job.mark_failed()
+            return False
+        
+        # 记录已处理的邮件（立即写入，防止意外中断时丢失进度）
+        try:
+            self.get_processed_store().add(self.get_email_key(email_info))
         except Exception as e:
-            self.logger.error(f"处理mbox文件失败 {mbox_path}: {e}")
-            return {"processed_count": 0, "processed_emails": []}
+            self.logger.error(f"保存已处理邮件记录失败: {e}")
+        job.processed_count += 1
+        self.logger.info(f"成功处理邮件 {job.processed_count}: {email_info['subject']}")
+        
+        # 添加到处理汇总
+        processed_time = time.strftime('%Y-%m-%d %H:%M:%S')
+        import re
+        subject = email_info.get('subject', '')
+        ticket_match = re.search(r'(RITM\d+|CHG\d+)', subject, re.IGNORECASE)
+        ticket_number = ticket_match.group(1) if ticket_match else None
+        self.add_to_processing_summary(email_info, processed_time, ticket_number)
+        
+        # 记录本次处理的邮件信息
+        batch_record = {
+            'ticket_number': ticket_number or 'N/A',
+            'short_description': email_info.get('short_description', 'N/A'),
+            'processed_time': processed_time,
+            'subject': email_info.get('subject', 'N/A'),
+            'requested_by': email_info.get('requested_by', 'N/A')
+        }
+        
+        # 如果是China Cloud或CN-Server & DB Access Control邮件，添加额外字段
+        short_desc_lower = email_info.get('short_description', '').lower()
+        if (short_desc_lower.startswith('china cloud account and permission request') or 
+            short_desc_lower.startswith('china cloud resource request') or
+            short_desc_lower.startswith('cn-server & db access control')):
+            batch_record.update({
+                'environment': email_info.get('environment', 'N/A'),
+                'required_permissions': email_info.get('required_permissions', 'N/A'),
+                'reason_for_application': email_info.get('reason_for_application', 'N/A'),
+                'is_china_cloud': True
+            })
+        else:
+            batch_record['is_china_cloud'] = False
+        
+        job.processed_records.append(batch_record)
+        return True
+    
+    def _archive_stage(self, job, email_info):
+        """归档阶段：记录待移动的邮件，达到批量大小时统一移动到Processed文件夹"""
+        job.pending_moves.append(email_info)
+        move_batch_size = max(self.config.getint('DEFAULT', 'move_batch_size', fallback=50), 1)
+        if len(job.pending_moves) >= move_batch_size:
+            with job.file_lock:
+                job.checkpoint = self._flush_processed_moves(
+                    job.pending_moves, job.mbox_path, job.emails, job.checkpoint
+                )
+    
+    def _finish_scan_job(self, job):
+        """归档阶段收到扫描结束标记：移动剩余邮件，更新索引和检查点，返回处理结果"""
+        try:
+            if not job.emails:
+                return
+            
+            if job.processed_count > 0:
+                self.get_summary_store().sync()
+                self.logger.info(f"本次处理了 {job.processed_count} 封邮件")
+            
+            # 移动剩余的已处理邮件
+            with job.file_lock:
+                checkpoint = self._flush_processed_moves(job.pending_moves, job.mbox_path, job.emails, job.checkpoint)
+            
+            # 同步更新邮件索引
+            self.refresh_mbox_index(job.mbox_path)
+            
+            # 有未处理成功的邮件时下次全量扫描重试
+            checkpoints = self.load_mbox_checkpoints()
+            checkpoint_key = os.path.abspath(job.mbox_path)
+            if (not job.failed and checkpoint and
+                    resume_offset(job.mbox_path, checkpoint) == checkpoint['offset']):
+                checkpoints[checkpoint_key] = mbox_fingerprint(job.mbox_path, checkpoint['offset'])
+            else:
+                # 文件被其他程序重写时下次全量扫描
+                checkpoints.pop(checkpoint_key, None)
+            self.save_mbox_checkpoints(checkpoints)
+        except Exception as e:
+            self.logger.error(f"处理mbox文件失败 {job.mbox_path}: {e}")
+        finally:
+            # 返回处理结果和本次处理的邮件列表
+            job.finish({
+                "processed_count": job.processed_count,
+                "processed_emails": job.processed_records
+            })
+    
+    def _flush_processed_moves(self, pending_moves, mbox_path, emails, checkpoint):
+        """批量移动待处理的邮件，并按删除的区间平移其余邮件的偏移和检查点
+        
+        返回更新后的检查点，检查点失效时返回None。
+        """
+        if not pending_moves:
+            return checkpoint
+        
+        # 检查点在压缩前校验：文件被其他程序重写时下次全量扫描
+        if checkpoint and resume_offset(mbox_path, checkpoint) != checkpoint['offset']:
+            checkpoint = None
+        
+        dropped_ranges = self.move_processed_emails(pending_moves, mbox_path)
+        pending_moves.clear()
+        if dropped_ranges is None:
+            self.logger.warning("⚠️ 邮件处理成功，但移动到Processed文件夹失败")
+            return checkpoint
+        
+        for email_info in emails:
+            email_info['mbox_start'] = shift_offset(email_info['mbox_start'], dropped_ranges)
+            email_info['mbox_end'] = shift_offset(email_info['mbox_end'], dropped_ranges)
+        
+        # 原地设置删除标志也会改变文件内容，需要重新计算指纹
+        if checkpoint:
+            checkpoint = mbox_fingerprint(mbox_path, shift_offset(checkpoint['offset'], dropped_ranges))
+        return checkpoint
     
     def print_current_batch_summary(self, processed_emails_list, export_to_file=False, export_format='txt'):
         """显示本次处理的邮件汇总"""
@@ -1742,10 +2170,8 @@ class EmailAutoApprover:
         # 导出到文件（如果需要）
         if export_to_file:
             import datetime
-            if export_format.lower() == 'xlsx':
-                filename = f"batch_summary_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-            else:
-                filename = f"batch_summary_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
+            extension = export_file_extension(export_format)
+            filename = f"batch_summary_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
             if self.export_summary_to_file(processed_emails_list, "📊 本次处理邮件汇总", filename, export_format):
                 print(f"📁 本次处理汇总已导出到文件: {filename}")
             else:
@@ -1843,12 +2269,139 @@ class EmailAutoApprover:
             print(f"❌ 邮件文件不存在: {mbox_file}")
             return False
 
+# 进程池中每个工作进程使用的正文解析器（只需要日志，不读取配置）
+_worker_parser = None
+
+
+def _parse_bodies_worker(email_ranges):
+    """在工作进程中按偏移读取并解析一块邮件的正文"""
+    global _worker_parser
+    if _worker_parser is None:
+        _worker_parser = EmailBodyParser()
+    results = []
+    for mbox_path, start, end, body_offset in email_ranges:
+        try:
+            message_bytes = read_email_bytes(mbox_path, start, end, body_offset)
+            results.append(_worker_parser.extract_body_fields(message_bytes))
+        except Exception as e:
+            _worker_parser.logger.warning(f"解析邮件失败: {e}")
+            results.append({})
+    return results
+
+
+def read_email_bytes(mbox_path, start, end, body_offset):
+    """按偏移读取单封邮件去掉分隔行后的内容"""
+    return read_message(mbox_path, start + body_offset, end - start - body_offset)
+
+
+def iter_summary_records(summary_data):
+    """遍历汇总记录：summary_data可以是列表，也可以是每次返回新迭代器的函数"""
+    return summary_data() if callable(summary_data) else iter(summary_data)
+
+
+def check_summary_records(summary_data):
+    """返回 (是否有记录, 是否有China Cloud邮件)，找到第一封China Cloud邮件即停止遍历"""
+    has_records = False
+    for record in iter_summary_records(summary_data):
+        has_records = True
+        if record.get('is_china_cloud', False):
+            return True, True
+    return has_records, False
+
+
+def summary_export_values(record):
+    """按SUMMARY_EXPORT_COLUMNS的顺序取出一条记录的值（缺少的字段为空字符串）"""
+    return [
+        bool(record.get(column, False)) if column == 'is_china_cloud' else str(record.get(column) or '')
+        for column in SUMMARY_EXPORT_COLUMNS
+    ]
+
+
+def iter_summary_chunks(summary_data, chunk_rows=EXPORT_CHUNK_ROWS):
+    """按块产出 {列名: 值列表}，用于列式格式分块写入"""
+    chunk = {column: [] for column in SUMMARY_EXPORT_COLUMNS}
+    rows = 0
+    for record in iter_summary_records(summary_data):
+        for column, value in zip(SUMMARY_EXPORT_COLUMNS, summary_export_values(record)):
+            chunk[column].append(value)
+        rows += 1
+        if rows >= chunk_rows:
+            yield chunk
+            chunk = {column: [] for column in SUMMARY_EXPORT_COLUMNS}
+            rows = 0
+    if rows:
+        yield chunk
+
+
+def export_file_extension(format_type):
+    """导出文件的扩展名（没有安装pyarrow时Parquet导出为.npz）"""
+    import importlib.util
+    
+    format_type = format_type.lower()
+    if format_type == 'parquet':
+        return 'parquet' if importlib.util.find_spec('pyarrow') else 'npz'
+    return format_type if format_type in ('xlsx', 'csv') else 'txt'
+
+
+def summary_row(index, record, has_china_cloud):
+    """生成导出用的一行数据"""
+    row = [
+        index,
+        record.get('processed_time', 'N/A'),
+        record.get('ticket_number', 'N/A'),
+        record.get('short_description', 'N/A'),
+        record.get('requested_by', 'N/A')
+    ]
+    # 如果有China Cloud字段，写入额外列
+    if has_china_cloud:
+        if record.get('is_china_cloud', False):
+            row += [
+                record.get('environment', 'N/A'),
+                record.get('required_permissions', 'N/A'),
+                record.get('reason_for_application', 'N/A')
+            ]
+        else:
+            # 非China Cloud邮件
+            row += ['-', '-', '-']
+    return row
+
+
+class MboxScanJob(PipelineJob):
+    """一次mbox扫描在流水线各阶段之间共享的状态"""
+    
+    def __init__(self, mbox_path, incremental=False):
+        super().__init__()
+        self.mbox_path = mbox_path
+        self.incremental = incremental
+        self.emails = []  # 本次扫描解析出的全部邮件，批量移动后统一平移偏移
+        self.checkpoint = None
+        self.processed_count = 0
+        self.processed_records = []  # 记录本次处理的邮件
+        self.pending_moves = []  # 已处理、待批量移动到Processed的邮件
+        self.pending_sends = []  # 并发发送中的邮件: (邮件信息, 发送结果Future)
+        self.pending_batch = []  # 等待批量发送的邮件: (邮件信息, 回复邮件)
+        # 解析阶段读取邮件内容和归档阶段压缩mbox不能同时进行
+        self.file_lock = threading.Lock()
+
+
 class EmailWatcher(FileSystemEventHandler):
-    """邮件文件监控器"""
+    """邮件文件监控器
+    
+    Thunderbird写入一封邮件会连续触发多次修改事件。事件只把mbox标记为待扫描，
+    同一路径在静默窗口（watch_quiet_seconds）内的事件合并为一次，由单独的扫描线程处理：
+    每个mbox同时最多一次扫描在进行、一次扫描在排队，不会阻塞watchdog线程。
+    """
     
     def __init__(self, approver, watch_folder):
         self.approver = approver
         self.watch_folder = watch_folder  # 目标文件夹名（如NeedApprove）
+        self.quiet_seconds = max(approver.config.getfloat('DEFAULT', 'watch_quiet_seconds', fallback=1.0), 0)
+        self._pending = {}  # 待扫描的mbox路径 -> 最后一次事件后到期的时间
+        self._event_counts = {}  # 每个待扫描路径合并的事件数
+        self._condition = threading.Condition()
+        self._stopped = False
+        self._worker = threading.Thread(target=self._scan_worker, name='mbox-scan-worker', daemon=True)
+        self._worker.start()
         
     def on_created(self, event):
         """文件创建事件"""
@@ -1856,18 +2409,77 @@ class EmailWatcher(FileSystemEventHandler):
             file_name = os.path.basename(event.src_path)
             if file_name == self.watch_folder:
                 self.approver.logger.info(f"检测到新的mbox文件: {event.src_path}")
-                # 等待文件写入完成
-                time.sleep(1)
-                self.approver.process_mbox_file(event.src_path, show_daily_summary=False)
+                self.schedule_scan(event.src_path)
     
     def on_modified(self, event):
         """文件修改事件"""
         if not event.is_directory:
             file_name = os.path.basename(event.src_path)
             if file_name == self.watch_folder:
-                self.approver.logger.info(f"检测到mbox文件修改: {event.src_path}")
-                time.sleep(1)
-                self.approver.process_mbox_file(event.src_path, show_daily_summary=False)
+                self.schedule_scan(event.src_path)
+    
+    def schedule_scan(self, mbox_path):
+        """标记mbox需要扫描，静默窗口内的后续事件只推迟到期时间"""
+        with self._condition:
+            if mbox_path not in self._pending:
+                self.approver.logger.info(f"检测到mbox文件修改: {mbox_path}")
+            self._pending[mbox_path] = time.monotonic() + self.quiet_seconds
+            self._event_counts[mbox_path] = self._event_counts.get(mbox_path, 0) + 1
+            self._condition.notify()
+    
+    def _next_scan(self):
+        """等待下一个到期的mbox，停止时返回None"""
+        with self._condition:
+            while not self._stopped:
+                if not self._pending:
+                    self._condition.wait()
+                    continue
+                mbox_path, due = min(self._pending.items(), key=lambda item: item[1])
+                delay = due - time.monotonic()
+                if delay > 0:
+                    self._condition.wait(delay)
+                    continue
+                del self._pending[mbox_path]
+                return mbox_path, self._event_counts.pop(mbox_path, 0)
+            return None
+    
+    def _scan_worker(self):
+        """扫描线程：逐个处理到期的mbox，扫描期间的新事件会排队等下一次扫描"""
+        while True:
+            item = self._next_scan()
+            if item is None:
+                return
+            mbox_path, event_count = item
+            if event_count > 1:
+                self.approver.logger.debug(f"合并了 {event_count} 个文件事件: {mbox_path}")
+            try:
+                self.approver.process_mbox_file(mbox_path, show_daily_summary=False, incremental=True)
+            except Exception as e:
+                self.approver.logger.error(f"扫描mbox文件失败 {mbox_path}: {e}")
+    
+    def stop(self, timeout=None):
+        """停止扫描线程（正在进行的扫描会先完成）"""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        self._worker.join(timeout)
+
+def get_option_value(option):
+    """获取命令行选项后面的参数值，没有时返回None"""
+    if option in sys.argv:
+        index = sys.argv.index(option)
+        if index + 1 < len(sys.argv) and not sys.argv[index + 1].startswith('-'):
+            return sys.argv[index + 1]
+    return None
+
+
+def is_valid_date(date_str):
+    """检查日期是否为YYYY-MM-DD格式（月和日需要补零，记录按字符串比较日期）"""
+    try:
+        return time.strftime('%Y-%m-%d', time.strptime(date_str, '%Y-%m-%d')) == date_str
+    except ValueError:
+        return False
+
 
 def main():
     """主函数"""
@@ -1876,7 +2488,14 @@ def main():
         if len(sys.argv) > 1:
             export_to_file = '--export' in sys.argv or '-e' in sys.argv
             export_excel = '--excel' in sys.argv or '--xlsx' in sys.argv
-            export_format = 'xlsx' if export_excel else 'txt'
+            if export_excel:
+                export_format = 'xlsx'
+            elif '--csv' in sys.argv:
+                export_format = 'csv'
+            elif '--parquet' in sys.argv:
+                export_format = 'parquet'
+            else:
+                export_format = 'txt'
             
             if sys.argv[1] == '--summary' or sys.argv[1] == '-s':
                 # 显示处理汇总报告
@@ -1886,13 +2505,61 @@ def main():
             elif sys.argv[1] == '--once' or sys.argv[1] == '-o':
                 # 一次性处理模式
                 approver = EmailAutoApprover()
-                success = approver.run_once_mode(export_to_file=export_to_file, export_format=export_format)
+                try:
+                    success = approver.run_once_mode(export_to_file=export_to_file, export_format=export_format)
+                finally:
+                    approver.stop_pipeline()
+                    approver.close_email_senders()
+                    approver.close_processed_store()
                 return 0 if success else 1
             elif sys.argv[1] == '--today' or sys.argv[1] == '-t':
                 # 显示今日处理汇总报告
                 approver = EmailAutoApprover()
                 approver.print_daily_processing_summary(export_to_file=export_to_file, export_format=export_format)
                 return 0
+            elif sys.argv[1] == '--stats':
+                # 显示按天/按周的处理统计
+                start_date = get_option_value('--from')
+                end_date = get_option_value('--to')
+                for date_value in (start_date, end_date):
+                    if date_value and not is_valid_date(date_value):
+                        print(f"错误: 日期格式不正确: {date_value}，应为YYYY-MM-DD")
+                        return 1
+                approver = EmailAutoApprover()
+                period = 'week' if '--week' in sys.argv else 'day'
+                approver.print_processing_stats(period, start_date=start_date, end_date=end_date)
+                return 0
+            elif sys.argv[1] in ('--date', '--from', '--to'):
+                # 显示指定日期或日期范围的处理汇总报告
+                if sys.argv[1] == '--date':
+                    start_date = end_date = get_option_value('--date')
+                    if not start_date:
+                        print("用法: python email_auto_approve.py --date YYYY-MM-DD")
+                        return 1
+                else:
+                    start_date = get_option_value('--from')
+                    end_date = get_option_value('--to')
+                    if start_date and not end_date:
+                        end_date = time.strftime('%Y-%m-%d')
+                for date_value in (start_date, end_date):
+                    if date_value and not is_valid_date(date_value):
+                        print(f"错误: 日期格式不正确: {date_value}，应为YYYY-MM-DD")
+                        return 1
+                if start_date and end_date and start_date > end_date:
+                    print(f"错误: 开始日期 {start_date} 晚于结束日期 {end_date}")
+                    return 1
+                approver = EmailAutoApprover()
+                approver.print_daily_processing_summary(start_date, export_to_file=export_to_file,
+                                                        export_format=export_format, end_date=end_date)
+                return 0
+            elif sys.argv[1] == '--find' or sys.argv[1] == '-f':
+                # 查找指定单号是否仍在待批准文件夹中
+                if len(sys.argv) < 3:
+                    print("用法: python email_auto_approve.py -f <RITM或CHG单号>")
+                    return 1
+                approver = EmailAutoApprover()
+                matches = approver.find_pending_ticket(sys.argv[2])
+                return 0 if matches else 1
             elif sys.argv[1] == '--help' or sys.argv[1] == '-h':
                 print("ServiceNow邮件自动批准程序")
                 print("用法:")
@@ -1903,20 +2570,31 @@ def main():
                 print("  python email_auto_approve.py --summary # 显示全部处理汇总报告")
                 print("  python email_auto_approve.py -t      # 显示今日处理汇总报告")
                 print("  python email_auto_approve.py --today # 显示今日处理汇总报告")
+                print("  python email_auto_approve.py --date 2025-09-07 # 显示指定日期的处理汇总报告")
+                print("  python email_auto_approve.py --from 2025-09-01 --to 2025-09-07 # 显示日期范围内的处理汇总报告")
+                print("  python email_auto_approve.py --stats # 显示按天统计（按请求类型和申请人）")
+                print("  python email_auto_approve.py --stats --week --from 2025-09-01 # 显示按周统计")
+                print("  python email_auto_approve.py -f RITM1603909 # 查找单号是否仍在待批准文件夹中")
                 print("  python email_auto_approve.py -h      # 显示帮助信息")
                 print()
                 print("导出选项:")
                 print("  -e, --export                          # 导出汇总报告到文件")
                 print("  --excel, --xlsx                       # 导出为Excel格式（需要 -e）")
+                print("  --csv                                 # 导出为CSV格式（需要 -e）")
+                print("  --parquet                             # 导出为Parquet格式（需要 -e，未安装pyarrow时导出为numpy .npz）")
                 print()
                 print("示例:")
                 print("  python email_auto_approve.py -s -e           # 显示并导出全部汇总为txt")
                 print("  python email_auto_approve.py -s -e --excel   # 显示并导出全部汇总为Excel")
                 print("  python email_auto_approve.py -t -e --xlsx    # 显示并导出今日汇总为Excel")
+                print("  python email_auto_approve.py --from 2025-09-01 -e  # 显示并导出9月1日至今的汇总")
                 print("  python email_auto_approve.py -o -e --excel   # 一次性处理并导出为Excel")
+                print("  python email_auto_approve.py -s -e --parquet # 导出全部汇总为Parquet，便于导入分析工具")
                 print()
                 print("注意: 导出Excel格式需要安装openpyxl库:")
                 print("  pip install openpyxl")
+                print("导出Parquet格式需要安装pyarrow库（未安装时使用numpy导出.npz）:")
+                print("  pip install pyarrow")
                 return 0
         
         approver = EmailAutoApprover()
@@ -1981,6 +2659,10 @@ def main():
             print("\n停止监控...")
             
         observer.join()
+        event_handler.stop()
+        approver.stop_pipeline()
+        approver.close_email_senders()
+        approver.close_processed_store()
         
     except Exception as e:
         print(f"程序运行错误: {e}")
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+ServiceNow批准邮件字段提取引擎
+
+所有字段模式在导入时编译一次。每封邮件的字段匹配在第一次用到某个模式时才搜索，
+结果（每个模式的第一个匹配，与逐个 re.search 的结果一致）由Short description和
+三种请求类型的提取共享，同一个模式在一封邮件中只搜索一次。
+搜索时先在小写正文中用 str.find 查找模式开头的字面单词，只在这些位置尝试匹配正则，
+不用让忽略大小写的正则逐个字符扫描整封邮件。
+多行字段的结束位置由多个模式合并成一个表达式，一次搜索得到最早出现的位置。
+"""
+
+import re
+
+FLAGS = re.IGNORECASE | re.MULTILINE
+
+# 字段名模式：名称 -> 正则。正则的第1组为字段值。
+FIELD_PATTERNS = {
+    # Short description
+    'short_description': r'Short\s+description[:\s]*([^\r\n]+)',
+    'description': r'Description[:\s]*([^\r\n]+)',
+    'request': r'Request[:\s]*([^\r\n]+)',
+    # Requested by
+    'requested_by': r'Requested\s+by[:\s]*([^\r\n]+)',
+    'requested_for': r'Requested\s+for[:\s]*([^\r\n]+)',
+    'request_by': r'Request\s+by[:\s]*([^\r\n]+)',
+    'request_for': r'Request\s+for[:\s]*([^\r\n]+)',
+    # Environment
+    'permission_environment': r'Permission\s+regards\s+to\s+environm?e?nt[:\s]*([^\r\n]+)',
+    'environment': r'Environment[:\s]*([^\r\n]+)',
+    'regards_environment': r'Regards\s+to\s+environm?e?nt[:\s]*([^\r\n]+)',
+    'env': r'Env[:\s]*([^\r\n]+)',
+    # Required permissions
+    'required_permissions': r'Required\s+permissions[:\s]*([^\r\n]+)',
+    'permissions_required': r'Permissions\s+required[:\s]*([^\r\n]+)',
+    'permission': r'Permission[:\s]*([^\r\n]+)',
+    'required_permission': r'Required\s+permission[:\s]*([^\r\n]+)',
+    # Resource Info
+    'resource_info': r'Resource\s+Info[:\s]*([^\r\n]+)',
+    'resource_information': r'Resource\s+Information[:\s]*([^\r\n]+)',
+    'resource': r'Resource[:\s]*([^\r\n]+)',
+    'resources': r'Resources[:\s]*([^\r\n]+)',
+    # Reason for application
+    'reason_for_application': r'Reason\s+for\s+application[:\s]*([^\r\n]+)',
+    'application_reason': r'Application\s+reason[:\s]*([^\r\n]+)',
+    'reason': r'Reason[:\s]*([^\r\n]+)',
+    'justification': r'Justification[:\s]*([^\r\n]+)',
+    # CN-Server & DB Access Control
+    'system_access': r'What\s+System\s+do\s+you\s+need\s+access\s+to\?[:\s]*([^\r\n]+)',
+    'authorization_time': r'Authorization\s+time[:\s]*([^\r\n]+)',
+    'auth_time': r'Auth\s+time[:\s]*([^\r\n]+)',
+    'authorization': r'Authorization[:\s]*([^\r\n]+)',
+    # 多行字段的起始位置（不要求同一行有值）
+    'required_permissions_start': r'Required\s+permissions[:\s]*',
+    'resource_info_start': r'Resource\s+Info[:\s]*',
+    'authorization_time_start': r'Authorization\s+time[:\s]*',
+    'reason_including_time_start':
+        r'Reason\s+for\s+application\s*\(including\s+reason\s+for\s+Authorization\s+time\)[:\s]*',
+    'reason_for_application_start': r'Reason\s+for\s+application[:\s]*',
+}
+
+# 只在行首（前面只有空白）出现时才算数的字段，对应原来的 (?:^|\n)\s* 前缀
+LINE_START_FIELDS = {'description', 'request'}
+
+COMPILED_PATTERNS = {name: re.compile(pattern, FLAGS) for name, pattern in FIELD_PATTERNS.items()}
+
+# 每个模式开头的字面单词（小写），正则只可能在小写正文中出现这个单词的位置匹配
+PATTERN_PREFIXES = {name: re.match(r'[A-Za-z]+', pattern).group(0).lower()
+                    for name, pattern in FIELD_PATTERNS.items()}
+
+# 忽略大小写时能匹配ASCII字母、但 lower() 后不是这个字母（或改变长度）的字符，
+# 正文中出现时小写正文的位置不可靠，退回正则逐字符搜索
+UNSAFE_FOLD_CHARS = ('\u0130', '\u0131', '\u017f')
+
+# 多行字段的结束位置：下一个字段名（多个模式合并为一个，取最早出现的位置）
+GENERIC_FIELD = r'\n\s*[A-Za-z]+\s+[A-Za-z]+\s*:'
+BLOCK_END_PATTERNS = {
+    'required_permissions': re.compile('|'.join([
+        r'\n\s*Environment\s*:',
+        r'\n\s*Reason\s+for\s+application\s*:',
+        r'\n\s*Justification\s*:',
+        r'\n\s*Notes\s*:',
+        r'\n\s*Comments\s*:',
+        r'\n\s*Additional\s+information\s*:',
+        r'\n\s*Permission\s+regards\s+to\s+environment\s*:',
+        GENERIC_FIELD
+    ]), FLAGS),
+    'resource_info': re.compile('|'.join([
+        r'\n\s*Environment\s*:',
+        r'\n\s*Reason\s+for\s+application\s*:',
+        r'\n\s*Justification\s*:',
+        r'\n\s*Notes\s*:',
+        r'\n\s*Comments\s*:',
+        r'\n\s*Additional\s+information\s*:',
+        GENERIC_FIELD
+    ]), FLAGS),
+    'authorization_time': re.compile('|'.join([
+        r'\n\s*Environment\s*:',
+        r'\n\s*Reason\s+for\s+application\s*:',
+        r'\n\s*What\s+System\s*:',
+        r'\n\s*Justification\s*:',
+        r'\n\s*Notes\s*:',
+        r'\n\s*Comments\s*:',
+        GENERIC_FIELD
+    ]), FLAGS),
+    'reason_for_application': re.compile('|'.join([
+        r'\n\s*Environment\s*:',
+        r'\n\s*Authorization\s+time\s*:',
+        r'\n\s*What\s+System\s*:',
+        r'\n\s*Justification\s*:',
+        r'\n\s*Notes\s*:',
+        r'\n\s*Comments\s*:',
+        GENERIC_FIELD
+    ]), FLAGS),
+}
+
+SEPARATOR_LINE = re.compile(r'^[\s\-=_]+$')
+WHITESPACE = re.compile(r'\s+')
+
+
+class FieldMatches:
+    """一封邮件正文中各字段模式的第一个匹配，第一次用到某个模式时才搜索"""
+
+    def __init__(self, body):
+        self.body = body
+        self._matches = {}
+        self._lowered = None
+
+    def get(self, name):
+        """返回模式的第一个匹配，没有出现时返回None"""
+        if name not in self._matches:
+            self._matches[name] = self._search(name)
+        return self._matches[name]
+
+    def _lowered_body(self):
+        """小写的正文（第一次使用时生成），不能用于定位时返回空字符串"""
+        if self._lowered is None:
+            unsafe = any(char in self.body for char in UNSAFE_FOLD_CHARS)
+            self._lowered = '' if unsafe else self.body.lower()
+        return self._lowered
+
+    def _candidates(self, name):
+        """按从前到后的顺序返回模式可能匹配的位置"""
+        lowered = self._lowered_body()
+        if not lowered:
+            # 退回逐字符搜索：每个匹配的起始位置
+            pattern = COMPILED_PATTERNS[name]
+            match = pattern.search(self.body)
+            while match:
+                yield match.start()
+                match = pattern.search(self.body, match.start() + 1)
+            return
+        prefix = PATTERN_PREFIXES[name]
+        position = lowered.find(prefix)
+        while position >= 0:
+            yield position
+            position = lowered.find(prefix, position + 1)
+
+    def _search(self, name):
+        pattern = COMPILED_PATTERNS[name]
+        for position in self._candidates(name):
+            match = pattern.match(self.body, position)
+            if not match:
+                continue
+            # 行首字段跳过前面同一行还有其他内容的匹配
+            if name in LINE_START_FIELDS and self.body[self.body.rfind('\n', 0, position) + 1:position].strip():
+                continue
+            return match
+        return None
+
+
+def scan_fields(body):
+    """返回正文的字段匹配（FieldMatches，按 fields.get(模式名) 取第一个匹配）"""
+    return FieldMatches(body)
+
+
+def first_value(fields, names):
+    """按优先级返回第一个出现的字段值，都没有时返回 (None, '')"""
+    for name in names:
+        match = fields.get(name)
+        if match:
+            return name, match.group(1).strip()
+    return None, ''
+
+
+def extract_block(body, start_match, block):
+    """从多行字段的起始位置提取到下一个字段之前的文本，并清理分隔线和多余空白"""
+    start_pos = start_match.end()
+    end_match = BLOCK_END_PATTERNS[block].search(body, start_pos)
+    text = body[start_pos:end_match.start() if end_match else len(body)].strip()
+
+    cleaned_lines = []
+    for line in text.split('\n'):
+        line = line.strip()
+        # 过滤掉空行、分隔符行和明显的格式化字符
+        if (line and
+                not line.startswith('=') and
+                not line.startswith('-') and
+                not SEPARATOR_LINE.match(line) and
+                len(line.replace(' ', '').replace('\t', '')) > 0):
+            cleaned_lines.append(line)
+
+    if not cleaned_lines:
+        return ''
+    return WHITESPACE.sub(' ', ' '.join(cleaned_lines)).strip()
+
+
+def normalize_whitespace(text):
+    """压缩多个空白字符为一个空格"""
+    return WHITESPACE.sub(' ', text)
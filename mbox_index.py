@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+mbox邮件索引
+
+在SQLite中记录每封邮件的字节偏移、长度、Message-ID、单号和X-Mozilla-Status，
+查找邮件和定位单封邮件时不再需要完整解析mbox文件。
+"""
+
+import os
+import re
+import json
+import sqlite3
+from email.parser import BytesHeaderParser
+from email.policy import compat32
+
+from mbox_utils import (iter_mbox_messages, iter_mbox_messages_mmap, message_head, split_envelope, split_headers,
+                        mbox_fingerprint, resume_offset, parse_mozilla_status, MOZILLA_STATUS_EXPUNGED)
+
+TICKET_PATTERN = re.compile(r'(RITM\d+|CHG\d+)', re.IGNORECASE)
+
+
+def extract_ticket_number(subject):
+    """从邮件主题中提取RITM或CHG单号"""
+    match = TICKET_PATTERN.search(subject or '')
+    return match.group(1).upper() if match else ''
+
+
+class MboxIndex:
+    def __init__(self, db_path='mbox_index.db'):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._create_tables()
+
+    def _create_tables(self):
+        """创建索引表"""
+        with self.conn:
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS messages (
+                    mbox_path TEXT NOT NULL,
+                    offset INTEGER NOT NULL,
+                    length INTEGER NOT NULL,
+                    message_id TEXT,
+                    ticket_number TEXT,
+                    mozilla_status INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (mbox_path, offset)
+                )''')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_messages_message_id ON messages (message_id)')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_messages_ticket ON messages (ticket_number)')
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS mboxes (
+                    mbox_path TEXT PRIMARY KEY,
+                    checkpoint TEXT NOT NULL
+                )''')
+
+    def close(self):
+        """关闭数据库连接"""
+        self.conn.close()
+
+    def refresh(self, mbox_path, use_mmap=False):
+        """增量更新指定mbox的索引，返回本次新索引的邮件数
+
+        文件只是被追加时只索引新增部分；文件被压缩或截断时重建整个索引。
+        use_mmap为True时通过内存映射扫描，适合很大的归档文件夹。
+        """
+        mbox_path = os.path.abspath(mbox_path)
+        if not os.path.exists(mbox_path):
+            self.drop(mbox_path)
+            return 0
+
+        row = self.conn.execute(
+            'SELECT checkpoint FROM mboxes WHERE mbox_path = ?', (mbox_path,)
+        ).fetchone()
+        start_offset = resume_offset(mbox_path, json.loads(row[0]) if row else None)
+
+        entries = []
+        scanner = iter_mbox_messages_mmap if use_mmap else iter_mbox_messages
+        for start, end, raw in scanner(mbox_path, start_offset):
+            entry = self._index_entry(mbox_path, start, end, raw)
+            if entry:
+                entries.append(entry)
+
+        # 索引检查点停在最后一封邮件开头，下次刷新时重新索引可能未写完的邮件
+        last_offset = entries[-1][1] if entries else start_offset
+        checkpoint = mbox_fingerprint(mbox_path, last_offset)
+
+        with self.conn:
+            self.conn.execute(
+                'DELETE FROM messages WHERE mbox_path = ? AND offset >= ?', (mbox_path, start_offset)
+            )
+            self.conn.executemany(
+                'INSERT OR REPLACE INTO messages VALUES (?, ?, ?, ?, ?, ?)', entries
+            )
+            self.conn.execute(
+                'INSERT OR REPLACE INTO mboxes VALUES (?, ?)', (mbox_path, json.dumps(checkpoint))
+            )
+        return len(entries)
+
+    def _index_entry(self, mbox_path, start, end, raw):
+        """只解析邮件头部生成索引记录"""
+        _, message_bytes = split_envelope(message_head(raw))
+        headers = BytesHeaderParser(policy=compat32).parsebytes(split_headers(message_bytes.lstrip(b'\r\n')))
+        if not (headers.get('Subject') or headers.get('From')):
+            return None
+        return (
+            mbox_path,
+            start,
+            end - start,
+            (headers.get('Message-ID') or '').strip(),
+            extract_ticket_number(headers.get('Subject', '')),
+            parse_mozilla_status(headers.get('X-Mozilla-Status'))
+        )
+
+    def set_status_flag(self, mbox_path, offsets, flag=MOZILLA_STATUS_EXPUNGED):
+        """原地修改mbox中邮件的X-Mozilla-Status后同步更新索引中的状态
+
+        改写标志位不改变文件长度，refresh只检查文件末尾，发现不了这种修改。
+        """
+        mbox_path = os.path.abspath(mbox_path)
+        with self.conn:
+            self.conn.executemany(
+                'UPDATE messages SET mozilla_status = mozilla_status | ? WHERE mbox_path = ? AND offset = ?',
+                [(flag, mbox_path, offset) for offset in offsets]
+            )
+
+    def drop(self, mbox_path):
+        """删除指定mbox的全部索引，下次刷新时重建"""
+        mbox_path = os.path.abspath(mbox_path)
+        with self.conn:
+            self.conn.execute('DELETE FROM messages WHERE mbox_path = ?', (mbox_path,))
+            self.conn.execute('DELETE FROM mboxes WHERE mbox_path = ?', (mbox_path,))
+
+    def find_by_message_id(self, mbox_path, message_id, include_deleted=False):
+        """按Message-ID查找邮件位置"""
+        return self._find(mbox_path, 'message_id', (message_id or '').strip(), include_deleted)
+
+    def find_by_ticket(self, mbox_path, ticket_number, include_deleted=False):
+        """按RITM/CHG单号查找邮件位置"""
+        return self._find(mbox_path, 'ticket_number', (ticket_number or '').upper(), include_deleted)
+
+    def _find(self, mbox_path, column, value, include_deleted):
+        """查找邮件，返回 [{'offset', 'length', 'message_id', 'ticket_number', 'mozilla_status'}]
+
+        默认忽略已设置删除标志、等待Thunderbird压缩清理的邮件。
+        """
+        deleted_filter = '' if include_deleted else f' AND (mozilla_status & {MOZILLA_STATUS_EXPUNGED}) = 0'
+        rows = self.conn.execute(
+            f'SELECT offset, length, message_id, ticket_number, mozilla_status FROM messages '
+            f'WHERE mbox_path = ? AND {column} = ?{deleted_filter} ORDER BY offset',
+            (os.path.abspath(mbox_path), value)
+        ).fetchall()
+        return [
+            {
+                'offset': offset,
+                'length': length,
+                'message_id': message_id,
+                'ticket_number': ticket_number,
+                'mozilla_status': mozilla_status
+            }
+            for offset, length, message_id, ticket_number, mozilla_status in rows
+        ]
+
+
+def read_message(mbox_path, offset, length):
+    """根据索引中的偏移和长度直接读取单封邮件的原始字节"""
+    with open(mbox_path, 'rb') as f:
+        f.seek(offset)
+        return f.read(length)
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Thunderbird mbox文件工具
+
+以二进制分块方式流式扫描mbox文件，逐封产出邮件及其字节偏移，
+避免一次性把整个邮件文件读入内存；并通过字节偏移检查点支持增量扫描，
+按字节区间一次性压缩删除邮件，或原地设置X-Mozilla-Status删除标志。
+大文件可以使用内存映射模式扫描，只复制需要的部分。
+"""
+
+import os
+import re
+import mmap
+import shutil
+import hashlib
+import tempfile
+
+try:
+    import fcntl
+except ImportError:  # Windows没有fcntl，不加锁
+    fcntl = None
+
+# 每次从磁盘读取的块大小
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+# mbox邮件分隔符（必须位于行首）
+MBOX_SEPARATOR = b'From '
+
+# X-Mozilla-Status中的"已删除"标志位，Thunderbird压缩文件夹时会清理这些邮件
+MOZILLA_STATUS_EXPUNGED = 0x0008
+
+# 查找X-Mozilla-Status头部时最多读取的邮件开头字节数
+STATUS_SCAN_LIMIT = 64 * 1024
+
+MOZILLA_STATUS_PATTERN = re.compile(rb'^X-Mozilla-Status:[ \t]*([0-9A-Fa-f]{4})\r?$', re.MULTILINE)
+
+
+def iter_mbox_messages(mbox_path, start_offset=0, chunk_size=DEFAULT_CHUNK_SIZE):
+    """流式扫描mbox文件，逐封产出 (起始偏移, 结束偏移, 原始字节)
+
+    原始字节包含开头的"From "分隔行，结束偏移为下一封邮件分隔行的起始位置。
+    内存占用只与单封最大邮件大小相关，与整个文件大小无关。
+    """
+    with open(mbox_path, 'rb') as f:
+        f.seek(start_offset)
+        yield from _scan_messages(f, start_offset, chunk_size)
+
+
+def _scan_messages(f, start_offset, chunk_size):
+    """从已定位的二进制文件对象中按分隔符切分邮件"""
+    buf = bytearray()
+    msg_start = start_offset
+    search_pos = 0
+    needle = b'\n' + MBOX_SEPARATOR
+
+    while True:
+        chunk = f.read(chunk_size)
+        if not chunk:
+            break
+        buf += chunk
+
+        while True:
+            # 跳过当前邮件自身的分隔行，从上次搜索位置继续查找
+            idx = buf.find(needle, max(search_pos, 1))
+            if idx < 0:
+                # 保留可能跨块的分隔符前缀
+                search_pos = max(len(buf) - len(needle) + 1, 0)
+                break
+            end = idx + 1
+            yield msg_start, msg_start + end, bytes(buf[:end])
+            del buf[:end]
+            msg_start += end
+            search_pos = 0
+
+    if buf:
+        yield msg_start, msg_start + len(buf), bytes(buf)
+
+
+def iter_mbox_messages_mmap(mbox_path, start_offset=0):
+    """通过内存映射扫描mbox文件，逐封产出 (起始偏移, 结束偏移, memoryview切片)
+
+    分隔符用mmap.find查找，邮件内容不复制到Python堆中；产出的切片只在
+    下一次迭代前有效，需要保留的内容由调用方自行复制（例如只复制头部）。
+    """
+    with open(mbox_path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size <= start_offset:
+            return
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(mm)
+        try:
+            needle = b'\n' + MBOX_SEPARATOR
+            pos = start_offset
+            while pos < size:
+                idx = mm.find(needle, pos + 1)
+                end = size if idx < 0 else idx + 1
+                part = view[pos:end]
+                try:
+                    yield pos, end, part
+                finally:
+                    part.release()
+                pos = end
+        finally:
+            view.release()
+            try:
+                mm.close()
+            except BufferError:
+                # 调用方仍持有切片时交给垃圾回收关闭
+                pass
+
+
+def message_head(raw, initial_size=8192):
+    """复制邮件开头到头部结束空行为止的字节，支持bytes和memoryview
+
+    只解析头部时不需要把整封邮件复制出来。
+    """
+    size = initial_size
+    while True:
+        head = bytes(raw[:size])
+        if size >= len(raw):
+            return head
+        _, message_bytes = split_envelope(head)
+        message_bytes = message_bytes.lstrip(b'\r\n')
+        if message_bytes and len(split_headers(message_bytes)) < len(message_bytes):
+            return head
+        size *= 4
+
+
+def split_envelope(raw_bytes):
+    """拆分mbox分隔行和邮件正文字节
+
+    返回 (分隔行, 邮件字节)；如果没有分隔行，分隔行为空字节串。
+    """
+    if raw_bytes.startswith(MBOX_SEPARATOR):
+        newline = raw_bytes.find(b'\n')
+        if newline < 0:
+            return raw_bytes, b''
+        return raw_bytes[:newline + 1], raw_bytes[newline + 1:]
+    return b'', raw_bytes
+
+
+
+# 指纹校验时对检查点之前多少字节计算哈希
+FINGERPRINT_TAIL_SIZE = 4096
+
+
+def mbox_fingerprint(mbox_path, offset):
+    """计算mbox文件在指定偏移处的指纹，用于判断文件是否只是被追加"""
+    st = os.stat(mbox_path)
+    return {
+        'offset': offset,
+        'size': st.st_size,
+        'mtime': st.st_mtime,
+        'inode': st.st_ino,
+        'tail_hash': _tail_hash(mbox_path, offset)
+    }
+
+
+def resume_offset(mbox_path, checkpoint):
+    """根据检查点计算可以继续扫描的偏移
+
+    文件被压缩、截断或替换时返回0，表示需要全量重新扫描。
+    """
+    if not checkpoint:
+        return 0
+    try:
+        st = os.stat(mbox_path)
+        offset = checkpoint.get('offset', 0)
+        if st.st_ino != checkpoint.get('inode') or st.st_size < offset:
+            return 0
+        if _tail_hash(mbox_path, offset) != checkpoint.get('tail_hash'):
+            return 0
+        return offset
+    except (OSError, ValueError):
+        return 0
+
+
+def _tail_hash(mbox_path, offset):
+    """计算偏移之前最后一段字节的哈希"""
+    start = max(offset - FINGERPRINT_TAIL_SIZE, 0)
+    with open(mbox_path, 'rb') as f:
+        f.seek(start)
+        data = f.read(offset - start)
+    return hashlib.sha1(data).hexdigest()
+
+
+def split_headers(message_bytes):
+    """截取邮件头部字节（到第一个空行为止），用于只解析头部的场景"""
+    for separator in (b'\n\n', b'\r\n\r\n'):
+        idx = message_bytes.find(separator)
+        if idx >= 0:
+            return message_bytes[:idx + len(separator)]
+    return message_bytes
+
+
+def compact_mbox(mbox_path, drop_ranges, chunk_size=DEFAULT_CHUNK_SIZE):
+    """一次遍历删除mbox中指定的字节区间，返回删除的字节数
+
+    保留的区间原样复制到同目录的临时文件（不重新序列化邮件），
+    然后原子替换源文件。复制最后一段和替换文件时对源文件加flock排他锁；
+    不使用flock的程序（例如Thunderbird）在替换前后仍追加到旧文件的内容，
+    替换后从旧文件补到新文件末尾，复制期间追加的内容不会丢失。
+    """
+    ranges = _merge_ranges(drop_ranges)
+    if not ranges:
+        return 0
+
+    directory = os.path.dirname(os.path.abspath(mbox_path))
+    fd, tmp_path = tempfile.mkstemp(prefix='.compact-', dir=directory)
+    removed = 0
+    try:
+        with open(mbox_path, 'rb') as src:
+            with os.fdopen(fd, 'wb') as dst:
+                pos = 0
+                for start, end in ranges:
+                    _copy_bytes(src, dst, pos, start - pos, chunk_size)
+                    removed += end - start
+                    pos = end
+                # 先不加锁复制到当前末尾，加锁后只需要复制这期间新追加的少量内容
+                pos += _copy_bytes(src, dst, pos, None, chunk_size)
+                _lock(src)
+                pos += _copy_bytes(src, dst, pos, None, chunk_size)
+                dst.flush()
+                os.fsync(dst.fileno())
+            shutil.copymode(mbox_path, tmp_path)
+            os.replace(tmp_path, mbox_path)
+            # 替换前后没有加锁的程序仍可能追加到旧文件，补到新文件末尾
+            if os.fstat(src.fileno()).st_size > pos:
+                with open(mbox_path, 'ab') as dst:
+                    _copy_bytes(src, dst, pos, None, chunk_size)
+                    dst.flush()
+                    os.fsync(dst.fileno())
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return removed
+
+
+def _lock(f):
+    """对文件加flock排他锁（文件关闭时释放），没有fcntl的系统上不加锁"""
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+
+
+def shift_offset(offset, drop_ranges):
+    """计算删除若干区间后，原偏移在新文件中的位置"""
+    shifted = offset
+    for start, end in _merge_ranges(drop_ranges):
+        if start >= offset:
+            break
+        shifted -= min(end, offset) - start
+    return shifted
+
+
+def _merge_ranges(ranges):
+    """排序并合并重叠的字节区间"""
+    merged = []
+    for start, end in sorted(r for r in ranges if r[1] > r[0]):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def _copy_bytes(src, dst, offset, length, chunk_size):
+    """从源文件指定偏移复制length字节（None表示复制到文件末尾），返回复制的字节数"""
+    src.seek(offset)
+    copied = 0
+    while length is None or copied < length:
+        size = chunk_size if length is None else min(chunk_size, length - copied)
+        chunk = src.read(size)
+        if not chunk:
+            break
+        dst.write(chunk)
+        copied += len(chunk)
+    return copied
+
+
+def parse_mozilla_status(value):
+    """解析X-Mozilla-Status头部的十六进制标志位"""
+    try:
+        return int(str(value).strip(), 16)
+    except (TypeError, ValueError):
+        return 0
+
+
+def set_mozilla_status_flag(mbox_path, ranges, flag=MOZILLA_STATUS_EXPUNGED):
+    """在原位置设置邮件X-Mozilla-Status头部的标志位，返回成功设置的区间
+
+    标志位是固定4位十六进制，改写不会改变文件长度；没有该头部的邮件不做处理，
+    由调用方改用其他方式删除。
+    """
+    flagged = []
+    with open(mbox_path, 'r+b') as f:
+        for start, end in ranges:
+            f.seek(start)
+            head = f.read(min(end - start, STATUS_SCAN_LIMIT))
+            envelope, message_bytes = split_envelope(head)
+            match = MOZILLA_STATUS_PATTERN.search(split_headers(message_bytes))
+            if not match:
+                continue
+            value = int(match.group(1), 16) | flag
+            f.seek(start + len(envelope) + match.start(1))
+            f.write(b'%04x' % value)
+            flagged.append((start, end))
+        f.flush()
+        os.fsync(f.fileno())
+    return flagged
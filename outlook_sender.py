@@ -264,6 +264,10 @@ class OutlookPWASender:
             print(f"❌ AppleScript执行失败: {e.stderr}")
             raise Exception(f"AppleScript执行失败: {e.stderr}")
     
+    def send_reply(self, reply_msg, to_addr, subject, body_text, auto_send=True):
+        """发送回复邮件（发送后端接口）"""
+        return self.send_email(to_addr, subject, body_text, auto_send=auto_send)
+    
     def create_draft_file(self, to_addr, subject, body_text, body_html=None, filename=None):
         """创建邮件草稿文件 (备用方案)"""
         if not filename:
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+已处理邮件记录存储
+
+用SQLite保存已处理邮件的Message-ID（唯一索引），每次批准只插入一行，
+不再重写整个processed_emails.json；全部记录在首次使用时加载到内存，
+监控期间的多次扫描共用同一份集合。
+
+可选的布隆过滤器保存在数据库旁边，启动时内存映射加载，不需要读取全部记录：
+过滤器判断"一定未处理"时直接返回，只有可能命中时才查询数据库。
+"""
+
+import os
+import math
+import mmap
+import json
+import time
+import uuid
+import struct
+import sqlite3
+import hashlib
+
+# 布隆过滤器文件头: 魔数, 位数, 哈希函数个数, 设计容量, 已同步到的数据库rowid, 数据库标识
+BLOOM_MAGIC = b'EABLOOM2'
+BLOOM_HEADER = struct.Struct('<8sQQQQ16s')
+
+# 布隆过滤器的最小容量和目标误判率
+BLOOM_MIN_CAPACITY = 100000
+BLOOM_ERROR_RATE = 0.001
+
+# 每添加多少条记录把过滤器写回磁盘一次（关闭时也会写回）
+BLOOM_FLUSH_BATCH = 100
+
+
+class BloomFilter:
+    """持久化到文件、通过mmap读写的布隆过滤器"""
+
+    def __init__(self, path, capacity=BLOOM_MIN_CAPACITY, error_rate=BLOOM_ERROR_RATE):
+        self.path = path
+        self._file = None
+        self._mm = None
+        if not self._open():
+            self._create(capacity, error_rate)
+
+    def _open(self):
+        """打开已有的过滤器文件，文件不存在或已损坏时返回False"""
+        if not os.path.exists(self.path):
+            return False
+        f = open(self.path, 'r+b')
+        try:
+            size = os.fstat(f.fileno()).st_size
+            if size < BLOOM_HEADER.size:
+                raise ValueError('文件过短')
+            magic, num_bits, num_hashes, capacity, synced_rowid, db_id = BLOOM_HEADER.unpack(
+                f.read(BLOOM_HEADER.size))
+            if magic != BLOOM_MAGIC or not num_bits or size != BLOOM_HEADER.size + (num_bits + 7) // 8:
+                raise ValueError('文件格式不正确')
+            self._mm = mmap.mmap(f.fileno(), 0)
+        except (OSError, ValueError, struct.error):
+            f.close()
+            return False
+        self._file = f
+        self.num_bits = num_bits
+        self.num_hashes = num_hashes
+        self.capacity = capacity
+        self.synced_rowid = synced_rowid
+        self.db_id = db_id
+        return True
+
+    def _create(self, capacity, error_rate):
+        """按容量和误判率创建一个空的过滤器文件"""
+        self.close()
+        num_bits = max(int(-capacity * math.log(error_rate) / (math.log(2) ** 2)), 8)
+        num_hashes = max(int(round(num_bits / capacity * math.log(2))), 1)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(BLOOM_HEADER.pack(BLOOM_MAGIC, num_bits, num_hashes, capacity, 0, bytes(16)))
+            f.truncate(BLOOM_HEADER.size + (num_bits + 7) // 8)
+        os.replace(tmp_path, self.path)
+        self._open()
+
+    def reset(self, capacity, error_rate=BLOOM_ERROR_RATE):
+        """清空并按新的容量重建过滤器"""
+        self._create(capacity, error_rate)
+
+    def close(self):
+        """关闭内存映射和文件"""
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _positions(self, key):
+        """双重哈希计算key对应的各个位"""
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, key):
+        """把key加入过滤器"""
+        mm = self._mm
+        for bit in self._positions(key):
+            index = BLOOM_HEADER.size + bit // 8
+            mm[index] = mm[index] | (1 << (bit % 8))
+
+    def __contains__(self, key):
+        """返回False表示一定不在集合中，True表示可能在"""
+        mm = self._mm
+        for bit in self._positions(key):
+            if not mm[BLOOM_HEADER.size + bit // 8] & (1 << (bit % 8)):
+                return False
+        return True
+
+    def set_synced_rowid(self, rowid, db_id=None):
+        """记录过滤器已包含的最大数据库rowid（以及对应的数据库标识）"""
+        self.synced_rowid = rowid
+        if db_id is not None:
+            self.db_id = db_id
+        self._mm[:BLOOM_HEADER.size] = BLOOM_HEADER.pack(
+            BLOOM_MAGIC, self.num_bits, self.num_hashes, self.capacity, rowid, self.db_id
+        )
+
+    def flush(self):
+        """把修改写回磁盘"""
+        self._mm.flush()
+
+
+class ProcessedEmailStore:
+    def __init__(self, db_path='processed_emails.db', bloom_path=None):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self._create_tables()
+        self._keys = None
+        self.bloom = None
+        self._unflushed = 0  # 过滤器中还没有写回磁盘的记录数
+        if bloom_path:
+            self.bloom = BloomFilter(bloom_path)
+            self._sync_bloom()
+
+    def _create_tables(self):
+        """创建记录表"""
+        with self.conn:
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS processed_emails (
+                    message_id TEXT PRIMARY KEY,
+                    processed_time TEXT
+                )''')
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS meta (
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+                )''')
+            # 数据库标识：过滤器记录它对应的数据库，数据库文件被替换后标识不同，过滤器需要重建
+            self.conn.execute("INSERT OR IGNORE INTO meta VALUES ('db_id', ?)", (uuid.uuid4().hex,))
+        self.db_id = bytes.fromhex(
+            self.conn.execute("SELECT value FROM meta WHERE key = 'db_id'").fetchone()[0])
+
+    def close(self):
+        """关闭数据库连接（先把过滤器写回磁盘）"""
+        if self.bloom:
+            self.bloom.flush()
+            self.bloom.close()
+        self.conn.close()
+
+    def _sync_bloom(self):
+        """把过滤器之后新增的记录补进布隆过滤器，数据库被替换或超出容量时重建"""
+        max_rowid = self.conn.execute('SELECT COALESCE(MAX(rowid), 0) FROM processed_emails').fetchone()[0]
+        bloom = self.bloom
+        # 记录数超过设计容量后误判率迅速上升，先检查容量再判断是否已同步
+        if bloom.db_id != self.db_id or bloom.synced_rowid > max_rowid or max_rowid > bloom.capacity:
+            bloom.reset(max(max_rowid * 2, BLOOM_MIN_CAPACITY))
+        elif bloom.synced_rowid == max_rowid:
+            return
+        for (message_id,) in self.conn.execute(
+                'SELECT message_id FROM processed_emails WHERE rowid > ?', (bloom.synced_rowid,)):
+            bloom.add(message_id)
+        bloom.set_synced_rowid(max_rowid, self.db_id)
+        bloom.flush()
+        self._unflushed = 0
+
+    def load(self):
+        """把全部记录加载到内存（只在首次调用时读取数据库）"""
+        if self._keys is None:
+            self._keys = {row[0] for row in self.conn.execute('SELECT message_id FROM processed_emails')}
+        return self._keys
+
+    def __contains__(self, message_id):
+        if self.bloom is None:
+            return message_id in self.load()
+        if message_id not in self.bloom:
+            return False
+        # 过滤器可能误判，命中时以数据库为准
+        return self.conn.execute(
+            'SELECT 1 FROM processed_emails WHERE message_id = ?', (message_id,)
+        ).fetchone() is not None
+
+    def __len__(self):
+        if self.bloom is None:
+            return len(self.load())
+        return self.conn.execute('SELECT COUNT(*) FROM processed_emails').fetchone()[0]
+
+    def add(self, message_id, processed_time=None):
+        """记录一封已处理的邮件，立即写入数据库，防止意外中断时丢失进度"""
+        if self.bloom is None and message_id in self.load():
+            return False
+        with self.conn:
+            cursor = self.conn.execute(
+                'INSERT OR IGNORE INTO processed_emails VALUES (?, ?)',
+                (message_id, processed_time or time.strftime('%Y-%m-%d %H:%M:%S'))
+            )
+        if not cursor.rowcount:
+            return False
+        if self._keys is not None:
+            self._keys.add(message_id)
+        if self.bloom is not None:
+            if cursor.lastrowid == self.bloom.synced_rowid + 1 and cursor.lastrowid <= self.bloom.capacity:
+                self.bloom.add(message_id)
+                self.bloom.set_synced_rowid(cursor.lastrowid)
+                # 每条记录都已写入数据库，过滤器分批写回磁盘
+                self._unflushed += 1
+                if self._unflushed >= BLOOM_FLUSH_BATCH:
+                    self.bloom.flush()
+                    self._unflushed = 0
+            else:
+                # 其他进程也写入了数据库，或超出了过滤器容量：补齐或重建过滤器
+                self._sync_bloom()
+        return True
+
+    def migrate_json(self, json_path):
+        """从旧的processed_emails.json导入记录（只导入一次），返回导入的数量"""
+        if not json_path or not os.path.exists(json_path):
+            return 0
+        source = os.path.abspath(json_path)
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'migrated_json'").fetchone()
+        if row and row[0] == source:
+            return 0
+
+        with open(json_path, 'r', encoding='utf-8') as f:
+            message_ids = json.load(f)
+
+        with self.conn:
+            before = self.conn.total_changes
+            self.conn.executemany(
+                'INSERT OR IGNORE INTO processed_emails (message_id) VALUES (?)',
+                ((message_id,) for message_id in message_ids)
+            )
+            imported = self.conn.total_changes - before
+            self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('migrated_json', ?)", (source,))
+        self._keys = None
+        if self.bloom is not None:
+            self._sync_bloom()
+        return imported
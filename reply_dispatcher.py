@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+并发回复发送
+
+非图形界面的发送方式（SMTP等）不需要逐封发送：asyncio事件循环在后台线程中运行，
+阻塞的发送函数放到线程池中执行，信号量限制同时发送的邮件数，
+发给同一收件人的邮件按最小间隔错开。每封邮件的发送结果通过Future返回，
+调用方只为确认发送成功的邮件更新已处理记录和处理汇总。
+"""
+
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from email.utils import parseaddr
+
+# 默认同时发送的邮件数
+DEFAULT_SEND_CONCURRENCY = 4
+
+
+class ReplyDispatcher:
+    def __init__(self, send_func, concurrency=DEFAULT_SEND_CONCURRENCY, recipient_interval=0, logger=None):
+        """send_func(reply_msg, *args) 阻塞发送一封邮件，返回是否成功"""
+        self.send_func = send_func
+        self.concurrency = max(concurrency, 1)
+        self.recipient_interval = max(recipient_interval, 0)
+        self.logger = logger
+        self._next_send = {}  # 收件人 -> 下一次允许发送的时间
+        self._pending = set()  # 尚未完成的发送Future
+        self._pending_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='reply-sender')
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name='reply-dispatcher', daemon=True)
+        self._thread.start()
+        self._semaphore = asyncio.run_coroutine_threadsafe(self._create_semaphore(), self._loop).result()
+
+    async def _create_semaphore(self):
+        """在事件循环中创建限制同时发送数量的信号量"""
+        return asyncio.Semaphore(self.concurrency)
+
+    def submit(self, reply_msg, *args):
+        """提交一封回复邮件，返回Future，结果为是否发送成功（发送异常时为False）"""
+        future = asyncio.run_coroutine_threadsafe(self._dispatch(reply_msg, args), self._loop)
+        with self._pending_lock:
+            self._pending.add(future)
+        future.add_done_callback(self._discard_pending)
+        return future
+
+    def _discard_pending(self, future):
+        with self._pending_lock:
+            self._pending.discard(future)
+
+    async def _wait_for_recipient(self, recipient):
+        """按收件人预约发送时间，与上一封发给同一收件人的邮件至少间隔recipient_interval秒"""
+        if not self.recipient_interval or not recipient:
+            return
+        now = time.monotonic()
+        send_at = max(now, self._next_send.get(recipient, now))
+        self._next_send[recipient] = send_at + self.recipient_interval
+        if send_at > now:
+            await asyncio.sleep(send_at - now)
+
+    async def _dispatch(self, reply_msg, args):
+        """等待收件人间隔和发送名额，在线程池中发送"""
+        recipient = parseaddr(reply_msg['To'] or '')[1].lower()
+        await self._wait_for_recipient(recipient)
+        async with self._semaphore:
+            try:
+                return bool(await self._loop.run_in_executor(self._executor, self.send_func, reply_msg, *args))
+            except Exception as e:
+                if self.logger:
+                    self.logger.error(f"并发发送回复邮件失败: {e}")
+                return False
+
+    def close(self):
+        """等待已提交的邮件发送完成后停止事件循环和发送线程"""
+        with self._pending_lock:
+            pending = list(self._pending)
+        wait(pending)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._executor.shutdown(wait=True)
+        self._loop.close()
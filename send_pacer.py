@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+自适应发送节奏控制
+
+发送命令（osascript等）返回后，通过Thunderbird发件箱和已发送文件夹的变化判断邮件是否真正发出：
+已发送文件夹变大且发件箱不再变大时视为完成，没有可检测的文件夹时以发送进程退出为准。
+已发送邮件保存在IMAP服务器上时本地已发送文件夹不会变大，连续几次检测超时后改为只检测发件箱。
+两次发送之间的间隔在下限和上限之间调整：发送成功后逐步缩短，失败时按倍数放大，
+并在日志中记录实际达到的发送速率（封/分钟）。
+"""
+
+import os
+import time
+from collections import deque
+
+# 检测发送完成时轮询文件夹的间隔（秒）
+COMPLETION_POLL_SECONDS = 0.5
+
+# 计算发送速率时使用的最近发送次数
+RATE_WINDOW_SENDS = 20
+
+# 已发送文件夹连续这么多次没有变化时不再检测它，只检测发件箱
+SENT_FOLDER_MAX_TIMEOUTS = 3
+
+
+class SendPacer:
+    def __init__(self, min_interval=2, max_interval=15, backoff_factor=2, outbox_path=None, sent_path=None, logger=None):
+        self.min_interval = max(min_interval, 0)
+        self.max_interval = max(max_interval, self.min_interval)
+        self.backoff_factor = max(backoff_factor, 1)
+        self.outbox_path = outbox_path
+        self.sent_path = sent_path
+        self.logger = logger
+        self.interval = self.min_interval  # 当前的发送间隔
+        self._last_done = None  # 上一次发送完成的时间
+        self._sizes = None  # 发送前发件箱和已发送文件夹的大小
+        self._completed = deque(maxlen=RATE_WINDOW_SENDS)  # 最近发送成功的完成时间
+        self._sent_timeouts = 0  # 已发送文件夹连续没有变化的次数
+
+    def _log(self, message):
+        if self.logger:
+            self.logger.info(message)
+
+    def _folder_sizes(self):
+        """返回 (发件箱大小, 已发送文件夹大小)，文件夹不存在或不再检测时为None"""
+        sizes = []
+        for path in (self.outbox_path, self.sent_path):
+            try:
+                sizes.append(os.path.getsize(path) if path else None)
+            except OSError:
+                sizes.append(None)
+        return tuple(sizes)
+
+    def wait_before_send(self):
+        """距离上一次发送完成不足当前间隔时等待，返回等待的秒数"""
+        wait_time = 0
+        if self._last_done is not None:
+            wait_time = self._last_done + self.interval - time.monotonic()
+            if wait_time > 0:
+                self._log(f"等待 {wait_time:.1f} 秒后发送下一封邮件（当前间隔 {self.interval:.1f} 秒）")
+                time.sleep(wait_time)
+            else:
+                wait_time = 0
+        self._sizes = self._folder_sizes()
+        return wait_time
+
+    def wait_for_completion(self):
+        """发送命令返回后等待邮件客户端完成发送，返回是否检测到完成
+
+        最多等待发送间隔上限；没有可检测的文件夹时直接视为完成。
+        """
+        outbox_before, sent_before = self._sizes or self._folder_sizes()
+        if outbox_before is None and sent_before is None:
+            return True
+
+        deadline = time.monotonic() + self.max_interval
+        last_outbox = outbox_before
+        while True:
+            outbox_size, sent_size = self._folder_sizes()
+            if sent_before is not None:
+                # 已发送文件夹变大，且发件箱没有继续变大
+                done = sent_size is not None and sent_size > sent_before and (
+                    outbox_size is None or last_outbox is None or outbox_size <= last_outbox
+                )
+            else:
+                # 只有发件箱时，发件箱不再变大即视为发送队列已处理
+                done = outbox_size is None or outbox_size <= last_outbox
+            if done:
+                return True
+            if time.monotonic() >= deadline:
+                return False
+            last_outbox = outbox_size
+            time.sleep(COMPLETION_POLL_SECONDS)
+
+    def _back_off(self):
+        """按倍数放大发送间隔，不超过上限"""
+        self.interval = min(self.max_interval, max(self.interval, self.min_interval, 1) * self.backoff_factor)
+
+    def _record_sent_timeout(self):
+        """已发送文件夹连续多次没有变化时改为只检测发件箱（已发送邮件可能保存在IMAP服务器上）"""
+        self._sent_timeouts += 1
+        if self._sent_timeouts >= SENT_FOLDER_MAX_TIMEOUTS:
+            if self.logger:
+                self.logger.warning(
+                    f"已发送文件夹连续 {self._sent_timeouts} 次没有变化（已发送邮件可能保存在IMAP服务器上），"
+                    f"改为只检测发件箱: {self.sent_path}"
+                )
+            self.sent_path = None
+            self._sent_timeouts = 0
+
+    def record_send(self, success, check_completion=True):
+        """记录一次发送结果并调整下一次的发送间隔"""
+        if success:
+            if not check_completion or self.wait_for_completion():
+                # 邮件客户端跟得上，逐步缩短间隔
+                self.interval = max(self.min_interval, self.interval / self.backoff_factor)
+                self._sent_timeouts = 0
+            else:
+                if self.logger:
+                    self.logger.warning("未检测到邮件客户端完成发送，放大发送间隔")
+                self._back_off()
+                if self.sent_path:
+                    self._record_sent_timeout()
+            self._last_done = time.monotonic()
+            self._completed.append(self._last_done)
+            self._log(f"发送速率: {self.sends_per_minute():.1f} 封/分钟（下一次间隔 {self.interval:.1f} 秒）")
+        else:
+            # 发送失败时放大间隔，避免快速重试造成更多问题
+            self._last_done = time.monotonic()
+            self._back_off()
+            self._log(f"发送失败，下一次间隔放大到 {self.interval:.1f} 秒")
+        self._sizes = None
+
+    def sends_per_minute(self):
+        """最近几次发送实际达到的速率（封/分钟）"""
+        if len(self._completed) < 2:
+            return 0.0
+        elapsed = self._completed[-1] - self._completed[0]
+        if elapsed <= 0:
+            return 0.0
+        return (len(self._completed) - 1) * 60 / elapsed
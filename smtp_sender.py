@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+SMTP邮件发送工具
+
+直接通过SMTP中继提交回复邮件，不依赖图形界面，适合Linux等没有AppleScript的环境。
+连接在多次发送之间保持并放在连接池中复用，只有首次发送（或连接断开后）需要建立连接和登录；
+复用的连接在下一封邮件前发送RSET，服务器支持PIPELINING时RSET、MAIL、RCPT一次发出，
+只等待一次往返。空闲超过一定时间的连接在使用前重新建立，避免服务器已经超时断开。
+"""
+
+import io
+import sys
+import copy
+import time
+import queue
+import smtplib
+import itertools
+import threading
+import email.generator
+from email.utils import getaddresses
+
+# 连接池默认大小
+SMTP_POOL_SIZE = 2
+
+# 默认的连接超时（秒）
+SMTP_TIMEOUT = 30
+
+# 连接空闲超过这个时间（秒）后不再复用，直接重新连接（多数服务器几分钟无操作会断开）
+SMTP_IDLE_TIMEOUT = 60
+
+
+class SMTPConnectionPool:
+    """SMTP连接池：空闲连接放回池中复用，连接数不超过池大小"""
+
+    def __init__(self, host, port=25, username=None, password=None, security='starttls',
+                 pool_size=SMTP_POOL_SIZE, timeout=SMTP_TIMEOUT, idle_timeout=SMTP_IDLE_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.security = (security or 'none').lower()  # none, starttls 或 ssl
+        self.pool_size = max(pool_size, 1)
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.connects = 0  # 建立过的连接数
+        self._idle = queue.LifoQueue()  # (连接, 归还时间)
+        self._slots = threading.BoundedSemaphore(self.pool_size)
+
+    def _connect(self):
+        """建立一个新的SMTP连接并登录"""
+        if self.security == 'ssl':
+            conn = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout)
+        else:
+            conn = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        self.connects += 1
+        try:
+            conn.ehlo()
+            if self.security == 'starttls':
+                conn.starttls()
+                conn.ehlo()
+            if self.username:
+                conn.login(self.username, self.password or '')
+        except Exception:
+            self._discard(conn)
+            raise
+        return conn
+
+    def acquire(self):
+        """取得一个连接，返回 (连接, 是否复用)
+
+        优先复用空闲连接（空闲太久的关闭后重新连接），池满时等待其他线程归还。
+        """
+        self._slots.acquire()
+        while True:
+            try:
+                conn, released_at = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if time.monotonic() - released_at <= self.idle_timeout:
+                return conn, True
+            self._discard(conn)
+        try:
+            return self._connect(), False
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, conn, broken=False):
+        """归还连接，连接已损坏时关闭它"""
+        if broken:
+            self._discard(conn)
+        else:
+            self._idle.put((conn, time.monotonic()))
+        self._slots.release()
+
+    def _discard(self, conn):
+        """关闭连接，忽略连接已断开的错误"""
+        try:
+            conn.quit()
+        except Exception:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def close(self):
+        """关闭所有空闲连接"""
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._discard(conn)
+
+
+def flatten_message(msg):
+    """从邮件头取得发件人和收件人，生成要提交的内容（与smtplib.send_message相同，去掉Bcc）"""
+    from_addr = getaddresses([msg['Sender'] or msg['From'] or ''])[0][1]
+    to_addrs = [addr for _, addr in getaddresses(msg.get_all('To', []) + msg.get_all('Cc', []) + msg.get_all('Bcc', []))]
+    msg_copy = copy.copy(msg)
+    del msg_copy['Bcc']
+    with io.BytesIO() as buffer:
+        email.generator.BytesGenerator(buffer).flatten(msg_copy, linesep='\r\n')
+        return from_addr, to_addrs, buffer.getvalue()
+
+
+class SMTPSender:
+    def __init__(self, host, port=25, username=None, password=None, security='starttls',
+                 pool_size=SMTP_POOL_SIZE, timeout=SMTP_TIMEOUT, idle_timeout=SMTP_IDLE_TIMEOUT, logger=None):
+        self.pool = SMTPConnectionPool(host, port, username, password, security, pool_size, timeout, idle_timeout)
+        self.logger = logger
+        self._draft_numbers = itertools.count(1)  # 同一秒内保存多个草稿时区分文件名
+
+    def _submit(self, conn, from_addr, to_addrs, content, reset):
+        """在一个连接上完成一次邮件事务，返回被拒绝的收件人
+
+        reset为True时先发送RSET清除上一封邮件的状态；服务器支持PIPELINING时
+        RSET、MAIL FROM和全部RCPT TO一次写出，再依次读取应答。
+        """
+        mail_options = ''
+        if conn.has_extn('8bitmime') and max(content, default=0) > 127:
+            mail_options = ' BODY=8BITMIME'
+        commands = []
+        if reset:
+            commands.append('RSET')
+        commands.append(f'MAIL FROM:{smtplib.quoteaddr(from_addr)}{mail_options}')
+        commands.extend(f'RCPT TO:{smtplib.quoteaddr(addr)}' for addr in to_addrs)
+
+        if conn.has_extn('pipelining'):
+            conn.send(''.join(command + '\r\n' for command in commands))
+            replies = [conn.getreply() for _ in commands]
+        else:
+            replies = []
+            for command in commands:
+                conn.putcmd(command)
+                replies.append(conn.getreply())
+
+        if reset:
+            code, resp = replies.pop(0)
+            if code != 250:
+                # RSET失败说明连接已不可用（例如服务器空闲超时），按断开处理重新连接
+                raise smtplib.SMTPServerDisconnected(f"RSET失败: {code} {resp}")
+        code, resp = replies.pop(0)
+        if code != 250:
+            if code == 421:
+                conn.close()
+            raise smtplib.SMTPSenderRefused(code, resp, from_addr)
+        refused = {}
+        for addr, (code, resp) in zip(to_addrs, replies):
+            if code not in (250, 251):
+                refused[addr] = (code, resp)
+        if len(refused) == len(to_addrs):
+            raise smtplib.SMTPRecipientsRefused(refused)
+
+        code, resp = conn.data(content)
+        if code != 250:
+            if code == 421:
+                conn.close()
+            raise smtplib.SMTPDataError(code, resp)
+        return refused
+
+    def send_message(self, msg):
+        """提交一封邮件，连接断开时重新连接重试一次"""
+        from_addr, to_addrs, content = flatten_message(msg)
+        if not to_addrs:
+            raise ValueError("邮件没有收件人")
+        for attempt in range(2):
+            conn, reused = self.pool.acquire()
+            try:
+                refused = self._submit(conn, from_addr, to_addrs, content, reset=reused)
+            except (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused) as e:
+                # 服务器拒绝邮件时连接可以继续使用（下一封邮件前会RSET）；421表示服务器要关闭连接
+                if getattr(e, 'smtp_code', None) != 421:
+                    self.pool.release(conn)
+                    raise
+                self.pool.release(conn, broken=True)
+                if attempt:
+                    raise
+            except OSError as e:
+                # 连接断开或超时（SMTPServerDisconnected也是OSError）
+                self.pool.release(conn, broken=True)
+                if attempt:
+                    raise
+                if self.logger:
+                    self.logger.warning(f"SMTP连接不可用，重新连接: {e}")
+            except Exception:
+                self.pool.release(conn, broken=True)
+                raise
+            else:
+                self.pool.release(conn)
+                if refused and self.logger:
+                    self.logger.warning(f"部分收件人被拒绝: {', '.join(refused)}")
+                return refused
+
+    def save_draft(self, reply_msg):
+        """把回复邮件保存为.eml草稿文件（与发送失败时的备用方案相同），返回文件名"""
+        draft_file = f"approval_reply_{int(time.time())}_{next(self._draft_numbers)}.eml"
+        with open(draft_file, 'w', encoding='utf-8') as f:
+            f.write(reply_msg.as_string())
+        return draft_file
+
+    def send_reply(self, reply_msg, to_addr, subject, body_text, auto_send=True):
+        """发送回复邮件（发送后端接口）
+
+        SMTP没有撰写窗口，auto_send为False（send_mode = draft）时只保存.eml草稿文件，不提交到服务器。
+        """
+        if not auto_send:
+            draft_file = self.save_draft(reply_msg)
+            print(f"📝 草稿模式，未发送，已保存邮件草稿: {draft_file}")
+            if self.logger:
+                self.logger.info(f"已保存邮件草稿: {draft_file}")
+            return True
+
+        start_time = time.monotonic()
+        self.send_message(reply_msg)
+        recipients = ', '.join(addr for _, addr in getaddresses([to_addr or '']))
+        print(f"✅ 已通过SMTP提交邮件: {recipients} ({(time.monotonic() - start_time) * 1000:.0f} ms)")
+        return True
+
+    def close(self):
+        """关闭连接池中的连接"""
+        self.pool.close()
+
+
+def test_smtp_sender():
+    """测试SMTP发送：python smtp_sender.py host [port]"""
+    if len(sys.argv) < 2:
+        print("用法: python smtp_sender.py <SMTP服务器> [端口]")
+        return
+
+    from email.mime.text import MIMEText
+    from email.utils import formatdate, make_msgid
+
+    host = sys.argv[1]
+    port = int(sys.argv[2]) if len(sys.argv) > 2 else 25
+    sender = SMTPSender(host, port, security='none')
+
+    msg = MIMEText("Ref:MSG85395759", 'plain', 'utf-8')
+    msg['From'] = "Edward Li <eli23@lululemon.com>"
+    msg['To'] = "luluprod@service-now.com"
+    msg['Subject'] = "Re: RITM1602185 - approve"
+    msg['Date'] = formatdate(localtime=True)
+    msg['Message-ID'] = make_msgid()
+
+    print("测试SMTP发送...")
+    try:
+        sender.send_reply(msg, msg['To'], msg['Subject'], "Ref:MSG85395759")
+        print("邮件发送成功！")
+    except Exception as e:
+        print(f"邮件发送失败！{e}")
+    finally:
+        sender.close()
+
+
+if __name__ == "__main__":
+    test_smtp_sender()
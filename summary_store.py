@@ -0,0 +1,425 @@
+#!/usr/bin/env python3
+"""
+处理汇总记录存储
+
+每批准一封邮件只追加一条记录，不再每次重新读取并重写整个processing_summary.json。
+支持两种后端：
+- sqlite: SQLite数据库（WAL模式），默认
+- jsonl: 每行一条JSON记录的追加日志，按批次fsync
+首次使用时自动导入旧的processing_summary.json。
+
+两种后端都按处理日期建立索引，按日期范围查询时只读取匹配的记录；
+sqlite后端还按单号和Short description建立了索引。
+
+每追加一条记录同时增量更新按天/按周的汇总计数（总数、请求类型、申请人），
+统计报表只读取这些计数，不需要扫描原始记录。
+"""
+
+import os
+import json
+import sqlite3
+import datetime
+
+# 旧版汇总文件
+LEGACY_SUMMARY_FILE = 'processing_summary.json'
+
+# 各后端默认的存储文件
+DEFAULT_SUMMARY_FILES = {
+    'sqlite': 'processing_summary.db',
+    'jsonl': 'processing_summary.jsonl'
+}
+
+# JSONL后端每追加多少条记录fsync一次
+JSONL_FSYNC_BATCH = 20
+
+
+def next_date(date_str):
+    """返回YYYY-MM-DD格式日期的下一天"""
+    date = datetime.datetime.strptime(date_str, '%Y-%m-%d').date()
+    return (date + datetime.timedelta(days=1)).strftime('%Y-%m-%d')
+
+
+# 汇总计数的周期和维度
+ROLLUP_PERIODS = ('day', 'week')
+ROLLUP_DIMENSIONS = ('total', 'type', 'requester')
+
+# 请求类型：Short description前缀 -> 类型名称
+REQUEST_TYPES = (
+    ('china cloud account and permission request', 'China Cloud Account'),
+    ('china cloud resource request', 'China Cloud Resource'),
+    ('cn-server & db access control', 'CN-Server & DB Access Control'),
+)
+OTHER_REQUEST_TYPE = 'Other'
+
+
+def request_type(short_description):
+    """根据Short description判断请求类型"""
+    short_desc_lower = (short_description or '').lower()
+    for prefix, name in REQUEST_TYPES:
+        if short_desc_lower.startswith(prefix):
+            return name
+    return OTHER_REQUEST_TYPE
+
+
+def period_start(date_str, period):
+    """返回日期所在周期的起始日期（周从周一开始）"""
+    if period == 'week':
+        date = datetime.datetime.strptime(date_str, '%Y-%m-%d').date()
+        return (date - datetime.timedelta(days=date.weekday())).strftime('%Y-%m-%d')
+    return date_str
+
+
+def rollup_keys(record):
+    """返回一条记录需要累加的 (周期, 周期起始日期, 维度, 键)，处理时间无效的记录不计入"""
+    date = str(record.get('processed_time', ''))[:10]
+    try:
+        starts = {period: period_start(date, period) for period in ROLLUP_PERIODS}
+    except ValueError:
+        return []
+    values = {
+        'total': '',
+        'type': request_type(record.get('short_description')),
+        'requester': record.get('requested_by') or 'N/A'
+    }
+    return [
+        (period, starts[period], dimension, values[dimension])
+        for period in ROLLUP_PERIODS
+        for dimension in ROLLUP_DIMENSIONS
+    ]
+
+
+def add_rollup(rollups, period, start, dimension, key, count=1):
+    """累加到 {周期: {起始日期: {维度: {键: 计数}}}} 结构中"""
+    counts = rollups.setdefault(period, {}).setdefault(start, {}).setdefault(dimension, {})
+    counts[key] = counts.get(key, 0) + count
+
+
+def filter_rollups(rollups, period, start_date=None, end_date=None):
+    """按日期范围筛选某个周期的汇总计数，返回按起始日期排序的 [(起始日期, {维度: {键: 计数}})]"""
+    if start_date:
+        start_date = period_start(start_date, period)
+    return [
+        (start, counts)
+        for start, counts in sorted(rollups.get(period, {}).items())
+        if (not start_date or start >= start_date) and (not end_date or start <= end_date)
+    ]
+
+
+def record_matches(record, ticket_number=None, short_description=None):
+    """检查记录是否匹配单号和Short description前缀（都不区分大小写）"""
+    if ticket_number and (record.get('ticket_number') or '').lower() != ticket_number.lower():
+        return False
+    if short_description and not (record.get('short_description') or '').lower().startswith(short_description.lower()):
+        return False
+    return True
+
+
+class SqliteSummaryStore:
+    """SQLite汇总存储，完整记录以JSON保存，常用字段单独成列"""
+
+    def __init__(self, db_path=DEFAULT_SUMMARY_FILES['sqlite']):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self._create_tables()
+
+    def _create_tables(self):
+        """创建汇总表"""
+        with self.conn:
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS summary (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    processed_time TEXT,
+                    ticket_number TEXT,
+                    short_description TEXT,
+                    record TEXT NOT NULL
+                )''')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_summary_time ON summary (processed_time)')
+            self.conn.execute(
+                'CREATE INDEX IF NOT EXISTS idx_summary_ticket ON summary (ticket_number COLLATE NOCASE)'
+            )
+            self.conn.execute(
+                'CREATE INDEX IF NOT EXISTS idx_summary_description ON summary (short_description COLLATE NOCASE)'
+            )
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS rollups (
+                    period TEXT NOT NULL,
+                    period_start TEXT NOT NULL,
+                    dimension TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    count INTEGER NOT NULL,
+                    PRIMARY KEY (period, period_start, dimension, key)
+                )''')
+            # 已有记录但还没有汇总计数时（从旧版本升级）一次性补算
+            if (self.conn.execute('SELECT 1 FROM rollups LIMIT 1').fetchone() is None and
+                    self.conn.execute('SELECT 1 FROM summary LIMIT 1').fetchone() is not None):
+                for (record,) in self.conn.execute('SELECT record FROM summary').fetchall():
+                    self._add_rollups(json.loads(record))
+
+    def append(self, record):
+        """追加一条汇总记录"""
+        with self.conn:
+            self._insert(record)
+
+    def append_many(self, records):
+        """在一个事务中追加多条汇总记录"""
+        with self.conn:
+            for record in records:
+                self._insert(record)
+
+    def _insert(self, record):
+        self.conn.execute(
+            'INSERT INTO summary (processed_time, ticket_number, short_description, record) VALUES (?, ?, ?, ?)',
+            (
+                record.get('processed_time', ''),
+                record.get('ticket_number', ''),
+                record.get('short_description', ''),
+                json.dumps(record, ensure_ascii=False)
+            )
+        )
+        self._add_rollups(record)
+
+    def _add_rollups(self, record):
+        """在当前事务中累加记录对应的汇总计数"""
+        self.conn.executemany(
+            'INSERT INTO rollups VALUES (?, ?, ?, ?, 1) '
+            'ON CONFLICT (period, period_start, dimension, key) DO UPDATE SET count = count + 1',
+            rollup_keys(record)
+        )
+
+    def rollups(self, period='day', start_date=None, end_date=None):
+        """读取汇总计数，返回 [(周期起始日期, {维度: {键: 计数}})]"""
+        conditions = ['period = ?']
+        params = [period]
+        if start_date:
+            conditions.append('period_start >= ?')
+            params.append(period_start(start_date, period))
+        if end_date:
+            conditions.append('period_start <= ?')
+            params.append(end_date)
+        rollups = {}
+        for start, dimension, key, count in self.conn.execute(
+                f"SELECT period_start, dimension, key, count FROM rollups WHERE {' AND '.join(conditions)}", params):
+            add_rollup(rollups, period, start, dimension, key, count)
+        return filter_rollups(rollups, period)
+
+    def records(self):
+        """按写入顺序返回全部记录"""
+        return self.query()
+
+    def query(self, start_date=None, end_date=None, ticket_number=None, short_description=None):
+        """按处理日期范围（含两端，YYYY-MM-DD）、单号、Short description前缀查询记录"""
+        return list(self.iter_query(start_date, end_date, ticket_number, short_description))
+
+    def iter_query(self, start_date=None, end_date=None, ticket_number=None, short_description=None):
+        """与query相同，但逐条产出记录（导出大量记录时内存占用不随记录数增长）"""
+        conditions = []
+        params = []
+        if start_date:
+            conditions.append('processed_time >= ?')
+            params.append(start_date)
+        if end_date:
+            conditions.append('processed_time < ?')
+            params.append(next_date(end_date))
+        if ticket_number:
+            conditions.append('ticket_number = ? COLLATE NOCASE')
+            params.append(ticket_number)
+        if short_description:
+            escaped = short_description.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            conditions.append("short_description LIKE ? ESCAPE '\\'")
+            params.append(escaped + '%')
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ''
+        # 单独的游标，迭代期间追加记录不会影响本次查询
+        cursor = self.conn.cursor()
+        for row in cursor.execute(f'SELECT record FROM summary{where} ORDER BY id', params):
+            yield json.loads(row[0])
+
+    def is_empty(self):
+        return self.conn.execute('SELECT 1 FROM summary LIMIT 1').fetchone() is None
+
+    def sync(self):
+        """SQLite每个事务提交后即已落盘，无需额外处理"""
+
+    def close(self):
+        """关闭数据库连接"""
+        self.conn.close()
+
+
+class JsonlSummaryStore:
+    """JSON Lines汇总存储，只追加写入，每JSONL_FSYNC_BATCH条记录fsync一次
+
+    旁边的.idx文件记录每个处理日期对应的字节区间（按日期查询时只读取这些区间）
+    和按天/按周的汇总计数。
+    """
+
+    def __init__(self, path=DEFAULT_SUMMARY_FILES['jsonl'], fsync_batch=JSONL_FSYNC_BATCH):
+        self.path = path
+        self.index_path = path + '.idx'
+        self.fsync_batch = max(fsync_batch, 1)
+        self._file = None
+        self._unsynced = 0
+        self._load_index()
+
+    def _open(self):
+        if self._file is None:
+            self._file = open(self.path, 'ab')
+        return self._file
+
+    def _load_index(self):
+        """加载日期索引，并补上索引之后追加的记录；文件被截断或替换时重建"""
+        self._indexed_size = 0
+        self._dates = {}
+        self._rollups = {}
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+            dates = {date: [list(span) for span in spans] for date, spans in index['dates'].items()}
+            self._indexed_size, self._dates, self._rollups = index['size'], dates, index['rollups']
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            pass
+
+        size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        if size < self._indexed_size:
+            self._indexed_size = 0
+            self._dates = {}
+            self._rollups = {}
+        if size > self._indexed_size:
+            with open(self.path, 'rb') as f:
+                f.seek(self._indexed_size)
+                offset = self._indexed_size
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        # 写到一半的最后一行，下次再索引
+                        break
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        record = {}
+                    self._index_line(record, offset, offset + len(line))
+                    offset += len(line)
+            self._save_index()
+
+    def _index_line(self, record, start, end):
+        """把一行记录的字节区间加入日期索引（连续的记录合并为一个区间），并累加汇总计数"""
+        date = str(record.get('processed_time', ''))[:10]
+        spans = self._dates.setdefault(date, [])
+        if spans and spans[-1][1] == start:
+            spans[-1][1] = end
+        else:
+            spans.append([start, end])
+        for key in rollup_keys(record):
+            add_rollup(self._rollups, *key)
+        self._indexed_size = end
+
+    def _save_index(self):
+        """原子写入日期索引"""
+        tmp_path = self.index_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'size': self._indexed_size, 'dates': self._dates, 'rollups': self._rollups}, f)
+        os.replace(tmp_path, self.index_path)
+
+    def append(self, record):
+        """追加一条汇总记录"""
+        self.append_many([record])
+
+    def append_many(self, records):
+        """追加多条汇总记录"""
+        f = self._open()
+        for record in records:
+            line = (json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8')
+            offset = f.tell()
+            f.write(line)
+            self._index_line(record, offset, offset + len(line))
+            self._unsynced += 1
+        f.flush()
+        if self._unsynced >= self.fsync_batch:
+            self.sync()
+
+    def records(self):
+        """按写入顺序返回全部记录（忽略写到一半的最后一行）"""
+        return self.query()
+
+    def query(self, start_date=None, end_date=None, ticket_number=None, short_description=None):
+        """按处理日期范围（含两端，YYYY-MM-DD）、单号、Short description前缀查询记录
+
+        有日期条件时只读取索引中匹配日期的字节区间，其余条件在读取后过滤。
+        """
+        return list(self.iter_query(start_date, end_date, ticket_number, short_description))
+
+    def iter_query(self, start_date=None, end_date=None, ticket_number=None, short_description=None):
+        """与query相同，但逐行读取并产出记录"""
+        if not os.path.exists(self.path):
+            return
+        if start_date or end_date:
+            spans = sorted(
+                span
+                for date, spans in self._dates.items()
+                if (not start_date or date >= start_date) and (not end_date or date <= end_date)
+                for span in spans
+            )
+        else:
+            spans = [[0, self._indexed_size]]
+
+        with open(self.path, 'rb') as f:
+            for start, end in spans:
+                f.seek(start)
+                pos = start
+                while pos < end:
+                    line = f.readline()
+                    if not line:
+                        break
+                    pos += len(line)
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    if record_matches(record, ticket_number, short_description):
+                        yield record
+
+    def rollups(self, period='day', start_date=None, end_date=None):
+        """读取汇总计数，返回 [(周期起始日期, {维度: {键: 计数}})]"""
+        return filter_rollups(self._rollups, period, start_date, end_date)
+
+    def is_empty(self):
+        return not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+
+    def sync(self):
+        """把已追加的记录fsync到磁盘，并保存日期索引"""
+        if self._file is not None and self._unsynced:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._unsynced = 0
+            self._save_index()
+
+    def close(self):
+        """fsync并关闭文件"""
+        if self._file is not None:
+            self.sync()
+            self._file.close()
+            self._file = None
+
+
+SUMMARY_BACKENDS = {
+    'sqlite': SqliteSummaryStore,
+    'jsonl': JsonlSummaryStore
+}
+
+
+def open_summary_store(backend='sqlite', path=None):
+    """按后端名称打开汇总存储"""
+    backend = (backend or 'sqlite').strip().lower()
+    if backend not in SUMMARY_BACKENDS:
+        raise ValueError(f"不支持的汇总存储后端: {backend}")
+    return SUMMARY_BACKENDS[backend](path or DEFAULT_SUMMARY_FILES[backend])
+
+
+def migrate_legacy_summary(store, legacy_path=LEGACY_SUMMARY_FILE):
+    """新存储为空时导入旧的processing_summary.json，返回导入的记录数"""
+    if not os.path.exists(legacy_path) or not store.is_empty():
+        return 0
+    with open(legacy_path, 'r', encoding='utf-8') as f:
+        records = json.load(f)
+    store.append_many(records)
+    store.sync()
+    return len(records)
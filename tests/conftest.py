@@ -0,0 +1,42 @@
+import os
+import sys
+import itertools
+
+import pytest
+
+# 模块都在仓库根目录下，测试直接导入
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def make_approver(tmp_path, monkeypatch):
+    """返回创建EmailAutoApprover的函数：在tmp_path写入config.ini（[DEFAULT]加上给定选项，以及默认的[EMAIL]）
+    并切换到tmp_path
+
+    测试结束时停止流水线和进程池，关闭发送后端和已处理邮件记录。
+    """
+    email_auto_approve = pytest.importorskip('email_auto_approve')
+    monkeypatch.chdir(tmp_path)
+    numbers = itertools.count()
+    approvers = []
+
+    def make(**options):
+        options.setdefault('thunderbird_profile_path', tmp_path)
+        config_file = tmp_path / f'config_{next(numbers)}.ini'
+        config_file.write_text(
+            "[DEFAULT]\n" + "".join(f"{key} = {value}\n" for key, value in options.items()) +
+            "[EMAIL]\n"
+            "from_name = Edward Li\n"
+            "from_email = eli23@lululemon.com\n"
+            "approval_message = Ref:MSG85395759\n",
+            encoding='utf-8'
+        )
+        approver = email_auto_approve.EmailAutoApprover(str(config_file))
+        approvers.append(approver)
+        return approver
+
+    yield make
+    for approver in approvers:
+        approver.stop_pipeline()
+        approver.close_email_senders()
+        approver.close_processed_store()
@@ -0,0 +1,258 @@
+"""
+原来逐个 re.search 的字段提取实现（去掉日志），作为field_extractor字段提取引擎的对照
+
+tests/test_field_extractor.py 用它检查两种实现的结果完全一致，
+benchmarks/bench_field_extractor.py 用它比较两种实现的速度。
+"""
+
+import re
+import random
+
+FLAGS = re.IGNORECASE | re.MULTILINE
+
+REQUESTED_BY_PATTERNS = [
+    r'Requested\s+by[:\s]*([^\r\n]+)',
+    r'Requested\s+for[:\s]*([^\r\n]+)',
+    r'Request\s+by[:\s]*([^\r\n]+)',
+    r'Request\s+for[:\s]*([^\r\n]+)'
+]
+
+REASON_PATTERNS = [
+    r'Reason\s+for\s+application[:\s]*([^\r\n]+)',
+    r'Application\s+reason[:\s]*([^\r\n]+)',
+    r'Reason[:\s]*([^\r\n]+)',
+    r'Justification[:\s]*([^\r\n]+)'
+]
+
+ENV_PATTERNS = [
+    r'Environment[:\s]*([^\r\n]+)',
+    r'Env[:\s]*([^\r\n]+)',
+    r'Environment\s*[:\s]*([^\r\n]+)'
+]
+
+
+def _first(body, patterns):
+    """按顺序逐个 re.search，返回第一个匹配的值"""
+    for pattern in patterns:
+        match = re.search(pattern, body, FLAGS)
+        if match:
+            return match.group(1).strip()
+    return ''
+
+
+def _block(body, start_match, next_field_patterns):
+    """从起始位置取到最早出现的下一个字段之前，清理分隔线和多余空白"""
+    remaining_text = body[start_match.end():]
+    end_pos = len(remaining_text)
+    for pattern in next_field_patterns:
+        match = re.search(pattern, remaining_text, FLAGS)
+        if match:
+            end_pos = min(end_pos, match.start())
+
+    cleaned_lines = []
+    for line in remaining_text[:end_pos].strip().split('\n'):
+        line = line.strip()
+        if (line and
+                not line.startswith('=') and
+                not line.startswith('-') and
+                not re.match(r'^[\s\-=_]+$', line) and
+                len(line.replace(' ', '').replace('\t', '')) > 0):
+            cleaned_lines.append(line)
+    if not cleaned_lines:
+        return ''
+    return re.sub(r'\s+', ' ', ' '.join(cleaned_lines)).strip()
+
+
+def _empty_fields():
+    return {'environment': '', 'required_permissions': '', 'reason_for_application': '', 'requested_by': ''}
+
+
+def extract_short_description(body):
+    if not body:
+        return ""
+    patterns = [
+        r'Short\s+description[:\s]*([^\r\n]+)',
+        r'Short\s+Description[:\s]*([^\r\n]+)',
+        r'(?:^|\n)\s*Description[:\s]*([^\r\n]+)',
+        r'(?:^|\n)\s*Request[:\s]*([^\r\n]+)'
+    ]
+    for pattern in patterns:
+        match = re.search(pattern, body, FLAGS)
+        if match:
+            description = re.sub(r'\s+', ' ', match.group(1).strip())
+            if len(description) > 3 and not description.startswith('字段'):
+                return description
+    return ""
+
+
+def extract_china_cloud_fields(body):
+    if not body:
+        return {}
+    fields = _empty_fields()
+    fields['requested_by'] = _first(body, REQUESTED_BY_PATTERNS)
+    fields['environment'] = _first(body, [
+        r'Permission\s+regards\s+to\s+environm?e?nt[:\s]*([^\r\n]+)',
+        r'Environment[:\s]*([^\r\n]+)',
+        r'Regards\s+to\s+environm?e?nt[:\s]*([^\r\n]+)'
+    ])
+    required_match = re.search(r'Required\s+permissions[:\s]*', body, FLAGS)
+    if required_match:
+        fields['required_permissions'] = _block(body, required_match, [
+            r'\n\s*Environment\s*:',
+            r'\n\s*Reason\s+for\s+application\s*:',
+            r'\n\s*Justification\s*:',
+            r'\n\s*Notes\s*:',
+            r'\n\s*Comments\s*:',
+            r'\n\s*Additional\s+information\s*:',
+            r'\n\s*Permission\s+regards\s+to\s+environment\s*:',
+            r'\n\s*[A-Za-z]+\s+[A-Za-z]+\s*:'
+        ])
+    else:
+        fields['required_permissions'] = _first(body, [
+            r'Required\s+permissions[:\s]*([^\r\n]+)',
+            r'Permissions\s+required[:\s]*([^\r\n]+)',
+            r'Permission[:\s]*([^\r\n]+)',
+            r'Required\s+permission[:\s]*([^\r\n]+)'
+        ])
+    fields['reason_for_application'] = _first(body, REASON_PATTERNS)
+    return fields
+
+
+def extract_china_cloud_resource_fields(body):
+    if not body:
+        return {}
+    fields = _empty_fields()
+    fields['requested_by'] = _first(body, REQUESTED_BY_PATTERNS)
+    fields['environment'] = _first(body, ENV_PATTERNS)
+    resource_match = re.search(r'Resource\s+Info[:\s]*', body, FLAGS)
+    if resource_match:
+        fields['required_permissions'] = _block(body, resource_match, [
+            r'\n\s*Environment\s*:',
+            r'\n\s*Reason\s+for\s+application\s*:',
+            r'\n\s*Justification\s*:',
+            r'\n\s*Notes\s*:',
+            r'\n\s*Comments\s*:',
+            r'\n\s*Additional\s+information\s*:',
+            r'\n\s*[A-Za-z]+\s+[A-Za-z]+\s*:'
+        ])
+    else:
+        fields['required_permissions'] = _first(body, [
+            r'Resource\s+Info[:\s]*([^\r\n]+)',
+            r'Resource\s+Information[:\s]*([^\r\n]+)',
+            r'Resource[:\s]*([^\r\n]+)',
+            r'Resources[:\s]*([^\r\n]+)'
+        ])
+    fields['reason_for_application'] = _first(body, REASON_PATTERNS)
+    return fields
+
+
+def extract_cn_server_db_access_fields(body):
+    if not body:
+        return {}
+    fields = _empty_fields()
+    fields['requested_by'] = _first(body, REQUESTED_BY_PATTERNS)
+    system_match = re.search(r'What\s+System\s+do\s+you\s+need\s+access\s+to\?[:\s]*([^\r\n]+)', body, FLAGS)
+    if not system_match or system_match.group(1).strip().lower() != 'bastion':
+        return fields
+    fields['environment'] = _first(body, ENV_PATTERNS)
+    auth_time_match = re.search(r'Authorization\s+time[:\s]*', body, FLAGS)
+    if auth_time_match:
+        fields['required_permissions'] = _block(body, auth_time_match, [
+            r'\n\s*Environment\s*:',
+            r'\n\s*Reason\s+for\s+application\s*:',
+            r'\n\s*What\s+System\s*:',
+            r'\n\s*Justification\s*:',
+            r'\n\s*Notes\s*:',
+            r'\n\s*Comments\s*:',
+            r'\n\s*[A-Za-z]+\s+[A-Za-z]+\s*:'
+        ])
+    else:
+        fields['required_permissions'] = _first(body, [
+            r'Authorization\s+time[:\s]*([^\r\n]+)',
+            r'Auth\s+time[:\s]*([^\r\n]+)',
+            r'Authorization[:\s]*([^\r\n]+)'
+        ])
+    reason_match = (
+        re.search(r'Reason\s+for\s+application\s*\(including\s+reason\s+for\s+Authorization\s+time\)[:\s]*',
+                  body, FLAGS) or
+        re.search(r'Reason\s+for\s+application[:\s]*', body, FLAGS)
+    )
+    if reason_match:
+        fields['reason_for_application'] = _block(body, reason_match, [
+            r'\n\s*Environment\s*:',
+            r'\n\s*Authorization\s+time\s*:',
+            r'\n\s*What\s+System\s*:',
+            r'\n\s*Justification\s*:',
+            r'\n\s*Notes\s*:',
+            r'\n\s*Comments\s*:',
+            r'\n\s*[A-Za-z]+\s+[A-Za-z]+\s*:'
+        ])
+    else:
+        fields['reason_for_application'] = _first(body, REASON_PATTERNS)
+    return fields
+
+
+# 三种请求类型的样例正文，前后有与真实邮件相近数量的其他字段
+FILLER = "\n".join(f"Field {i} label: some value number {i} with text" for i in range(60))
+
+SAMPLE_BODIES = {
+    'account': f"""Approval Request from lululemon ServiceNow
+{FILLER}
+Short description: China Cloud Account and Permission Request
+Requested by: Zhang San
+Requested for: Li Si
+Permission regards to environmnt: Production
+Required permissions:
+  - ECS read only
+  - RDS readonly
+=========
+Reason for application: need to debug prod issue
+Justification: n/a
+{FILLER}
+Ref:MSG85395759
+""",
+    'resource': f"""{FILLER}
+Short Description: China Cloud Resource Request
+Request by: Wang Wu
+Environment: staging
+Resource Info:
+  2 x ECS ecs.g6.large
+  1 x OSS bucket
+----
+Reason for application: new service rollout
+{FILLER}
+""",
+    'cn-server': f"""{FILLER}
+Short description: CN-Server & DB Access Control
+Requested by: Zhao Liu
+What System do you need access to?: Bastion
+Environment: prod
+Authorization time:
+  2025-09-01 to 2025-09-30
+Reason for application (including reason for Authorization time): maintenance
+  window for DB upgrade
+Notes: none
+{FILLER}
+""",
+}
+
+# 随机正文使用的片段：字段名的各个部分、分隔符和其他文字
+FUZZ_WORDS = [
+    "Short", "description", "Description", "Request", "Requested", "by", "for", "Environment", "Env",
+    "environmnt", "Permission", "regards", "to", "Required", "permissions", "permission", "Reason",
+    "application", "Application", "reason", "Justification", "Resource", "Info", "Information", "Resources",
+    "What", "System", "do", "you", "need", "access", "to?", "Bastion", "bastion", "Authorization", "time",
+    "Auth", "(including", "time)", "Notes", "Comments", "Additional", "information", ":", " ", "\n", "\r\n",
+    "  ", "-", "=", "___", "字段", "foo", "bar baz", "x:", "a b:", "ENV", "Ｋ"
+]
+
+# 大小写折叠时容易出错的字符（忽略大小写时匹配ASCII字母，小写后却不是这个字母），只加入部分随机正文
+FOLD_WORDS = ["ſ", "İ", "ı", "Reaſon", "Dİscussion"]
+
+
+def fuzz_body(seed):
+    """生成由字段名片段随机拼接的正文"""
+    rng = random.Random(seed)
+    words = FUZZ_WORDS + FOLD_WORDS if seed % 4 == 0 else FUZZ_WORDS
+    return "".join(rng.choice(words) + rng.choice(["", " ", "", ":", "\n"])
+                   for _ in range(rng.randint(0, 200)))
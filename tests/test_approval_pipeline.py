@@ -0,0 +1,152 @@
+"""approval_pipeline的测试：阶段顺序、任务结束标记、阶段出错时标记任务失败，以及解析阶段跳过读取失败的邮件"""
+
+import logging
+import threading
+
+import pytest
+
+from approval_pipeline import Pipeline, PipelineJob
+
+TIMEOUT = 5
+
+
+class RecordingJob(PipelineJob):
+    def __init__(self, name):
+        super().__init__()
+        self.name = name
+        self.outputs = []
+
+
+def make_pipeline(events, fail_on=None):
+    """三个阶段：double把数据乘2，add_one加1，collect记录结果；每个阶段记录 (阶段, 任务, 数据, 线程名)"""
+
+    def record(stage, job, item):
+        events.append((stage, job.name, item, threading.current_thread().name))
+
+    def double(job, item):
+        record('double', job, item)
+        if item == fail_on:
+            raise ValueError(f"bad item {item}")
+        yield item * 2
+
+    def add_one(job, item):
+        record('add_one', job, item)
+        return [item + 1]
+
+    def add_one_end(job):
+        # 结束处理函数的返回值排在该任务所有数据之后交给下一阶段
+        record('add_one_end', job, None)
+        return ['end']
+
+    def collect(job, item):
+        record('collect', job, item)
+        job.outputs.append(item)
+
+    def collect_end(job):
+        record('collect_end', job, None)
+        job.finish(list(job.outputs))
+
+    return Pipeline([
+        ('double', double, None),
+        ('add_one', add_one, add_one_end),
+        ('collect', collect, collect_end),
+    ], queue_size=2, logger=logging.getLogger('test_approval_pipeline'))
+
+
+def test_items_flow_through_stages_in_order():
+    events = []
+    pipeline = make_pipeline(events)
+    first, second = RecordingJob('first'), RecordingJob('second')
+    try:
+        for item in range(5):
+            pipeline.submit(first, item)
+        pipeline.end(first)
+        pipeline.submit(second, 10)
+        pipeline.end(second)
+
+        assert first.wait(TIMEOUT) == [1, 3, 5, 7, 9, 'end']
+        assert second.wait(TIMEOUT) == [21, 'end']
+    finally:
+        pipeline.stop(TIMEOUT)
+
+    assert not first.failed and not second.failed
+    # 每个阶段在自己的线程中按提交顺序处理
+    for stage in ('double', 'add_one', 'collect'):
+        stage_events = [event for event in events if event[0] == stage]
+        assert {thread for *_, thread in stage_events} == {f'pipeline-{stage}'}
+    assert [item for stage, job, item, _ in events if stage == 'double'] == [0, 1, 2, 3, 4, 10]
+    # 结束处理函数在该任务的全部数据之后、下一个任务的数据之前调用
+    add_one_events = [(stage, job) for stage, job, _, _ in events if stage.startswith('add_one')]
+    assert add_one_events == [('add_one', 'first')] * 5 + [('add_one_end', 'first'),
+                                                          ('add_one', 'second'), ('add_one_end', 'second')]
+    assert all(not thread.is_alive() for thread in pipeline.threads)
+
+
+def test_job_completes_only_after_all_items():
+    events = []
+    pipeline = make_pipeline(events)
+    job = RecordingJob('job')
+    try:
+        pipeline.submit(job, 1)
+        assert job.wait(0.2) is None and not job.is_done()
+        pipeline.end(job)
+        assert job.wait(TIMEOUT) == [3, 'end']
+    finally:
+        pipeline.stop(TIMEOUT)
+
+
+def test_stage_error_marks_job_failed_and_keeps_processing(caplog):
+    events = []
+    pipeline = make_pipeline(events, fail_on=2)
+    failing, other = RecordingJob('failing'), RecordingJob('other')
+    try:
+        with caplog.at_level(logging.ERROR):
+            for item in range(4):
+                pipeline.submit(failing, item)
+            pipeline.end(failing)
+            pipeline.submit(other, 5)
+            pipeline.end(other)
+
+            # 出错的数据被丢弃，同一任务的其他数据和结束标记照常处理
+            assert failing.wait(TIMEOUT) == [1, 3, 7, 'end']
+            assert other.wait(TIMEOUT) == [11, 'end']
+    finally:
+        pipeline.stop(TIMEOUT)
+
+    assert failing.failed
+    assert not other.failed
+    assert '流水线阶段 double 处理失败: bad item 2' in caplog.text
+
+
+def make_message(number):
+    return (
+        f"From - Mon Sep 01 10:00:00 2025\n"
+        f"Message-ID: <msg{number}@service-now.com>\n"
+        f"From: ServiceNow <luluprod@service-now.com>\n"
+        f"Subject: RITM{number:07d} - approval request\n"
+        f"\n"
+        f"Short Description: China Cloud Resource Request\n"
+        f"Requested by: User {number}\n"
+        f"\n"
+    ).encode()
+
+
+def test_extract_stage_skips_only_the_email_whose_body_fails(tmp_path, make_approver):
+    email_auto_approve = pytest.importorskip('email_auto_approve')
+    approver = make_approver()
+    mbox_path = tmp_path / 'NeedApprove'
+    mbox_path.write_bytes(b''.join(make_message(number) for number in range(3)))
+    emails = list(approver.iter_mbox_emails(str(mbox_path), headers_only=True))
+    # 第二封邮件的正文无法读取
+    emails[1]['file_path'] = str(tmp_path / 'missing')
+
+    job = email_auto_approve.MboxScanJob(str(mbox_path))
+    replies = list(approver._extract_stage(job, emails))
+
+    assert [email_info['subject'] for email_info, _ in replies] == ['RITM0000000 - approval request',
+                                                                    'RITM0000002 - approval request']
+    assert [reply_msg['Subject'] for _, reply_msg in replies] == ['Re: RITM0000000 - approve',
+                                                                  'Re: RITM0000002 - approve']
+    assert replies[1][0]['requested_by'] == 'User 2'
+    assert not emails[1]['body_loaded']
+    assert job.failed
@@ -0,0 +1,132 @@
+"""EmailWatcher的测试：静默窗口内的连续事件合并为一次扫描，扫描在单独的线程中进行，扫描期间的事件只排队一次"""
+
+import time
+import threading
+
+import pytest
+from watchdog.events import DirModifiedEvent, FileCreatedEvent, FileModifiedEvent
+
+from email_auto_approve import EmailWatcher
+
+QUIET_SECONDS = 0.1
+TIMEOUT = 5
+
+
+class RecordingScan:
+    """代替process_mbox_file，记录每次扫描的 (路径, 参数, 线程名, 开始时间)"""
+
+    def __init__(self, duration=0):
+        self.duration = duration
+        self.scans = []
+        self.started = threading.Event()
+        self.lock = threading.Lock()
+
+    def __call__(self, mbox_path, **kwargs):
+        with self.lock:
+            self.scans.append((mbox_path, kwargs, threading.current_thread().name, time.monotonic()))
+        self.started.set()
+        time.sleep(self.duration)
+
+    def wait_for(self, count):
+        deadline = time.monotonic() + TIMEOUT
+        while len(self.scans) < count and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return len(self.scans)
+
+
+@pytest.fixture
+def make_watcher(make_approver, monkeypatch):
+    """返回创建EmailWatcher的函数，扫描由RecordingScan记录；测试结束时停止扫描线程"""
+    watchers = []
+
+    def make(duration=0):
+        approver = make_approver(watch_quiet_seconds=QUIET_SECONDS)
+        scan = RecordingScan(duration)
+        monkeypatch.setattr(approver, 'process_mbox_file', scan)
+        watcher = EmailWatcher(approver, 'NeedApprove')
+        watchers.append(watcher)
+        return watcher, scan
+
+    yield make
+    for watcher in watchers:
+        watcher.stop(TIMEOUT)
+
+
+def fire_burst(watcher, mbox_path, count=20, interval=0.005):
+    """模拟Thunderbird写入一封邮件时的一串修改事件，返回最后一个事件的时间"""
+    for _ in range(count):
+        watcher.on_modified(FileModifiedEvent(mbox_path))
+        time.sleep(interval)
+    return time.monotonic()
+
+
+def test_burst_of_events_runs_one_scan_on_worker_thread(make_watcher, tmp_path):
+    watcher, scan = make_watcher()
+    mbox_path = str(tmp_path / 'NeedApprove')
+
+    last_event = fire_burst(watcher, mbox_path)
+    assert scan.wait_for(1) == 1
+    time.sleep(QUIET_SECONDS * 2)
+
+    assert len(scan.scans) == 1
+    path, kwargs, thread_name, started = scan.scans[0]
+    assert path == mbox_path
+    assert kwargs == {'show_daily_summary': False, 'incremental': True}
+    assert thread_name == 'mbox-scan-worker'
+    # 最后一个事件之后静默了一个窗口才开始扫描
+    assert started - last_event >= QUIET_SECONDS * 0.9
+
+
+def test_each_debounce_window_runs_one_scan(make_watcher, tmp_path):
+    watcher, scan = make_watcher()
+    mbox_path = str(tmp_path / 'NeedApprove')
+
+    for bursts in range(1, 4):
+        fire_burst(watcher, mbox_path, count=10)
+        assert scan.wait_for(bursts) == bursts
+    time.sleep(QUIET_SECONDS * 2)
+    assert len(scan.scans) == 3
+
+
+def test_events_during_scan_queue_only_one_more_scan(make_watcher, tmp_path):
+    watcher, scan = make_watcher(duration=QUIET_SECONDS * 3)
+    mbox_path = str(tmp_path / 'NeedApprove')
+
+    fire_burst(watcher, mbox_path, count=5)
+    assert scan.started.wait(TIMEOUT)
+    # 扫描进行中又来了多串事件，合并为扫描结束后的一次扫描
+    for _ in range(3):
+        fire_burst(watcher, mbox_path, count=5, interval=0.01)
+    assert scan.wait_for(2) == 2
+    time.sleep(QUIET_SECONDS * 4)
+
+    assert len(scan.scans) == 2
+    assert scan.scans[1][3] - scan.scans[0][3] >= QUIET_SECONDS * 3 * 0.9
+
+
+def test_mboxes_are_scanned_separately_and_other_events_ignored(make_watcher, tmp_path):
+    watcher, scan = make_watcher()
+    first = str(tmp_path / 'NeedApprove')
+    second = str(tmp_path / 'other.sbd' / 'NeedApprove')
+
+    watcher.on_created(FileCreatedEvent(first))
+    fire_burst(watcher, first, count=5)
+    fire_burst(watcher, second, count=5)
+    # 其他文件和目录的事件不触发扫描
+    watcher.on_modified(FileModifiedEvent(str(tmp_path / 'Processed')))
+    watcher.on_modified(DirModifiedEvent(str(tmp_path / 'NeedApprove.sbd')))
+    assert scan.wait_for(2) == 2
+    time.sleep(QUIET_SECONDS * 2)
+
+    assert sorted(path for path, *_ in scan.scans) == sorted([first, second])
+
+
+def test_stop_ends_worker_thread(make_watcher, tmp_path):
+    watcher, scan = make_watcher()
+    watcher.stop(TIMEOUT)
+    assert not watcher._worker.is_alive()
+
+    # 停止后的事件不再扫描
+    fire_burst(watcher, str(tmp_path / 'NeedApprove'), count=2)
+    time.sleep(QUIET_SECONDS * 2)
+    assert scan.scans == []
@@ -0,0 +1,51 @@
+"""field_extractor的回归测试：字段提取引擎与原来逐个re.search的实现结果完全一致"""
+
+import logging
+
+import pytest
+
+import field_extraction_reference as reference
+
+EmailBodyParser = pytest.importorskip('email_auto_approve').EmailBodyParser
+
+FUZZ_BODIES = 2000
+
+EXTRACTORS = [
+    'extract_short_description',
+    'extract_china_cloud_fields',
+    'extract_china_cloud_resource_fields',
+    'extract_cn_server_db_access_fields',
+]
+
+
+@pytest.fixture(scope='module')
+def parser():
+    logger = logging.getLogger('test_field_extractor')
+    logger.disabled = True
+    return EmailBodyParser(logger)
+
+
+def assert_same_as_reference(parser, body):
+    for name in EXTRACTORS:
+        assert getattr(parser, name)(body) == getattr(reference, name)(body), (name, body)
+
+
+@pytest.mark.parametrize('request_type', sorted(reference.SAMPLE_BODIES))
+def test_sample_bodies_match_reference(parser, request_type):
+    assert_same_as_reference(parser, reference.SAMPLE_BODIES[request_type])
+
+
+def test_sample_fields(parser):
+    body = reference.SAMPLE_BODIES['resource']
+    assert parser.extract_short_description(body) == 'China Cloud Resource Request'
+    assert parser.extract_china_cloud_resource_fields(body) == {
+        'environment': 'staging',
+        'required_permissions': '2 x ECS ecs.g6.large 1 x OSS bucket',
+        'reason_for_application': 'new service rollout',
+        'requested_by': 'Wang Wu',
+    }
+
+
+def test_fuzzed_bodies_match_reference(parser):
+    for seed in range(FUZZ_BODIES):
+        assert_same_as_reference(parser, reference.fuzz_body(seed))
@@ -0,0 +1,66 @@
+"""mbox_index的测试：索引查找，以及flag删除方式设置标志后索引同步更新"""
+
+import pytest
+
+from mbox_index import MboxIndex
+from mbox_utils import MOZILLA_STATUS_EXPUNGED
+
+
+def make_message(number):
+    return (
+        f"From - Mon Sep 01 10:00:0{number} 2025\n"
+        f"X-Mozilla-Status: 0001\n"
+        f"X-Mozilla-Status2: 00000000\n"
+        f"Message-ID: <msg{number}@service-now.com>\n"
+        f"From: ServiceNow <luluprod@service-now.com>\n"
+        f"Subject: RITM000000{number} - approval request\n"
+        f"\n"
+        f"Short Description: request {number}\n"
+        f"\n"
+        # 正文比指纹检查的文件末尾部分长，改写前面邮件的头部时指纹不会变化
+        + "Reason for application: access\n" * 200
+        + "\n"
+    ).encode()
+
+
+@pytest.fixture
+def mbox_path(tmp_path):
+    path = tmp_path / 'NeedApprove'
+    path.write_bytes(b''.join(make_message(number) for number in range(1, 4)))
+    return str(path)
+
+
+def test_refresh_and_find(tmp_path, mbox_path):
+    index = MboxIndex(str(tmp_path / 'index.db'))
+    try:
+        assert index.refresh(mbox_path) == 3
+        [match] = index.find_by_message_id(mbox_path, '<msg2@service-now.com>')
+        assert match['ticket_number'] == 'RITM0000002'
+        assert match['mozilla_status'] == 1
+        with open(mbox_path, 'rb') as f:
+            f.seek(match['offset'])
+            assert f.read(match['length']) == make_message(2)
+    finally:
+        index.close()
+
+
+@pytest.mark.parametrize('scan_mode', ['stream', 'mmap'])
+def test_flag_removal_updates_index(tmp_path, make_approver, mbox_path, scan_mode):
+    approver = make_approver(remove_mode='flag', mbox_scan_mode=scan_mode, mbox_index=tmp_path / 'index.db')
+    approver.refresh_mbox_index(mbox_path)
+    index = approver.get_mbox_index()
+    [match] = index.find_by_message_id(mbox_path, '<msg1@service-now.com>')
+    email_range = (match['offset'], match['offset'] + match['length'])
+
+    # flag方式不压缩文件，返回的压缩区间为空
+    assert approver._remove_email_ranges(mbox_path, [email_range]) == []
+
+    # 文件只是原地改写，刷新索引后仍然能看到删除标志
+    approver.refresh_mbox_index(mbox_path)
+    assert index.find_by_message_id(mbox_path, '<msg1@service-now.com>') == []
+    assert index.find_by_ticket(mbox_path, 'RITM0000001') == []
+    [flagged] = index.find_by_message_id(mbox_path, '<msg1@service-now.com>', include_deleted=True)
+    assert flagged['mozilla_status'] == 1 | MOZILLA_STATUS_EXPUNGED
+    assert len(index.find_by_message_id(mbox_path, '<msg2@service-now.com>')) == 1
+    assert len(index.find_by_message_id(mbox_path, '<msg3@service-now.com>')) == 1
+    index.close()
@@ -0,0 +1,101 @@
+"""流式扫描的测试：只解析头部时不保留邮件内容，正文按偏移重新读取，增量扫描从检查点继续"""
+
+import os
+import tracemalloc
+
+import pytest
+
+MESSAGE_COUNT = 100
+BODY_LINES = 1600  # 每封邮件约100KB，整个文件约10MB
+
+
+def make_message(number):
+    return (
+        f"From - Mon Sep 01 10:00:00 2025\n"
+        f"Message-ID: <msg{number}@service-now.com>\n"
+        f"From: ServiceNow <luluprod@service-now.com>\n"
+        f"Subject: RITM{number:07d} - approval request\n"
+        f"\n"
+        f"Short Description: China Cloud Resource Request {number}\n"
+        + "Reason for application: need access to the china cloud account\n" * BODY_LINES
+        + "\n"
+    ).encode()
+
+
+@pytest.fixture(params=['stream', 'mmap'])
+def approver(request, make_approver):
+    return make_approver(mbox_scan_mode=request.param)
+
+
+@pytest.fixture
+def mbox_path(tmp_path):
+    path = tmp_path / 'NeedApprove'
+    with open(path, 'wb') as f:
+        for number in range(MESSAGE_COUNT):
+            f.write(make_message(number))
+    return str(path)
+
+
+def test_headers_only_scan_does_not_keep_message_bytes(approver, mbox_path):
+    tracemalloc.start()
+    try:
+        emails = list(approver.iter_mbox_emails(mbox_path, headers_only=True))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert len(emails) == MESSAGE_COUNT
+    assert not any('message_bytes' in email_info for email_info in emails)
+    # 峰值只取决于读取块和最大的单封邮件，与约10MB的文件大小无关
+    assert peak < 4 * 1024 * 1024
+
+
+def test_bodies_are_read_back_by_offset(approver, mbox_path):
+    emails = list(approver.iter_mbox_emails(mbox_path, headers_only=True))
+    candidates = [emails[3], emails[57]]
+    approver.load_email_bodies(candidates)
+    for email_info, number in zip(candidates, (3, 57)):
+        assert email_info['body_loaded']
+        assert email_info['short_description'] == f"China Cloud Resource Request {number}"
+        assert email_info['body'].count('Reason for application') == BODY_LINES
+    assert not emails[4]['body_loaded']
+
+
+def scanned_ids(job):
+    return [email_info['message_id'] for email_info in job.emails]
+
+
+def test_incremental_scan_resumes_from_saved_checkpoint(make_approver, tmp_path):
+    email_auto_approve = pytest.importorskip('email_auto_approve')
+    approver = make_approver()
+    path = tmp_path / 'NeedApprove'
+    path.write_bytes(b''.join(make_message(number) for number in range(3)))
+    mbox_path = str(path)
+
+    def scan():
+        job = email_auto_approve.MboxScanJob(mbox_path, incremental=True)
+        list(approver._scan_stage(job, mbox_path))
+        return job
+
+    job = scan()
+    assert scanned_ids(job) == [f'<msg{number}@service-now.com>' for number in range(3)]
+    # 有邮件处理失败时不保存检查点，下次全量扫描重试
+    job.mark_failed()
+    approver._finish_scan_job(job)
+    assert approver.load_mbox_checkpoints() == {}
+
+    job = scan()
+    approver._finish_scan_job(job)
+    # 检查点停在最后一封邮件的开头
+    assert approver.load_mbox_checkpoints()[mbox_path]['offset'] == job.emails[-1]['mbox_start'] > 0
+
+    # 只追加新邮件时从最后一封已扫描的邮件继续
+    with open(path, 'ab') as f:
+        f.write(make_message(3))
+    assert scanned_ids(scan()) == ['<msg2@service-now.com>', '<msg3@service-now.com>']
+
+    # 文件被替换后全量扫描
+    tmp = tmp_path / 'NeedApprove.tmp'
+    tmp.write_bytes(make_message(4) + path.read_bytes())
+    os.replace(tmp, path)
+    assert scanned_ids(scan()) == [f'<msg{number}@service-now.com>' for number in (4, 0, 1, 2, 3)]
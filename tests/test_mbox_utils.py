@@ -0,0 +1,159 @@
+"""mbox_utils的测试：按区间压缩删除邮件、删除后的偏移换算，以及增量扫描检查点在文件被截断或替换时失效"""
+
+import os
+import threading
+
+import pytest
+
+import mbox_utils
+from mbox_utils import (compact_mbox, shift_offset, _merge_ranges, iter_mbox_messages, mbox_fingerprint,
+                        resume_offset)
+
+
+def make_message(number, body_lines=3):
+    return (
+        f"From - Mon Sep 01 10:00:00 2025\n"
+        f"Message-ID: <msg{number}@service-now.com>\n"
+        f"Subject: RITM{number:07d} - approval request\n"
+        f"\n"
+        + f"Short Description: request {number}\n" * body_lines
+        + "\n"
+    ).encode()
+
+
+@pytest.fixture
+def mbox(tmp_path):
+    """写入5封邮件，返回 (路径, 每封邮件的字节, 每封邮件的区间)"""
+    messages = [make_message(number, body_lines=number + 1) for number in range(5)]
+    path = tmp_path / 'NeedApprove'
+    path.write_bytes(b''.join(messages))
+    ranges = [(start, end) for start, end, _ in iter_mbox_messages(str(path))]
+    return path, messages, ranges
+
+
+def test_merge_ranges_sorts_merges_and_drops_empty():
+    assert _merge_ranges([]) == []
+    assert _merge_ranges([(30, 40), (0, 10), (5, 20), (20, 25), (50, 50), (60, 55)]) == [[0, 25], [30, 40]]
+    assert _merge_ranges([(0, 100), (10, 20)]) == [[0, 100]]
+
+
+@pytest.mark.parametrize('offset, expected', [
+    (0, 0),
+    (10, 10),    # 第一个删除区间的起点
+    (15, 10),    # 落在删除区间内时移到区间起点
+    (20, 10),
+    (35, 25),
+    (45, 30),
+    (100, 80),   # 所有区间之后
+])
+def test_shift_offset(offset, expected):
+    assert shift_offset(offset, [(40, 50), (10, 20), (15, 18)]) == expected
+
+
+def test_compact_removes_ranges_and_keeps_the_rest_byte_for_byte(mbox):
+    path, messages, ranges = mbox
+    inode = os.stat(path).st_ino
+
+    removed = compact_mbox(str(path), [ranges[3], ranges[0], ranges[1]], chunk_size=7)
+
+    assert removed == len(messages[0]) + len(messages[1]) + len(messages[3])
+    assert path.read_bytes() == messages[2] + messages[4]
+    # 原子替换为新文件，没有留下临时文件
+    assert os.stat(path).st_ino != inode
+    assert os.listdir(path.parent) == ['NeedApprove']
+    # 保留邮件的新位置与shift_offset换算的一致
+    new_start = shift_offset(ranges[4][0], [ranges[0], ranges[1], ranges[3]])
+    assert path.read_bytes()[new_start:] == messages[4]
+
+
+def test_compact_without_ranges_leaves_file_untouched(mbox):
+    path, messages, _ = mbox
+    inode = os.stat(path).st_ino
+
+    assert compact_mbox(str(path), []) == 0
+    assert os.stat(path).st_ino == inode
+    assert path.read_bytes() == b''.join(messages)
+
+
+def test_compact_keeps_mail_appended_just_before_the_replace(mbox, monkeypatch):
+    path, messages, ranges = mbox
+    appended = make_message(99)
+    real_replace = os.replace
+
+    def append_then_replace(src, dst):
+        # Thunderbird不使用flock，在最后一次复制和替换之间追加新邮件到旧文件
+        with open(path, 'ab') as f:
+            f.write(appended)
+        real_replace(src, dst)
+
+    monkeypatch.setattr(mbox_utils.os, 'replace', append_then_replace)
+    compact_mbox(str(path), [ranges[2]])
+
+    assert path.read_bytes() == messages[0] + messages[1] + messages[3] + messages[4] + appended
+
+
+def test_compact_waits_for_flock_holder_and_keeps_its_append(mbox):
+    fcntl = pytest.importorskip('fcntl')
+    path, messages, ranges = mbox
+    appended = make_message(99)
+
+    with open(path, 'ab') as writer:
+        fcntl.flock(writer.fileno(), fcntl.LOCK_EX)
+        compactor = threading.Thread(target=compact_mbox, args=(str(path), [ranges[0]]))
+        compactor.start()
+        compactor.join(0.2)
+        # 压缩在复制最后一段前等待锁，持有锁的程序追加完成后才继续
+        assert compactor.is_alive()
+        writer.write(appended)
+        writer.flush()
+        fcntl.flock(writer.fileno(), fcntl.LOCK_UN)
+    compactor.join(5)
+
+    assert not compactor.is_alive()
+    assert path.read_bytes() == b''.join(messages[1:]) + appended
+
+
+def test_resume_offset_after_append(mbox):
+    path, messages, ranges = mbox
+    offset = ranges[-1][0]
+    checkpoint = mbox_fingerprint(str(path), offset)
+    assert resume_offset(str(path), checkpoint) == offset
+
+    # Thunderbird只追加新邮件时从检查点继续
+    with open(path, 'ab') as f:
+        f.write(make_message(5))
+    assert resume_offset(str(path), checkpoint) == offset
+    assert [raw for _, _, raw in iter_mbox_messages(str(path), offset)] == [messages[-1], make_message(5)]
+
+
+def test_resume_offset_without_checkpoint(mbox):
+    path, _, _ = mbox
+    assert resume_offset(str(path), None) == 0
+    assert resume_offset(str(path), {}) == 0
+    assert resume_offset(str(path.with_name('missing')), mbox_fingerprint(str(path), 10)) == 0
+
+
+@pytest.mark.parametrize('change', ['truncated', 'replaced', 'tail_rewritten', 'compacted'])
+def test_resume_offset_falls_back_to_full_scan(mbox, change):
+    path, messages, ranges = mbox
+    checkpoint = mbox_fingerprint(str(path), ranges[3][0])
+
+    if change == 'truncated':
+        with open(path, 'r+b') as f:
+            f.truncate(ranges[2][0])
+    elif change == 'replaced':
+        # 内容和大小都相同，但换成了另一个文件
+        tmp_path = path.with_name('NeedApprove.tmp')
+        tmp_path.write_bytes(path.read_bytes())
+        os.replace(tmp_path, path)
+    elif change == 'tail_rewritten':
+        # 原地修改检查点之前的内容（大小不变），例如设置删除标志
+        with open(path, 'r+b') as f:
+            f.seek(ranges[2][0] + 5)
+            f.write(b'X')
+    else:
+        # 在原文件上删除检查点之前的邮件，后面的邮件前移
+        with open(path, 'r+b') as f:
+            f.write(b''.join(messages[1:]))
+            f.truncate()
+    assert resume_offset(str(path), checkpoint) == 0
@@ -0,0 +1,114 @@
+"""批量移动已处理邮件的测试：多封邮件一次追加到Processed并一次压缩源文件，按删除标志删除，以及偏移失效时重新定位"""
+
+import pytest
+
+MESSAGE_COUNT = 6
+MOVED = [1, 3, 4]
+
+
+def make_message(number, status='0001'):
+    return (
+        f"From - Mon Sep 01 10:00:{number:02d} 2025\n"
+        f"X-Mozilla-Status: {status}\n"
+        f"Message-ID: <msg{number}@service-now.com>\n"
+        f"From: ServiceNow <luluprod@service-now.com>\n"
+        f"Subject: RITM{number:07d} - approval request\n"
+        f"\n"
+        f"Short Description: China Cloud Resource Request\n"
+        + f"Reason for application: request {number}\n" * (number + 1)
+        + "\n"
+    ).encode()
+
+
+@pytest.fixture
+def mail_dir(tmp_path):
+    """Thunderbird配置目录下的Local Folders，待批准文件夹中有MESSAGE_COUNT封邮件，Processed文件夹为空"""
+    path = tmp_path / 'abcd.default' / 'Mail' / 'Local Folders'
+    path.mkdir(parents=True)
+    (path / 'Processed').write_bytes(b'')
+    (path / 'NeedApprove').write_bytes(b''.join(make_message(number) for number in range(MESSAGE_COUNT)))
+    return path
+
+
+@pytest.fixture
+def compactions(monkeypatch):
+    """记录每次压缩mbox删除的区间"""
+    email_auto_approve = pytest.importorskip('email_auto_approve')
+    calls = []
+    compact_mbox = email_auto_approve.compact_mbox
+
+    def recording_compact(mbox_path, ranges):
+        calls.append(sorted(tuple(email_range) for email_range in ranges))
+        return compact_mbox(mbox_path, ranges)
+
+    monkeypatch.setattr(email_auto_approve, 'compact_mbox', recording_compact)
+    return calls
+
+
+def scan(approver, mbox_path):
+    return {email_info['message_id']: email_info
+            for email_info in approver.iter_mbox_emails(mbox_path, headers_only=True)}
+
+
+def test_batch_move_appends_once_and_compacts_once(make_approver, mail_dir, compactions):
+    approver = make_approver(move_processed_emails='True', processed_destination='Local Folders/Processed')
+    source = str(mail_dir / 'NeedApprove')
+    emails = scan(approver, source)
+    moving = [emails[f'<msg{number}@service-now.com>'] for number in MOVED]
+
+    dropped_ranges = approver.move_processed_emails(moving, source)
+
+    # 邮件按原始字节依次追加
+    assert (mail_dir / 'Processed').read_bytes() == b''.join(make_message(number) for number in MOVED)
+    assert (mail_dir / 'NeedApprove').read_bytes() == b''.join(
+        make_message(number) for number in range(MESSAGE_COUNT) if number not in MOVED)
+    expected_ranges = sorted((email_info['mbox_start'], email_info['mbox_end']) for email_info in moving)
+    assert sorted(tuple(email_range) for email_range in dropped_ranges) == expected_ranges
+    assert compactions == [expected_ranges]
+    assert set(scan(approver, source)) == {f'<msg{number}@service-now.com>' for number in (0, 2, 5)}
+
+
+def test_batch_move_keeps_existing_processed_mail(make_approver, mail_dir, compactions):
+    approver = make_approver(move_processed_emails='True', processed_destination='Local Folders/Processed')
+    # 已有内容的最后一行没有换行符
+    (mail_dir / 'Processed').write_bytes(make_message(90).rstrip(b'\n'))
+    source = str(mail_dir / 'NeedApprove')
+    emails = scan(approver, source)
+
+    approver.move_processed_emails([emails['<msg0@service-now.com>'], emails['<msg5@service-now.com>']], source)
+
+    assert (mail_dir / 'Processed').read_bytes() == (
+        make_message(90).rstrip(b'\n') + b'\n' + make_message(0) + make_message(5))
+    assert len(compactions) == 1
+
+
+def test_flag_mode_marks_messages_without_compacting(make_approver, mail_dir, compactions):
+    approver = make_approver(move_processed_emails='True', processed_destination='Local Folders/Processed',
+                             remove_mode='flag')
+    source = str(mail_dir / 'NeedApprove')
+    emails = scan(approver, source)
+
+    dropped_ranges = approver.move_processed_emails(
+        [emails[f'<msg{number}@service-now.com>'] for number in MOVED], source)
+
+    # 设置删除标志不改变文件长度，其余邮件的偏移不需要平移
+    assert dropped_ranges == []
+    assert compactions == []
+    assert (mail_dir / 'Processed').read_bytes() == b''.join(make_message(number) for number in MOVED)
+    assert (mail_dir / 'NeedApprove').read_bytes() == b''.join(
+        make_message(number, '0009' if number in MOVED else '0001') for number in range(MESSAGE_COUNT))
+
+
+def test_batch_move_relocates_messages_after_source_changed(make_approver, mail_dir, compactions):
+    approver = make_approver(move_processed_emails='True', processed_destination='Local Folders/Processed')
+    source = str(mail_dir / 'NeedApprove')
+    emails = scan(approver, source)
+    # 扫描之后文件开头插入了一封邮件，记录的偏移全部失效
+    (mail_dir / 'NeedApprove').write_bytes(make_message(50) + (mail_dir / 'NeedApprove').read_bytes())
+
+    approver.move_processed_emails([emails[f'<msg{number}@service-now.com>'] for number in MOVED], source)
+
+    assert (mail_dir / 'Processed').read_bytes() == b''.join(make_message(number) for number in MOVED)
+    assert (mail_dir / 'NeedApprove').read_bytes() == make_message(50) + b''.join(
+        make_message(number) for number in range(MESSAGE_COUNT) if number not in MOVED)
+    assert len(compactions) == 1
@@ -0,0 +1,45 @@
+"""并行解析正文的测试：结果与顺序解析一致，进程池在多次解析之间复用"""
+
+import pytest
+
+email_auto_approve = pytest.importorskip('email_auto_approve')
+
+MESSAGE_COUNT = email_auto_approve.PARALLEL_PARSE_MIN_EMAILS + 5
+
+
+def make_message(number):
+    return (
+        f"From - Mon Sep 01 10:00:00 2025\n"
+        f"Message-ID: <msg{number}@service-now.com>\n"
+        f"From: ServiceNow <luluprod@service-now.com>\n"
+        f"Subject: RITM{number:07d} - approval request\n"
+        f"\n"
+        f"Short Description: China Cloud Resource Request\n"
+        f"Requested by: User {number}\n"
+        f"Environment: Production\n"
+        f"Reason for application: request {number}\n"
+        f"\n"
+    ).encode()
+
+
+def test_parallel_parse_matches_serial_and_reuses_pool(tmp_path, make_approver):
+    mbox_path = tmp_path / 'NeedApprove'
+    mbox_path.write_bytes(b''.join(make_message(number) for number in range(MESSAGE_COUNT)))
+
+    serial = make_approver(parse_workers=1)
+    expected = serial.load_email_bodies(list(serial.iter_mbox_emails(str(mbox_path), headers_only=True)))
+    assert serial.parse_executor is None
+
+    parallel = make_approver(parse_workers=2)
+    try:
+        executors = []
+        for _ in range(2):
+            emails = parallel.load_email_bodies(list(parallel.iter_mbox_emails(str(mbox_path), headers_only=True)))
+            assert emails == expected
+            executors.append(parallel.parse_executor)
+        # 第二次解析使用同一个进程池
+        assert executors[0] is not None and executors[1] is executors[0]
+        assert expected[7]['requested_by'] == 'User 7'
+    finally:
+        parallel.stop_pipeline()
+    assert parallel.parse_executor is None
@@ -0,0 +1,204 @@
+"""processed_store的测试：旧JSON记录导入和去重，布隆过滤器没有漏判，数据库替换和超出容量时重建，过滤器分批写回磁盘"""
+
+import os
+import json
+
+import pytest
+
+import processed_store
+from processed_store import BloomFilter, ProcessedEmailStore
+
+
+def message_ids(prefix, count):
+    return [f'<{prefix}{number}@service-now.com>' for number in range(count)]
+
+
+@pytest.fixture
+def paths(tmp_path):
+    return str(tmp_path / 'processed_emails.db'), str(tmp_path / 'processed_emails.bloom')
+
+
+def test_bloom_filter_has_no_false_negatives_and_persists(tmp_path):
+    path = str(tmp_path / 'filter.bloom')
+    keys = message_ids('key', 5000)
+    bloom = BloomFilter(path, capacity=5000)
+    for key in keys:
+        bloom.add(key)
+    bloom.set_synced_rowid(5000)
+    bloom.close()
+
+    bloom = BloomFilter(path)
+    try:
+        assert bloom.capacity == 5000 and bloom.synced_rowid == 5000
+        assert all(key in bloom for key in keys)
+        # 设计误判率0.1%，留足余量
+        false_positives = sum(key in bloom for key in message_ids('other', 5000))
+        assert false_positives < 50
+    finally:
+        bloom.close()
+
+
+def test_store_with_bloom_finds_every_added_id_after_reopen(paths):
+    db_path, bloom_path = paths
+    keys = message_ids('msg', 300)
+    store = ProcessedEmailStore(db_path, bloom_path=bloom_path)
+    for key in keys:
+        assert store.add(key)
+    store.close()
+
+    store = ProcessedEmailStore(db_path, bloom_path=bloom_path)
+    try:
+        assert all(key in store.bloom for key in keys)
+        assert all(key in store for key in keys)
+        assert not any(key in store for key in message_ids('new', 300))
+        assert store.bloom.synced_rowid == 300
+    finally:
+        store.close()
+
+
+def test_bloom_rebuilt_when_database_is_replaced(paths):
+    db_path, bloom_path = paths
+    store = ProcessedEmailStore(db_path, bloom_path=bloom_path)
+    for key in message_ids('old', 10):
+        store.add(key)
+    store.close()
+
+    # 数据库被换成另一份（记录更多，rowid比过滤器已同步的大）
+    os.remove(db_path)
+    replacement = ProcessedEmailStore(db_path)
+    new_keys = message_ids('new', 20)
+    for key in new_keys:
+        replacement.add(key)
+    replacement.close()
+
+    store = ProcessedEmailStore(db_path, bloom_path=bloom_path)
+    try:
+        assert store.bloom.db_id == store.db_id
+        assert all(key in store.bloom for key in new_keys)
+        assert all(key in store for key in new_keys)
+        assert not any(key in store for key in message_ids('old', 10))
+    finally:
+        store.close()
+
+
+def test_bloom_resized_when_add_passes_capacity(paths, monkeypatch):
+    db_path, bloom_path = paths
+    monkeypatch.setattr(processed_store, 'BLOOM_MIN_CAPACITY', 50)
+    BloomFilter(bloom_path, capacity=50).close()
+    keys = message_ids('msg', 60)
+
+    store = ProcessedEmailStore(db_path, bloom_path=bloom_path)
+    try:
+        assert store.bloom.capacity == 50
+        for key in keys:
+            store.add(key)
+        # 第51条记录超出容量时按记录数的两倍重建
+        assert store.bloom.capacity == 102
+        assert store.bloom.synced_rowid == 60
+        assert all(key in store.bloom for key in keys)
+    finally:
+        store.close()
+
+
+def test_bloom_resized_on_open_when_already_past_capacity(paths, monkeypatch):
+    db_path, bloom_path = paths
+    monkeypatch.setattr(processed_store, 'BLOOM_MIN_CAPACITY', 50)
+    keys = message_ids('msg', 60)
+    store = ProcessedEmailStore(db_path)
+    for key in keys:
+        store.add(key)
+    db_id = store.db_id
+    store.close()
+    # 旧版本写出的过滤器：已同步全部记录，但记录数超过了容量
+    bloom = BloomFilter(bloom_path, capacity=50)
+    for key in keys:
+        bloom.add(key)
+    bloom.set_synced_rowid(60, db_id)
+    bloom.close()
+
+    store = ProcessedEmailStore(db_path, bloom_path=bloom_path)
+    try:
+        assert store.bloom.capacity == 120
+        assert all(key in store.bloom for key in keys)
+    finally:
+        store.close()
+
+
+def test_bloom_flushed_in_batches_and_on_close(paths, monkeypatch):
+    db_path, bloom_path = paths
+    store = ProcessedEmailStore(db_path, bloom_path=bloom_path)
+    flushes = []
+    monkeypatch.setattr(BloomFilter, 'flush', lambda self: flushes.append(self.synced_rowid))
+
+    for key in message_ids('msg', 250):
+        store.add(key)
+    assert flushes == [100, 200]
+    store.close()
+    assert flushes == [100, 200, 250]
+
+
+def test_legacy_json_imported_only_once(paths, tmp_path):
+    db_path, _ = paths
+    legacy = tmp_path / 'processed_emails.json'
+    legacy.write_text(json.dumps(message_ids('legacy', 5) + ['<legacy0@service-now.com>']), encoding='utf-8')
+
+    store = ProcessedEmailStore(db_path)
+    try:
+        # 重复的Message-ID只导入一次
+        assert store.migrate_json(str(legacy)) == 5
+        assert len(store) == 5
+        legacy.write_text(json.dumps(message_ids('legacy', 8)), encoding='utf-8')
+        assert store.migrate_json(str(legacy)) == 0
+        assert store.migrate_json(str(tmp_path / 'missing.json')) == 0
+    finally:
+        store.close()
+
+    # 重新打开后仍然记得已经导入过
+    store = ProcessedEmailStore(db_path)
+    try:
+        assert store.migrate_json(str(legacy)) == 0
+        assert len(store) == 5
+        assert '<legacy4@service-now.com>' in store
+        assert '<legacy5@service-now.com>' not in store
+    finally:
+        store.close()
+
+
+@pytest.mark.parametrize('use_bloom', [False, True], ids=['memory', 'bloom'])
+def test_add_ignores_duplicates(paths, use_bloom):
+    db_path, bloom_path = paths
+    store = ProcessedEmailStore(db_path, bloom_path=bloom_path if use_bloom else None)
+    try:
+        assert store.add('<msg1@service-now.com>', '2025-09-01 10:00:00')
+        assert not store.add('<msg1@service-now.com>', '2025-09-02 10:00:00')
+        assert store.add('<msg2@service-now.com>')
+        assert len(store) == 2
+        # 重复插入不改变第一次记录的处理时间
+        assert store.conn.execute(
+            "SELECT processed_time FROM processed_emails WHERE message_id = '<msg1@service-now.com>'"
+        ).fetchone()[0] == '2025-09-01 10:00:00'
+    finally:
+        store.close()
+
+
+def test_memory_and_bloom_lookups_agree(paths, tmp_path):
+    db_path, bloom_path = paths
+    legacy = tmp_path / 'processed_emails.json'
+    legacy.write_text(json.dumps(message_ids('legacy', 50)), encoding='utf-8')
+    with_bloom = ProcessedEmailStore(db_path, bloom_path=bloom_path)
+    with_bloom.migrate_json(str(legacy))
+    for key in message_ids('added', 50):
+        with_bloom.add(key)
+
+    # 另一个连接只用内存集合，读取同一个数据库
+    in_memory = ProcessedEmailStore(db_path)
+    try:
+        probes = message_ids('legacy', 60) + message_ids('added', 60) + message_ids('never', 200)
+        assert [key in with_bloom for key in probes] == [key in in_memory for key in probes]
+        assert sum(key in in_memory for key in probes) == 100
+        assert len(with_bloom) == len(in_memory) == 100
+        # 导入的记录也在过滤器中
+        assert all(key in with_bloom.bloom for key in message_ids('legacy', 50))
+    finally:
+        in_memory.close()
+        with_bloom.close()
@@ -0,0 +1,139 @@
+"""reply_dispatcher的测试：同时发送数上限、同一收件人的发送间隔、发送结果，以及关闭时等待发送完成"""
+
+import time
+import threading
+from email.mime.text import MIMEText
+
+import pytest
+
+from reply_dispatcher import ReplyDispatcher
+
+TIMEOUT = 5
+
+
+class FakeSend:
+    """记录同时进行的发送数和每个收件人的发送时间；failures中的主题返回False，errors中的主题抛出异常"""
+
+    def __init__(self, duration=0.05, failures=(), errors=()):
+        self.duration = duration
+        self.failures = set(failures)
+        self.errors = set(errors)
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.sent = []
+        self.times = {}
+
+    def __call__(self, reply_msg, *args):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            self.times.setdefault(reply_msg['To'], []).append(time.monotonic())
+        try:
+            time.sleep(self.duration)
+            if reply_msg['Subject'] in self.errors:
+                raise RuntimeError(f"relay rejected {reply_msg['Subject']}")
+            with self.lock:
+                self.sent.append((reply_msg['Subject'], args))
+            return reply_msg['Subject'] not in self.failures
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+def make_reply(subject, to_addr='luluprod@service-now.com'):
+    msg = MIMEText("Ref:MSG85395759", 'plain', 'utf-8')
+    msg['To'] = to_addr
+    msg['Subject'] = subject
+    return msg
+
+
+def test_concurrency_is_capped():
+    send = FakeSend()
+    dispatcher = ReplyDispatcher(send, concurrency=3)
+    try:
+        futures = [dispatcher.submit(make_reply(f'reply {i}', f'user{i}@lululemon.com')) for i in range(12)]
+        assert all(future.result(TIMEOUT) for future in futures)
+    finally:
+        dispatcher.close()
+
+    assert send.max_in_flight == 3
+    assert len(send.sent) == 12
+
+
+def test_recipient_interval_spaces_sends_to_the_same_recipient():
+    interval = 0.1
+    send = FakeSend(duration=0)
+    dispatcher = ReplyDispatcher(send, concurrency=4, recipient_interval=interval)
+    try:
+        futures = [dispatcher.submit(make_reply(f'a{i}', 'A <a@lululemon.com>')) for i in range(3)]
+        futures += [dispatcher.submit(make_reply(f'b{i}', 'b@lululemon.com')) for i in range(2)]
+        assert all(future.result(TIMEOUT) for future in futures)
+    finally:
+        dispatcher.close()
+
+    for recipient, count in (('A <a@lululemon.com>', 3), ('b@lululemon.com', 2)):
+        times = send.times[recipient]
+        assert len(times) == count
+        assert all(later - earlier >= interval * 0.9 for earlier, later in zip(times, times[1:]))
+    # 不同收件人之间不互相等待
+    assert abs(send.times['b@lululemon.com'][0] - send.times['A <a@lululemon.com>'][0]) < interval / 2
+
+
+def test_futures_report_each_outcome():
+    send = FakeSend(duration=0, failures={'refused'}, errors={'broken'})
+    dispatcher = ReplyDispatcher(send, concurrency=2)
+    try:
+        ok = dispatcher.submit(make_reply('ok'), 'extra', 1)
+        refused = dispatcher.submit(make_reply('refused'))
+        broken = dispatcher.submit(make_reply('broken'))
+        assert ok.result(TIMEOUT) is True
+        assert refused.result(TIMEOUT) is False
+        # 发送异常不会传给调用方，结果为False
+        assert broken.result(TIMEOUT) is False
+    finally:
+        dispatcher.close()
+
+    # 额外参数原样传给发送函数
+    assert ('ok', ('extra', 1)) in send.sent
+
+
+def test_close_waits_for_submitted_sends():
+    send = FakeSend(duration=0.1)
+    dispatcher = ReplyDispatcher(send, concurrency=2, recipient_interval=0.05)
+    futures = [dispatcher.submit(make_reply(f'reply {i}')) for i in range(4)]
+    dispatcher.close()
+
+    assert all(future.done() and future.result() for future in futures)
+    assert len(send.sent) == 4
+
+
+def test_failed_sends_are_not_recorded_as_processed(make_approver):
+    email_auto_approve = pytest.importorskip('email_auto_approve')
+    approver = make_approver()
+    emails = [
+        {'subject': f'RITM000000{number} - approval request', 'message_id': f'<msg{number}@service-now.com>',
+         'from': 'ServiceNow <luluprod@service-now.com>', 'short_description': 'China Cloud Resource Request'}
+        for number in range(4)
+    ]
+    send = FakeSend(duration=0, failures={'RITM0000001 - approval request'},
+                    errors={'RITM0000002 - approval request'})
+    dispatcher = ReplyDispatcher(send, concurrency=2)
+    job = email_auto_approve.MboxScanJob('NeedApprove')
+    try:
+        job.pending_sends = [(email_info, dispatcher.submit(make_reply(email_info['subject'])))
+                             for email_info in emails]
+        confirmed = list(approver._collect_sends(job, wait=True))
+    finally:
+        dispatcher.close()
+
+    assert [email_info['message_id'] for email_info in confirmed] == ['<msg0@service-now.com>',
+                                                                       '<msg3@service-now.com>']
+    assert job.failed
+    assert job.processed_count == 2
+    processed = approver.get_processed_store()
+    assert '<msg0@service-now.com>' in processed and '<msg3@service-now.com>' in processed
+    assert '<msg1@service-now.com>' not in processed and '<msg2@service-now.com>' not in processed
+    summary_ids = [record['message_id'] for record in approver.get_summary_store().records()]
+    assert summary_ids == ['<msg0@service-now.com>', '<msg3@service-now.com>']
+    assert [record['ticket_number'] for record in job.processed_records] == ['RITM0000000', 'RITM0000003']
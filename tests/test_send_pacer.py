@@ -0,0 +1,51 @@
+"""send_pacer的测试：发送完成检测和已发送文件夹不变化时的回退"""
+
+import logging
+
+import pytest
+
+import send_pacer
+from send_pacer import SendPacer, SENT_FOLDER_MAX_TIMEOUTS
+
+
+@pytest.fixture(autouse=True)
+def fast_poll(monkeypatch):
+    monkeypatch.setattr(send_pacer, 'COMPLETION_POLL_SECONDS', 0.01)
+
+
+@pytest.fixture
+def folders(tmp_path):
+    outbox = tmp_path / 'Unsent Messages'
+    sent = tmp_path / 'Sent'
+    outbox.write_bytes(b'')
+    sent.write_bytes(b'From - old\n')
+    return outbox, sent
+
+
+def make_pacer(folders):
+    outbox, sent = folders
+    return SendPacer(min_interval=0, max_interval=0.05, outbox_path=str(outbox), sent_path=str(sent),
+                     logger=logging.getLogger('test_send_pacer'))
+
+
+def test_completion_detected_when_sent_folder_grows(folders):
+    pacer = make_pacer(folders)
+    pacer.wait_before_send()
+    with open(folders[1], 'ab') as f:
+        f.write(b'From - new\n')
+    assert pacer.wait_for_completion()
+
+
+def test_falls_back_to_outbox_when_sent_folder_never_grows(folders, caplog):
+    pacer = make_pacer(folders)
+    for _ in range(SENT_FOLDER_MAX_TIMEOUTS):
+        # 已发送邮件保存在服务器上，本地已发送文件夹一直不变，每次都等到超时
+        assert pacer.sent_path is not None
+        pacer.wait_before_send()
+        pacer.record_send(True)
+    assert pacer.sent_path is None
+    assert '改为只检测发件箱' in caplog.text
+
+    # 之后只检测发件箱，发件箱没有继续变大即视为完成
+    pacer.wait_before_send()
+    assert pacer.wait_for_completion()
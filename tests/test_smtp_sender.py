@@ -0,0 +1,223 @@
+"""smtp_sender的测试：在本机启动一个最小的SMTP服务器，检查实际收到的命令和邮件"""
+
+import os
+import time
+import socket
+import smtplib
+import threading
+import socketserver
+from email.mime.text import MIMEText
+
+import pytest
+
+from smtp_sender import SMTPSender
+
+
+class StubSMTPHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        server = self.server
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        with server.lock:
+            server.connections += 1
+            server.active.add(self.request)
+        try:
+            self.reply('220 stub')
+            self.session()
+        except OSError:
+            pass  # 连接已被drop_connections关闭
+        finally:
+            with server.lock:
+                server.active.discard(self.request)
+
+    def session(self):
+        server = self.server
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode().strip()
+            verb = command.split(' ', 1)[0].split(':', 1)[0].upper()
+            with server.lock:
+                server.commands.append(verb)
+            if verb == 'EHLO':
+                self.reply('250-stub')
+                self.reply('250 PIPELINING' if server.pipelining else '250 HELP')
+            elif verb == 'RCPT' and any(addr in command for addr in server.refused):
+                self.reply('550 no such user')
+            elif verb in ('MAIL', 'RCPT', 'RSET', 'NOOP'):
+                self.reply('250 OK')
+            elif verb == 'DATA':
+                self.reply('354 go ahead')
+                lines = []
+                while True:
+                    line = self.rfile.readline()
+                    if not line:
+                        return
+                    if line.rstrip(b'\r\n') == b'.':
+                        break
+                    lines.append(line)
+                with server.lock:
+                    server.messages.append(b''.join(lines))
+                self.reply('250 queued')
+            elif verb == 'QUIT':
+                self.reply('221 bye')
+                return
+            else:
+                self.reply('502 not implemented')
+
+    def reply(self, line):
+        self.wfile.write((line + '\r\n').encode())
+
+
+class StubSMTPServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, pipelining=True):
+        super().__init__(('127.0.0.1', 0), StubSMTPHandler)
+        self.pipelining = pipelining
+        self.refused = set()  # 这些地址的RCPT返回550
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.commands = []
+        self.messages = []
+        self.active = set()  # 当前打开的客户端连接
+
+    def drop_connections(self):
+        """像空闲超时的服务器一样发送421并关闭所有连接"""
+        with self.lock:
+            connections = list(self.active)
+        for conn in connections:
+            try:
+                conn.sendall(b'421 idle timeout\r\n')
+                conn.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        deadline = time.monotonic() + 5
+        while self.active and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+
+@pytest.fixture(params=[True, False], ids=['pipelining', 'no-pipelining'])
+def smtp_server(request):
+    server = StubSMTPServer(pipelining=request.param)
+    thread = threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def make_sender(server, **kwargs):
+    return SMTPSender('127.0.0.1', server.server_address[1], security='none', **kwargs)
+
+
+def make_reply(number, to_addr='luluprod@service-now.com'):
+    msg = MIMEText("Ref:MSG85395759", 'plain', 'utf-8')
+    msg['From'] = "Edward Li <eli23@lululemon.com>"
+    msg['To'] = to_addr
+    msg['Subject'] = f"Re: RITM{number:07d} - approve"
+    return msg
+
+
+def test_send_reply_submits_in_auto_mode(smtp_server):
+    sender = make_sender(smtp_server)
+    try:
+        assert sender.send_reply(make_reply(1), 'luluprod@service-now.com', 'Re: RITM0000001', '', auto_send=True)
+    finally:
+        sender.close()
+    assert len(smtp_server.messages) == 1
+    assert b'Subject: Re: RITM0000001 - approve' in smtp_server.messages[0]
+
+
+def test_send_reply_draft_mode_saves_eml_without_submitting(smtp_server, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    sender = make_sender(smtp_server)
+    try:
+        for number in range(3):
+            assert sender.send_reply(make_reply(number), 'luluprod@service-now.com', '', '', auto_send=False)
+    finally:
+        sender.close()
+
+    assert smtp_server.connections == 0
+    assert smtp_server.messages == []
+    drafts = sorted(os.listdir(tmp_path))
+    assert len(drafts) == 3
+    assert all(name.startswith('approval_reply_') and name.endswith('.eml') for name in drafts)
+    contents = [(tmp_path / name).read_text(encoding='utf-8') for name in drafts]
+    assert sorted(c.count('Subject: Re: RITM') for c in contents) == [1, 1, 1]
+
+
+def test_messages_share_one_connection(smtp_server):
+    sender = make_sender(smtp_server)
+    try:
+        for number in range(5):
+            assert sender.send_message(make_reply(number)) == {}
+    finally:
+        sender.close()
+
+    assert smtp_server.connections == 1
+    assert sender.pool.connects == 1
+    assert len(smtp_server.messages) == 5
+    # 只登录一次，之后每封邮件前用RSET清除上一封的状态
+    assert smtp_server.commands == (['EHLO', 'MAIL', 'RCPT', 'DATA'] +
+                                    ['RSET', 'MAIL', 'RCPT', 'DATA'] * 4 + ['QUIT'])
+
+
+def test_reconnects_after_server_drops_idle_connection(smtp_server):
+    sender = make_sender(smtp_server)
+    try:
+        sender.send_message(make_reply(1))
+        smtp_server.drop_connections()
+        assert sender.send_message(make_reply(2)) == {}
+    finally:
+        sender.close()
+
+    assert smtp_server.connections == 2
+    assert sender.pool.connects == 2
+    assert len(smtp_server.messages) == 2
+
+
+def test_reconnects_without_reset_after_idle_timeout(smtp_server):
+    sender = make_sender(smtp_server, idle_timeout=0.05)
+    try:
+        sender.send_message(make_reply(1))
+        time.sleep(0.1)
+        sender.send_message(make_reply(2))
+    finally:
+        sender.close()
+
+    assert smtp_server.connections == 2
+    assert len(smtp_server.messages) == 2
+    # 空闲太久的连接直接关闭，新连接上不需要RSET
+    assert 'RSET' not in smtp_server.commands
+    assert smtp_server.commands.count('QUIT') == 2
+
+
+def test_partially_refused_recipients_are_returned(smtp_server):
+    smtp_server.refused.add('nobody@lululemon.com')
+    sender = make_sender(smtp_server)
+    try:
+        refused = sender.send_message(make_reply(1, 'luluprod@service-now.com, nobody@lululemon.com'))
+    finally:
+        sender.close()
+
+    assert refused == {'nobody@lululemon.com': (550, b'no such user')}
+    assert len(smtp_server.messages) == 1
+
+
+def test_all_recipients_refused_keeps_connection_usable(smtp_server):
+    smtp_server.refused.add('nobody@lululemon.com')
+    sender = make_sender(smtp_server)
+    try:
+        with pytest.raises(smtplib.SMTPRecipientsRefused) as excinfo:
+            sender.send_message(make_reply(1, 'nobody@lululemon.com'))
+        assert excinfo.value.recipients == {'nobody@lululemon.com': (550, b'no such user')}
+        assert sender.send_message(make_reply(2)) == {}
+    finally:
+        sender.close()
+
+    # 被拒绝的邮件没有发送DATA，下一封邮件在同一个连接上RSET后发送
+    assert smtp_server.connections == 1
+    assert len(smtp_server.messages) == 1
+    assert smtp_server.commands == ['EHLO', 'MAIL', 'RCPT', 'RSET', 'MAIL', 'RCPT', 'DATA', 'QUIT']
@@ -0,0 +1,147 @@
+"""汇总导出的测试：CSV往返读取、列式格式分块，以及安装了openpyxl/pyarrow/numpy时的xlsx、Parquet和.npz导出"""
+
+import csv
+import zipfile
+import importlib.util
+
+import pytest
+
+import email_auto_approve
+from email_auto_approve import SUMMARY_EXPORT_COLUMNS, export_file_extension, iter_summary_chunks, summary_row
+
+RECORDS = [
+    {
+        'processed_time': '2025-09-08 10:00:00', 'ticket_number': 'RITM0000001',
+        'short_description': 'China Cloud Account and Permission Request', 'subject': 'RITM0000001 - approval request',
+        'from': 'ServiceNow <luluprod@service-now.com>', 'message_id': '<msg1@service-now.com>',
+        'requested_by': 'Li, Edward', 'environment': 'prod', 'required_permissions': 'read "billing", write',
+        'reason_for_application': '月度对账\n第二行', 'is_china_cloud': True
+    },
+    {
+        'processed_time': '2025-09-08 10:05:00', 'ticket_number': 'CHG0000002',
+        'short_description': 'CN-Server & DB Access Control', 'subject': 'CHG0000002 - approval request',
+        'from': 'ServiceNow <luluprod@service-now.com>', 'message_id': '<msg2@service-now.com>',
+        'requested_by': None
+    },
+    {'processed_time': '2025-09-09 09:00:00', 'ticket_number': 'RITM0000003', 'is_china_cloud': False},
+]
+
+
+def expected_values(record):
+    """导出后每一列的值：缺少的字段为空字符串，is_china_cloud为布尔值"""
+    return {
+        column: bool(record.get(column)) if column == 'is_china_cloud' else record.get(column) or ''
+        for column in SUMMARY_EXPORT_COLUMNS
+    }
+
+
+@pytest.fixture
+def approver(make_approver):
+    return make_approver()
+
+
+@pytest.mark.parametrize('as_callable', [False, True], ids=['list', 'iterator'])
+def test_csv_round_trip(approver, tmp_path, as_callable):
+    filename = tmp_path / 'summary.csv'
+    summary_data = (lambda: iter(RECORDS)) if as_callable else RECORDS
+
+    assert approver.export_summary_to_file(summary_data, 'title', str(filename), 'csv')
+
+    # 带BOM，Excel可以直接识别UTF-8
+    assert filename.read_bytes().startswith(b'\xef\xbb\xbf')
+    with open(filename, encoding='utf-8-sig', newline='') as f:
+        rows = list(csv.DictReader(f))
+    assert list(rows[0]) == SUMMARY_EXPORT_COLUMNS
+    for row in rows:
+        row['is_china_cloud'] = row['is_china_cloud'] == 'True'
+    assert rows == [expected_values(record) for record in RECORDS]
+
+
+def test_csv_without_records_leaves_no_file(approver, tmp_path):
+    filename = tmp_path / 'summary.csv'
+    assert not approver.export_summary_to_csv(lambda: iter([]), str(filename))
+    assert not filename.exists()
+
+
+def test_summary_chunks_split_every_chunk_rows():
+    chunks = list(iter_summary_chunks(lambda: iter(RECORDS * 3), chunk_rows=4))
+    assert [len(chunk['ticket_number']) for chunk in chunks] == [4, 4, 1]
+    assert all(list(chunk) == SUMMARY_EXPORT_COLUMNS for chunk in chunks)
+    rows = [
+        {column: chunk[column][index] for column in SUMMARY_EXPORT_COLUMNS}
+        for chunk in chunks for index in range(len(chunk['ticket_number']))
+    ]
+    assert rows == [expected_values(record) for record in RECORDS * 3]
+
+
+def without_modules(monkeypatch, *names):
+    """让find_spec找不到指定的模块"""
+    find_spec = importlib.util.find_spec
+    monkeypatch.setattr(importlib.util, 'find_spec', lambda name, *args: None if name in names else find_spec(name, *args))
+
+
+def test_export_file_extension(monkeypatch):
+    assert export_file_extension('XLSX') == 'xlsx'
+    assert export_file_extension('csv') == 'csv'
+    assert export_file_extension('txt') == 'txt'
+    assert export_file_extension('unknown') == 'txt'
+    without_modules(monkeypatch, 'pyarrow')
+    assert export_file_extension('parquet') == 'npz'
+
+
+def test_columnar_export_needs_pyarrow_or_numpy(approver, tmp_path, monkeypatch):
+    without_modules(monkeypatch, 'pyarrow', 'numpy')
+    filename = tmp_path / 'summary.parquet'
+    assert not approver.export_summary_to_file(RECORDS, 'title', str(filename), 'parquet')
+    assert not filename.exists()
+
+
+@pytest.mark.parametrize('sample_rows', [1000, 2], ids=['all_sampled', 'partly_sampled'])
+def test_xlsx_export(approver, tmp_path, monkeypatch, sample_rows):
+    openpyxl = pytest.importorskip('openpyxl')
+    # 估算列宽只读取前sample_rows行，其余行在写入时继续读取
+    monkeypatch.setattr(email_auto_approve, 'EXCEL_WIDTH_SAMPLE_ROWS', sample_rows)
+    filename = tmp_path / 'summary.xlsx'
+
+    assert approver.export_summary_to_file(lambda: iter(RECORDS), '📊 邮件处理汇总报告', str(filename), 'xlsx')
+
+    rows = list(openpyxl.load_workbook(filename).active.iter_rows(values_only=True))
+    assert rows[0][0] == '📊 邮件处理汇总报告'
+    header_index = next(index for index, row in enumerate(rows) if row[0] == '序号')
+    assert list(rows[header_index][:8]) == ['序号', '处理时间', '单号', 'Short Description', 'Requested by',
+                                            'Environment', 'Required Permissions', 'Reason']
+    data = rows[header_index + 1:header_index + 1 + len(RECORDS)]
+    assert [list(row[:8]) for row in data] == [
+        summary_row(index, record, True) for index, record in enumerate(RECORDS, 1)]
+    assert rows[-1][0] == f"总计处理邮件: {len(RECORDS)} 封"
+
+
+def test_parquet_export(approver, tmp_path):
+    pytest.importorskip('pyarrow')
+    import pyarrow.parquet as pq
+    filename = tmp_path / 'summary.parquet'
+
+    assert approver.export_summary_to_file(lambda: iter(RECORDS), 'title', str(filename), 'parquet')
+
+    table = pq.read_table(filename)
+    assert table.column_names == SUMMARY_EXPORT_COLUMNS
+    assert table.to_pylist() == [expected_values(record) for record in RECORDS]
+
+
+def test_npz_export(approver, tmp_path, monkeypatch):
+    np = pytest.importorskip('numpy')
+    monkeypatch.setattr(email_auto_approve, 'iter_summary_chunks',
+                        lambda summary_data: iter_summary_chunks(summary_data, chunk_rows=2))
+    filename = tmp_path / 'summary.npz'
+
+    assert approver._export_summary_to_npz(lambda: iter(RECORDS), str(filename))
+
+    with zipfile.ZipFile(filename) as zf:
+        assert len(zf.namelist()) == 2 * len(SUMMARY_EXPORT_COLUMNS)
+    with np.load(filename) as arrays:
+        columns = {
+            column: [value.item() for chunk in range(2) for value in arrays[f'{column}_{chunk:05d}']]
+            for column in SUMMARY_EXPORT_COLUMNS
+        }
+    assert [dict(zip(columns, values)) for values in zip(*columns.values())] == [
+        expected_values(record) for record in RECORDS]
@@ -0,0 +1,113 @@
+"""email_auto_approve命令行汇总报告的测试：--stats按天/按周统计（包括跨周的日期）、--date/--from/--to按日期范围查询，以及--find查找单号"""
+
+import re
+import shutil
+
+import pytest
+
+# (处理日期, Short description)：2025-09-07是周日，2025-09-08是周一
+RECORDS = [
+    ('2025-09-07', 'China Cloud Resource Request'),
+    ('2025-09-07', 'CN-Server & DB Access Control'),
+    ('2025-09-08', 'China Cloud Resource Request'),
+    ('2025-09-08', 'China Cloud Account and Permission Request'),
+    ('2025-09-08', 'Laptop replacement'),
+    ('2025-09-10', 'China Cloud Resource Request'),
+]
+
+
+def make_message(number):
+    return (
+        f"From - Mon Sep 08 10:00:00 2025\n"
+        f"Message-ID: <msg{number}@service-now.com>\n"
+        f"From: ServiceNow <luluprod@service-now.com>\n"
+        f"Subject: RITM{number:07d} - approval request\n"
+        f"\n"
+        f"Short Description: China Cloud Resource Request\n"
+        f"\n"
+    ).encode()
+
+
+@pytest.fixture(params=['sqlite', 'jsonl'])
+def run_main(request, tmp_path, make_approver, monkeypatch, capsys):
+    """写入汇总记录和待批准邮件，返回以给定参数运行main的函数，结果为 (返回值, 输出)"""
+    email_auto_approve = pytest.importorskip('email_auto_approve')
+    approver = make_approver(summary_backend=request.param, watch_folder='Local Folders/NeedApprove')
+    store = approver.get_summary_store()
+    store.append_many([
+        {
+            'ticket_number': f'RITM{number:07d}',
+            'short_description': short_description,
+            'requested_by': f'User {number % 2}',
+            'processed_time': f'{date} 10:00:{number:02d}'
+        }
+        for number, (date, short_description) in enumerate(RECORDS)
+    ])
+    store.sync()
+    # main读取当前目录下的config.ini
+    shutil.copy(approver.config_file, tmp_path / 'config.ini')
+    mail_dir = tmp_path / 'abcd.default' / 'Mail' / 'Local Folders'
+    mail_dir.mkdir(parents=True)
+    (mail_dir / 'NeedApprove').write_bytes(make_message(1) + make_message(2))
+    capsys.readouterr()
+
+    def run(*args):
+        monkeypatch.setattr('sys.argv', ['email_auto_approve.py', *args])
+        result = email_auto_approve.main()
+        return result, capsys.readouterr().out
+
+    return run
+
+
+def stats_totals(output):
+    """从--stats的输出中取出 {周期起始日期: 总数}"""
+    return {start: int(count) for start, count in re.findall(r'^(\d{4}-\d{2}-\d{2}) +(\d+) ', output, re.M)}
+
+
+@pytest.mark.parametrize('args, expected', [
+    (['--stats'], {'2025-09-07': 2, '2025-09-08': 3, '2025-09-10': 1}),
+    (['--stats', '--from', '2025-09-08', '--to', '2025-09-09'], {'2025-09-08': 3}),
+    (['--stats', '--week'], {'2025-09-01': 2, '2025-09-08': 4}),
+    # 起始日期所在的整周都计入
+    (['--stats', '--week', '--from', '2025-09-07'], {'2025-09-01': 2, '2025-09-08': 4}),
+    (['--stats', '--week', '--from', '2025-09-08'], {'2025-09-08': 4}),
+    (['--stats', '--week', '--to', '2025-09-07'], {'2025-09-01': 2}),
+])
+def test_stats_report(run_main, args, expected):
+    result, output = run_main(*args)
+    assert result == 0
+    assert stats_totals(output) == expected
+    assert f"总计处理邮件: {sum(expected.values())} 封" in output
+
+
+@pytest.mark.parametrize('args, tickets', [
+    (['--date', '2025-09-08'], [2, 3, 4]),
+    (['--from', '2025-09-07', '--to', '2025-09-08'], [0, 1, 2, 3, 4]),
+    (['--to', '2025-09-07'], [0, 1]),
+])
+def test_date_range_report(run_main, args, tickets):
+    result, output = run_main(*args)
+    assert result == 0
+    assert re.findall(r'RITM\d{7}', output) == [f'RITM{number:07d}' for number in tickets]
+    assert f"处理邮件: {len(tickets)} 封" in output
+
+
+@pytest.mark.parametrize('args', [
+    ['--date', '2025-9-8'],
+    ['--stats', '--from', '20250908'],
+    ['--from', '2025-09-10', '--to', '2025-09-08'],
+])
+def test_invalid_dates_rejected(run_main, args):
+    result, output = run_main(*args)
+    assert result == 1
+    assert '错误' in output
+
+
+def test_find_pending_ticket(run_main):
+    result, output = run_main('--find', 'ritm0000002')
+    assert result == 0
+    assert '<msg2@service-now.com>' in output
+
+    result, output = run_main('--find', 'RITM0000003')
+    assert result == 1
+    assert 'RITM0000003 不在 Local Folders/NeedApprove 中' in output
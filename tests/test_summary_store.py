@@ -0,0 +1,294 @@
+"""summary_store的测试：两种后端的追加、重新打开和按日期范围查询，.idx索引过期或丢失时重建，旧汇总文件只导入一次，
+以及按天/按周的汇总计数与逐条计数一致（包括跨周的日期）
+"""
+
+import os
+import json
+import datetime
+
+import pytest
+
+from summary_store import (
+    JsonlSummaryStore, SqliteSummaryStore, add_rollup, filter_rollups, migrate_legacy_summary,
+    open_summary_store, period_start, rollup_keys
+)
+
+
+def make_record(number, date, short_description='China Cloud Resource Request', requested_by=None):
+    return {
+        'ticket_number': f'RITM{number:07d}',
+        'short_description': short_description,
+        'requested_by': requested_by or f'User {number % 3}',
+        'processed_time': f'{date} 10:{number % 60:02d}:00',
+        'message_id': f'<msg{number}@service-now.com>'
+    }
+
+
+# 日期交错写入，JSONL索引中同一天的记录分成多个字节区间
+DATES = ['2025-09-01', '2025-09-02', '2025-09-01', '2025-09-03', '2025-09-05', '2025-09-02']
+RECORDS = [make_record(number, date) for number, date in enumerate(DATES)]
+
+
+def ticket_numbers(records):
+    return [record['ticket_number'] for record in records]
+
+
+def brute_force_query(records, start_date=None, end_date=None):
+    return [
+        record for record in records
+        if (not start_date or record['processed_time'][:10] >= start_date)
+        and (not end_date or record['processed_time'][:10] <= end_date)
+    ]
+
+
+@pytest.fixture(params=['sqlite', 'jsonl'])
+def store_path(request, tmp_path):
+    """返回 (后端名称, 存储文件路径)"""
+    return request.param, str(tmp_path / f'processing_summary.{request.param}')
+
+
+@pytest.mark.parametrize('start_date, end_date', [
+    (None, None),
+    ('2025-09-02', None),
+    (None, '2025-09-02'),
+    ('2025-09-01', '2025-09-01'),
+    ('2025-09-02', '2025-09-03'),
+    ('2025-09-04', '2025-09-04'),
+])
+def test_iter_query_by_date_range_survives_reopen(store_path, start_date, end_date):
+    backend, path = store_path
+    store = open_summary_store(backend, path)
+    try:
+        assert store.is_empty()
+        store.append(RECORDS[0])
+        store.append_many(RECORDS[1:4])
+        assert not store.is_empty()
+    finally:
+        store.close()
+
+    store = open_summary_store(backend, path)
+    try:
+        store.append_many(RECORDS[4:])
+        expected = ticket_numbers(brute_force_query(RECORDS, start_date, end_date))
+        assert ticket_numbers(store.iter_query(start_date, end_date)) == expected
+        assert ticket_numbers(store.query(start_date, end_date)) == expected
+    finally:
+        store.close()
+
+
+def test_query_filters_by_ticket_and_description(store_path):
+    backend, path = store_path
+    store = open_summary_store(backend, path)
+    try:
+        store.append_many(RECORDS + [
+            make_record(10, '2025-09-02', 'CN-Server & DB Access Control - prod'),
+            make_record(11, '2025-09-02', '100%_done'),
+        ])
+        assert ticket_numbers(store.query(ticket_number='ritm0000003')) == ['RITM0000003']
+        assert ticket_numbers(store.query('2025-09-02', '2025-09-02', short_description='cn-server')) == [
+            'RITM0000010']
+        # LIKE的通配符按字面匹配
+        assert ticket_numbers(store.query(short_description='100%_')) == ['RITM0000011']
+        assert store.query(short_description='100%x') == []
+    finally:
+        store.close()
+
+
+def test_unsynced_jsonl_records_are_indexed_on_reopen(tmp_path):
+    path = str(tmp_path / 'processing_summary.jsonl')
+    store = JsonlSummaryStore(path, fsync_batch=2)
+    store.append_many(RECORDS[:2])
+    # 意外退出：最后一条记录已写入文件，但还没有fsync和保存索引
+    store.append(RECORDS[2])
+    store._file.close()
+    with open(store.index_path, encoding='utf-8') as f:
+        assert json.load(f)['size'] < os.path.getsize(path)
+
+    store = JsonlSummaryStore(path)
+    try:
+        assert ticket_numbers(store.query('2025-09-01', '2025-09-01')) == ['RITM0000000', 'RITM0000002']
+        with open(store.index_path, encoding='utf-8') as f:
+            assert json.load(f)['size'] == os.path.getsize(path)
+    finally:
+        store.close()
+
+
+@pytest.mark.parametrize('damage', ['missing', 'corrupt', 'replaced'])
+def test_jsonl_index_rebuilt_when_missing_or_stale(tmp_path, damage):
+    path = str(tmp_path / 'processing_summary.jsonl')
+    store = JsonlSummaryStore(path)
+    store.append_many(RECORDS)
+    store.close()
+
+    if damage == 'missing':
+        os.remove(store.index_path)
+    elif damage == 'corrupt':
+        with open(store.index_path, 'w', encoding='utf-8') as f:
+            f.write('{"size": 12, "dates": ')
+    else:
+        # 文件被换成更短的另一份，索引中的字节区间全部失效
+        with open(path, 'w', encoding='utf-8') as f:
+            for record in RECORDS[3:5]:
+                f.write(json.dumps(record) + '\n')
+    expected = RECORDS[3:5] if damage == 'replaced' else RECORDS
+
+    store = JsonlSummaryStore(path)
+    try:
+        for start_date, end_date in (('2025-09-01', '2025-09-02'), ('2025-09-03', '2025-09-05'), (None, None)):
+            assert ticket_numbers(store.query(start_date, end_date)) == ticket_numbers(
+                brute_force_query(expected, start_date, end_date))
+        assert sum(counts['total'][''] for _, counts in store.rollups('day')) == len(expected)
+    finally:
+        store.close()
+
+
+def test_jsonl_ignores_partially_written_last_line(tmp_path):
+    path = str(tmp_path / 'processing_summary.jsonl')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps(RECORDS[0]) + '\n')
+        f.write(json.dumps(RECORDS[1])[:20])
+
+    store = JsonlSummaryStore(path)
+    try:
+        assert ticket_numbers(store.records()) == ['RITM0000000']
+    finally:
+        store.close()
+
+
+def test_legacy_summary_migrated_only_once(store_path, tmp_path):
+    backend, path = store_path
+    legacy = tmp_path / 'processing_summary.json'
+    legacy.write_text(json.dumps(RECORDS[:3]), encoding='utf-8')
+
+    store = open_summary_store(backend, path)
+    try:
+        assert migrate_legacy_summary(store, str(legacy)) == 3
+        assert migrate_legacy_summary(store, str(legacy)) == 0
+        store.append(RECORDS[3])
+    finally:
+        store.close()
+
+    # 重新打开后存储不为空，不会再次导入
+    store = open_summary_store(backend, path)
+    try:
+        assert migrate_legacy_summary(store, str(legacy)) == 0
+        assert migrate_legacy_summary(store, str(tmp_path / 'missing.json')) == 0
+        assert ticket_numbers(store.records()) == ticket_numbers(RECORDS[:4])
+    finally:
+        store.close()
+
+
+def test_open_summary_store_rejects_unknown_backend(tmp_path):
+    with pytest.raises(ValueError):
+        open_summary_store('csv', str(tmp_path / 'summary.csv'))
+
+
+# 跨周（周日/周一）和跨年的日期，以及不同的请求类型和申请人
+ROLLUP_DATES = ['2024-12-29', '2024-12-30', '2025-01-01', '2025-01-05', '2025-01-06',
+                '2025-09-07', '2025-09-08', '2025-09-14', '2025-09-15']
+ROLLUP_DESCRIPTIONS = ['China Cloud Account and Permission Request', 'china cloud resource request - prod',
+                       'CN-Server & DB Access Control', 'Laptop replacement', '']
+
+
+def rollup_records():
+    records = [
+        make_record(number, date, ROLLUP_DESCRIPTIONS[number % 5], f'User {number % 4}')
+        for number, date in enumerate(ROLLUP_DATES * 3)
+    ]
+    # 处理时间无效的记录不计入统计
+    records.append(dict(make_record(99, '2025-09-08'), processed_time=''))
+    return records
+
+
+def brute_force_rollups(records, period, start_date=None, end_date=None):
+    """逐条计数，周起始日期用isocalendar单独计算"""
+    counts = {}
+    for record in records:
+        try:
+            date = datetime.date.fromisoformat(record['processed_time'][:10])
+        except ValueError:
+            continue
+        if period == 'week':
+            start = date.fromisocalendar(*date.isocalendar()[:2], 1)
+            last = start + datetime.timedelta(days=6)
+        else:
+            start = last = date
+        # 返回与日期范围有重叠的周期（整周计数）
+        if (start_date and last.isoformat() < start_date) or (end_date and start.isoformat() > end_date):
+            continue
+        description = record['short_description'].lower()
+        if description.startswith('china cloud account and permission request'):
+            request_type = 'China Cloud Account'
+        elif description.startswith('china cloud resource request'):
+            request_type = 'China Cloud Resource'
+        elif description.startswith('cn-server & db access control'):
+            request_type = 'CN-Server & DB Access Control'
+        else:
+            request_type = 'Other'
+        period_counts = counts.setdefault(start.isoformat(), {'total': {}, 'type': {}, 'requester': {}})
+        for dimension, key in (('total', ''), ('type', request_type), ('requester', record['requested_by'])):
+            period_counts[dimension][key] = period_counts[dimension].get(key, 0) + 1
+    return sorted(counts.items())
+
+
+@pytest.mark.parametrize('date_str, expected', [
+    ('2025-09-07', '2025-09-01'),
+    ('2025-09-08', '2025-09-08'),
+    ('2025-09-14', '2025-09-08'),
+    ('2025-01-01', '2024-12-30'),
+])
+def test_period_start(date_str, expected):
+    assert period_start(date_str, 'week') == expected
+    assert period_start(date_str, 'day') == date_str
+
+
+@pytest.mark.parametrize('period', ['day', 'week'])
+@pytest.mark.parametrize('start_date, end_date', [
+    (None, None),
+    ('2025-01-05', '2025-01-06'),
+    ('2025-01-01', None),
+    (None, '2025-09-07'),
+    ('2025-09-09', '2025-09-13'),
+])
+def test_rollups_match_brute_force_counts(store_path, period, start_date, end_date):
+    backend, path = store_path
+    records = rollup_records()
+    store = open_summary_store(backend, path)
+    try:
+        store.append_many(records[:10])
+    finally:
+        store.close()
+
+    store = open_summary_store(backend, path)
+    try:
+        for record in records[10:]:
+            store.append(record)
+        expected = brute_force_rollups(records, period, start_date, end_date)
+        assert store.rollups(period, start_date, end_date) == expected
+    finally:
+        store.close()
+
+    # 内存中的汇总结构按相同规则筛选
+    rollups = {}
+    for record in records:
+        for key in rollup_keys(record):
+            add_rollup(rollups, *key)
+    assert filter_rollups(rollups, period, start_date, end_date) == expected
+
+
+def test_sqlite_rollups_backfilled_for_existing_records(tmp_path):
+    path = str(tmp_path / 'processing_summary.db')
+    records = rollup_records()
+    store = SqliteSummaryStore(path)
+    store.append_many(records)
+    # 模拟旧版本的数据库：只有记录，没有汇总计数
+    with store.conn:
+        store.conn.execute('DELETE FROM rollups')
+    store.close()
+
+    store = SqliteSummaryStore(path)
+    try:
+        assert store.rollups('week') == brute_force_rollups(records, 'week')
+        assert store.rollups('day') == brute_force_rollups(records, 'day')
+    finally:
+        store.close()
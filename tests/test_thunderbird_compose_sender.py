@@ -0,0 +1,111 @@
+"""thunderbird_compose_sender的测试：用假的thunderbird、xdotool和osascript记录实际执行的命令"""
+
+import os
+import sys
+import json
+import time
+import textwrap
+
+import pytest
+
+from thunderbird_compose_sender import ThunderbirdComposeSender, build_compose_url
+
+TO_ADDR = '"Prod, ServiceNow" <luluprod@service-now.com>'
+SUBJECT = 'Re: RITM1602185 - "approve" & done?'
+BODY = 'Ref:MSG85395759\n\n批准，谢谢 100%'
+EXPECTED_URL = (
+    'mailto:luluprod@service-now.com'
+    '?subject=Re%3A%20RITM1602185%20-%20%22approve%22%20%26%20done%3F'
+    '&body=Ref%3AMSG85395759%0D%0A%0D%0A%E6%89%B9%E5%87%86%EF%BC%8C%E8%B0%A2%E8%B0%A2%20100%25'
+)
+
+
+def write_fake_command(bin_dir, name, log_file, exit_code=0):
+    """生成一个把自己的参数按行追加到log_file的假命令"""
+    path = bin_dir / name
+    path.write_text(textwrap.dedent(f'''\
+        #!{sys.executable}
+        import sys, json
+        with open({str(log_file)!r}, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(sys.argv) + '\\n')
+        sys.exit({exit_code})
+    '''), encoding='utf-8')
+    path.chmod(0o755)
+    return str(path)
+
+
+def read_calls(log_file, count=1, timeout=5):
+    """等待假命令被调用count次（thunderbird -compose是异步启动的）"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if log_file.exists():
+            calls = [json.loads(line) for line in log_file.read_text(encoding='utf-8').splitlines()]
+            if len(calls) >= count:
+                return calls
+        time.sleep(0.05)
+    raise AssertionError(f"{log_file.name} 没有被调用")
+
+
+@pytest.fixture
+def fake_bin(tmp_path, monkeypatch):
+    bin_dir = tmp_path / 'bin'
+    bin_dir.mkdir()
+    monkeypatch.setenv('PATH', str(bin_dir) + os.pathsep + os.environ.get('PATH', ''))
+    return bin_dir
+
+
+def test_build_compose_url_encodes_every_field():
+    assert build_compose_url(TO_ADDR, SUBJECT, BODY) == EXPECTED_URL
+
+
+def test_linux_send_runs_compose_and_xdotool(tmp_path, fake_bin):
+    thunderbird = write_fake_command(fake_bin, 'thunderbird', tmp_path / 'thunderbird.log')
+    write_fake_command(fake_bin, 'xdotool', tmp_path / 'xdotool.log')
+    sender = ThunderbirdComposeSender(thunderbird, system='Linux')
+
+    assert sender.send_reply(None, TO_ADDR, SUBJECT, BODY, auto_send=True) is True
+
+    assert read_calls(tmp_path / 'thunderbird.log') == [[thunderbird, '-compose', EXPECTED_URL]]
+    [xdotool_call] = read_calls(tmp_path / 'xdotool.log')
+    assert xdotool_call[1:] == [
+        'search', '--sync', '--limit', '1', '--name', r'Re: RITM1602185 - "approve" & done\?',
+        'windowactivate', '--sync', 'key', '--clearmodifiers', 'ctrl+Return'
+    ]
+
+
+def test_draft_mode_only_opens_compose_window(tmp_path, fake_bin):
+    thunderbird = write_fake_command(fake_bin, 'thunderbird', tmp_path / 'thunderbird.log')
+    write_fake_command(fake_bin, 'xdotool', tmp_path / 'xdotool.log')
+    sender = ThunderbirdComposeSender(thunderbird, system='Linux')
+
+    assert sender.send_reply(None, TO_ADDR, SUBJECT, BODY, auto_send=False) is True
+
+    assert read_calls(tmp_path / 'thunderbird.log') == [[thunderbird, '-compose', EXPECTED_URL]]
+    assert not (tmp_path / 'xdotool.log').exists()
+
+
+def test_macos_send_waits_for_the_compose_window(tmp_path, fake_bin):
+    thunderbird = write_fake_command(fake_bin, 'thunderbird', tmp_path / 'thunderbird.log')
+    write_fake_command(fake_bin, 'osascript', tmp_path / 'osascript.log')
+    sender = ThunderbirdComposeSender(thunderbird, system='Darwin')
+
+    assert sender.send_reply(None, TO_ADDR, SUBJECT, BODY, auto_send=True) is True
+
+    assert read_calls(tmp_path / 'thunderbird.log') == [[thunderbird, '-compose', EXPECTED_URL]]
+    [osascript_call] = read_calls(tmp_path / 'osascript.log')
+    assert osascript_call[1] == '-e'
+    script = osascript_call[2]
+    # 按主题查找撰写窗口，而不是向最前面的窗口盲按发送键
+    assert 'contains "Re: RITM1602185 - \\"approve\\" & done?"' in script
+    assert script.index('error "撰写窗口没有出现"') < script.index('keystroke return using {command down}')
+    assert 'error "发送后撰写窗口没有关闭"' in script
+
+
+def test_macos_send_fails_when_the_window_never_appears(tmp_path, fake_bin):
+    thunderbird = write_fake_command(fake_bin, 'thunderbird', tmp_path / 'thunderbird.log')
+    # 脚本找不到窗口时osascript以非0退出
+    write_fake_command(fake_bin, 'osascript', tmp_path / 'osascript.log', exit_code=1)
+    sender = ThunderbirdComposeSender(thunderbird, system='Darwin')
+
+    assert sender.send_reply(None, TO_ADDR, SUBJECT, BODY, auto_send=True) is False
+    read_calls(tmp_path / 'osascript.log')
@@ -0,0 +1,129 @@
+"""thunderbird_sender批量发送的测试：检查生成的AppleScript，并用假的osascript检查结果解析"""
+
+import os
+import sys
+import json
+import textwrap
+
+import pytest
+
+from thunderbird_sender import ThunderbirdSender, build_batch_applescript
+
+REPLIES = [
+    ('"Prod, ServiceNow" <luluprod@service-now.com>', 'Re: RITM0000001 - approve', 'Ref:MSG85395759'),
+    ('luluprod@service-now.com', 'Re: RITM0000002 - "quoted" \\ path', 'Line one\nLine "two"\t\\end'),
+    ('other@service-now.com', 'Re: RITM0000003 - approve', 'Ref:MSG85395759'),
+]
+
+RUNNING_CHECK = '(name of processes) contains "Thunderbird"'
+
+
+def test_batch_script_composes_every_reply_in_order():
+    script = build_batch_applescript(REPLIES, auto_send=True, compose_delay=1.5)
+
+    # Thunderbird只激活一次，每封邮件打开一个撰写窗口并按一次Cmd+Return
+    assert script.count('activate') == 1
+    assert script.count('keystroke "m" using {command down, shift down}') == 3
+    assert script.count('keystroke return using {command down}') == 3
+    assert script.count('delay 1.5') == 3
+    assert script.count('set sentCount to sentCount + 1') == 3
+    positions = [script.index(f'-- 第{index}封') for index in (1, 2, 3)]
+    assert positions == sorted(positions)
+
+    # 收件人只保留地址；引号和反斜杠转义，换行和制表符合并为空格
+    assert 'keystroke "luluprod@service-now.com"' in script
+    assert 'Prod, ServiceNow' not in script
+    assert 'keystroke "Re: RITM0000002 - \\"quoted\\" \\\\ path"' in script
+    assert 'keystroke "Line one Line \\"two\\" \\\\end"' in script
+    assert script.index('RITM0000001') < script.index('RITM0000002') < script.index('RITM0000003')
+    assert 'return (sentCount as text) & ":" & errMsg' in script
+
+
+def test_batch_script_without_auto_send_does_not_press_send():
+    script = build_batch_applescript(REPLIES, auto_send=False)
+
+    assert script.count('keystroke "m" using {command down, shift down}') == 3
+    assert 'keystroke return using {command down}' not in script
+    assert script.count('-- 不自动发送，留待手动发送') == 3
+
+
+def test_batch_send_requires_macos():
+    with pytest.raises(NotImplementedError):
+        ThunderbirdSender(system='Linux').send_emails_batch(REPLIES)
+
+
+@pytest.fixture
+def fake_osascript(tmp_path, monkeypatch):
+    """在PATH最前面放一个假的osascript，返回写入它的函数：
+
+    检查Thunderbird是否运行时输出true，其他脚本记录到osascript.log并输出给定内容、以给定状态退出。
+    """
+    bin_dir = tmp_path / 'bin'
+    bin_dir.mkdir()
+    monkeypatch.setenv('PATH', str(bin_dir) + os.pathsep + os.environ.get('PATH', ''))
+    log_file = tmp_path / 'osascript.log'
+
+    def write(output, exit_code=0):
+        path = bin_dir / 'osascript'
+        path.write_text(textwrap.dedent(f'''\
+            #!{sys.executable}
+            import sys, json
+            if {RUNNING_CHECK!r} in sys.argv[-1]:
+                print('true')
+                sys.exit(0)
+            with open({str(log_file)!r}, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(sys.argv) + '\\n')
+            sys.stdout.write({output!r})
+            sys.stderr.write('execution error')
+            sys.exit({exit_code})
+        '''), encoding='utf-8')
+        path.chmod(0o755)
+        return log_file
+
+    return write
+
+
+def read_scripts(log_file):
+    return [json.loads(line)[2] for line in log_file.read_text(encoding='utf-8').splitlines()]
+
+
+def test_batch_send_returns_sent_count(fake_osascript):
+    log_file = fake_osascript('3\n')
+    sender = ThunderbirdSender(system='Darwin')
+
+    assert sender.send_emails_batch(REPLIES, compose_delay=1) == 3
+
+    # 三封邮件在一次osascript中发送
+    [script] = read_scripts(log_file)
+    assert script == build_batch_applescript(REPLIES, auto_send=True, compose_delay=1)
+
+
+def test_batch_send_partial_failure_returns_count_before_error(fake_osascript, capsys):
+    fake_osascript('1:System Events got an error: Thunderbird is not allowed to send keystrokes.\n')
+    sender = ThunderbirdSender(system='Darwin')
+
+    assert sender.send_emails_batch(REPLIES) == 1
+    assert '第2封邮件发送失败: System Events got an error' in capsys.readouterr().out
+
+
+def test_batch_send_without_auto_send(fake_osascript):
+    log_file = fake_osascript('3\n')
+    sender = ThunderbirdSender(system='Darwin')
+
+    assert sender.send_emails_batch(REPLIES, auto_send=False) == 3
+    [script] = read_scripts(log_file)
+    assert 'keystroke return using {command down}' not in script
+
+
+def test_batch_send_empty_list_does_not_run_osascript(fake_osascript):
+    log_file = fake_osascript('0\n')
+
+    assert ThunderbirdSender(system='Darwin').send_emails_batch([]) == 0
+    assert not log_file.exists()
+
+
+def test_batch_send_raises_when_osascript_fails(fake_osascript):
+    fake_osascript('', exit_code=1)
+
+    with pytest.raises(Exception, match='AppleScript执行失败: execution error'):
+        ThunderbirdSender(system='Darwin').send_emails_batch(REPLIES)
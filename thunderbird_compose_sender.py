@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Thunderbird命令行撰写发送工具
+
+用 thunderbird -compose 一次调用打开已填好收件人、主题和正文的撰写窗口，
+不再逐字键入，只有最后的发送动作需要自动化：
+macOS通过AppleScript按Cmd+Return，其他系统通过xdotool按Ctrl+Return。
+两种方式都先等待标题包含主题的撰写窗口出现再发送，窗口没有出现时视为发送失败，
+macOS上还会等待撰写窗口关闭（Thunderbird发送完成后关闭撰写窗口）确认已经发出。
+-compose 使用mailto URL形式，所有字段都做百分号编码，逗号、引号和换行都可以原样传递。
+"""
+
+import re
+import sys
+import math
+import shutil
+import platform
+import subprocess
+from urllib.parse import quote
+
+from thunderbird_sender import clean_email_address, escape_applescript_string
+
+# macOS上Thunderbird可执行文件的默认位置
+MACOS_THUNDERBIRD_PATH = '/Applications/Thunderbird.app/Contents/MacOS/thunderbird'
+
+# 等待撰写窗口出现（以及macOS上等待发送后窗口关闭）的最长时间（秒），包括Thunderbird未运行时的启动时间
+COMPOSE_WINDOW_TIMEOUT = 30
+
+# AppleScript检查撰写窗口的间隔（秒）
+COMPOSE_POLL_SECONDS = 0.5
+
+# xdotool按窗口标题查找时使用POSIX扩展正则，主题中的这些字符需要转义
+XDOTOOL_REGEX_SPECIAL = re.compile(r'([.^$*+?()\[\]{}|\\])')
+
+
+def default_thunderbird_command():
+    """当前系统上Thunderbird可执行文件的默认路径"""
+    if platform.system() == "Darwin":
+        return MACOS_THUNDERBIRD_PATH
+    return 'thunderbird'
+
+
+def build_compose_url(to_addr, subject, body_text):
+    """生成 -compose 使用的mailto URL，收件人、主题和正文都做百分号编码"""
+    url = 'mailto:' + quote(clean_email_address(to_addr or ''), safe='@')
+    fields = []
+    if subject:
+        fields.append('subject=' + quote(subject, safe=''))
+    if body_text:
+        # 统一换行为CRLF（mailto URL的规范写法）
+        body_text = body_text.replace('\r\n', '\n').replace('\n', '\r\n')
+        fields.append('body=' + quote(body_text, safe=''))
+    if fields:
+        url += '?' + '&'.join(fields)
+    return url
+
+
+def build_compose_command(to_addr, subject, body_text, thunderbird_command=None):
+    """生成打开撰写窗口的命令参数列表（不经过shell，参数不需要再转义）"""
+    return [thunderbird_command or default_thunderbird_command(), '-compose',
+            build_compose_url(to_addr, subject, body_text)]
+
+
+def build_send_applescript(subject, timeout=COMPOSE_WINDOW_TIMEOUT):
+    """生成macOS上发送撰写窗口的AppleScript
+
+    等待标题包含主题的撰写窗口出现后把它放到最前面再按Cmd+Return，然后等待窗口关闭；
+    窗口没有出现或发送后没有关闭时以错误退出（osascript返回非0）。
+    """
+    attempts = max(math.ceil(timeout / COMPOSE_POLL_SECONDS), 1)
+    subject_escaped = escape_applescript_string(subject)
+    return f'''
+        tell application "Thunderbird"
+            activate
+        end tell
+
+        tell application "System Events"
+            -- 等待撰写窗口出现（Thunderbird未运行时需要先启动）
+            set composeWindow to missing value
+            repeat {attempts} times
+                if exists process "Thunderbird" then
+                    tell process "Thunderbird"
+                        repeat with candidateWindow in windows
+                            try
+                                if name of candidateWindow contains {subject_escaped} then
+                                    set composeWindow to contents of candidateWindow
+                                    exit repeat
+                                end if
+                            end try
+                        end repeat
+                    end tell
+                end if
+                if composeWindow is not missing value then exit repeat
+                delay {COMPOSE_POLL_SECONDS}
+            end repeat
+            if composeWindow is missing value then error "撰写窗口没有出现" number 1
+
+            tell process "Thunderbird"
+                set frontmost to true
+                perform action "AXRaise" of composeWindow
+                delay {COMPOSE_POLL_SECONDS}
+                -- 发送邮件 (Cmd+Return)
+                keystroke return using {{command down}}
+
+                -- 发送完成后Thunderbird关闭撰写窗口
+                repeat {attempts} times
+                    if not (exists composeWindow) then return "sent"
+                    delay {COMPOSE_POLL_SECONDS}
+                end repeat
+            end tell
+            error "发送后撰写窗口没有关闭" number 2
+        end tell
+        '''
+
+
+def build_send_xdotool_command(subject):
+    """生成Linux上找到撰写窗口并发送的xdotool命令（按窗口标题中的主题查找）"""
+    pattern = XDOTOOL_REGEX_SPECIAL.sub(r'\\\1', subject or '')
+    return ['xdotool', 'search', '--sync', '--limit', '1', '--name', pattern,
+            'windowactivate', '--sync', 'key', '--clearmodifiers', 'ctrl+Return']
+
+
+class ThunderbirdComposeSender:
+    def __init__(self, thunderbird_command=None, window_timeout=COMPOSE_WINDOW_TIMEOUT, system=None):
+        self.system = system or platform.system()
+        self.thunderbird_command = thunderbird_command or default_thunderbird_command()
+        self.window_timeout = window_timeout
+
+    def can_auto_send(self):
+        """当前系统能否自动完成发送动作"""
+        if self.system == "Darwin":
+            return True
+        return shutil.which('xdotool') is not None
+
+    def open_compose(self, to_addr, subject, body_text):
+        """调用 thunderbird -compose 打开填好内容的撰写窗口
+
+        Thunderbird已在运行时命令把请求交给已有实例后立即退出，未运行时会启动Thunderbird，
+        所以不等待进程结束。
+        """
+        command = build_compose_command(to_addr, subject, body_text, self.thunderbird_command)
+        subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        return command
+
+    def send_compose_window(self, subject):
+        """等待标题包含主题的撰写窗口出现后发送，窗口没有出现时抛出异常"""
+        if self.system == "Darwin":
+            # 脚本自己等待窗口出现和关闭，进程超时只用于防止osascript卡住
+            subprocess.run(['osascript', '-e', build_send_applescript(subject, self.window_timeout)],
+                           capture_output=True, text=True, check=True, timeout=self.window_timeout * 2 + 10)
+        else:
+            subprocess.run(build_send_xdotool_command(subject), capture_output=True, text=True,
+                           check=True, timeout=self.window_timeout)
+
+    def send_email(self, to_addr, subject, body_text, auto_send=True):
+        """打开撰写窗口，auto_send为True时自动发送"""
+        if auto_send and not self.can_auto_send():
+            # 在打开窗口前检查，避免留下撰写窗口后又保存草稿造成重复
+            raise NotImplementedError("自动发送需要macOS或xdotool")
+
+        print(f"{'自动发送' if auto_send else '准备'}邮件（thunderbird -compose）:")
+        print(f"  收件人: {clean_email_address(to_addr or '')}")
+        print(f"  主题: {subject}")
+        self.open_compose(to_addr, subject, body_text)
+        if not auto_send:
+            print("  ⚠️  需要手动点击发送按钮")
+            return True
+
+        try:
+            self.send_compose_window(subject)
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
+            # 不能确认已发送：返回False让调用方不记录为已处理，撰写窗口（如果已打开）留给用户处理
+            print(f"❌ 发送动作执行失败，未确认邮件已发送: {(e.stderr or '').strip() or e}")
+            return False
+        print("✅ 撰写窗口已发送")
+        return True
+
+    def send_reply(self, reply_msg, to_addr, subject, body_text, auto_send=True):
+        """发送回复邮件（发送后端接口）"""
+        return self.send_email(to_addr, subject, body_text, auto_send=auto_send)
+
+
+def test_compose_sender():
+    """测试命令行撰写：只打开撰写窗口，不自动发送"""
+    sender = ThunderbirdComposeSender(sys.argv[1] if len(sys.argv) > 1 else None)
+    to_addr = "luluprod@service-now.com"
+    subject = "Re: RITM1602185 - approve"
+    body_text = "Ref:MSG85395759\n\nEdward Li | China Devops"
+    print("命令:", build_compose_command(to_addr, subject, body_text, sender.thunderbird_command))
+    sender.send_email(to_addr, subject, body_text, auto_send=False)
+
+
+if __name__ == "__main__":
+    test_compose_sender()
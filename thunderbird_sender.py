@@ -7,16 +7,100 @@ Thunderbird邮件发送工具
 """
 
 import os
+import re
 import sys
 import subprocess
 import platform
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 
+# 批量发送时的等待时间（秒）：打开撰写窗口、切换字段、发送后开始下一封之前
+BATCH_WINDOW_DELAY = 2
+BATCH_FIELD_DELAY = 0.5
+BATCH_COMPOSE_DELAY = 2
+
+
+def clean_email_address(to_addr):
+    """清理收件人地址，只保留邮箱地址"""
+    clean_to_addr = to_addr
+    if '<' in to_addr and '>' in to_addr:
+        start = to_addr.find('<') + 1
+        end = to_addr.find('>')
+        clean_to_addr = to_addr[start:end]
+    elif '"' in to_addr:
+        clean_to_addr = to_addr.replace('"', '').strip()
+        if '<' in clean_to_addr and '>' in clean_to_addr:
+            start = clean_to_addr.find('<') + 1
+            end = clean_to_addr.find('>')
+            clean_to_addr = clean_to_addr[start:end]
+    return clean_to_addr
+
+
+def escape_applescript_string(s):
+    """转义为AppleScript字符串字面量（换行等空白合并为单个空格，keystroke无法输入换行）"""
+    if s is None:
+        return '""'
+    # 移除所有换行符、回车符和制表符
+    s = str(s).replace('\n', ' ').replace('\r', ' ').replace('\t', ' ')
+    # 合并多个空格为单个空格
+    s = re.sub(r'\s+', ' ', s).strip()
+    # 转义双引号和反斜杠
+    s = s.replace('\\', '\\\\').replace('"', '\\"')
+    return '"' + s + '"'
+
+
+def build_batch_applescript(replies, auto_send=True, compose_delay=BATCH_COMPOSE_DELAY):
+    """生成一次发送多封邮件的AppleScript
+
+    replies: [(收件人, 主题, 正文)]。Thunderbird只激活一次，每封邮件依次撰写并发送，
+    脚本输出成功发送的封数，出错时输出 "封数:错误信息"。
+    """
+    compose_blocks = []
+    for index, (to_addr, subject, body_text) in enumerate(replies, 1):
+        send_command = f'''
+                    -- 发送邮件 (Cmd+Return)
+                    keystroke return using {{command down}}
+                    delay {compose_delay}''' if auto_send else '''
+                    -- 不自动发送，留待手动发送'''
+        compose_blocks.append(f'''
+                    -- 第{index}封
+                    keystroke "m" using {{command down, shift down}}
+                    delay {BATCH_WINDOW_DELAY}
+                    keystroke {escape_applescript_string(clean_email_address(to_addr))}
+                    delay {BATCH_FIELD_DELAY}
+                    keystroke tab
+                    keystroke tab
+                    delay {BATCH_FIELD_DELAY}
+                    keystroke {escape_applescript_string(subject)}
+                    delay {BATCH_FIELD_DELAY}
+                    keystroke tab
+                    keystroke {escape_applescript_string(body_text)}
+                    delay {BATCH_FIELD_DELAY}{send_command}
+                    set sentCount to sentCount + 1''')
+
+    return f'''
+        tell application "Thunderbird"
+            activate
+            delay 3
+        end tell
+        
+        set sentCount to 0
+        try
+            tell application "System Events"
+                tell process "Thunderbird"{''.join(compose_blocks)}
+                end tell
+            end tell
+        on error errMsg
+            return (sentCount as text) & ":" & errMsg
+        end try
+        return sentCount as text
+        '''
+
 
 class ThunderbirdSender:
-    def __init__(self):
-        self.system = platform.system()
+    def __init__(self, system=None):
+        # system默认为当前系统，测试时可以指定（例如在Linux上生成macOS的AppleScript）
+        self.system = system or platform.system()
         
     def is_thunderbird_running(self):
         """检查Thunderbird是否正在运行"""
@@ -141,30 +225,7 @@ class ThunderbirdSender:
             time.sleep(3)
         
         # 清理收件人地址
-        clean_to_addr = to_addr
-        if '<' in to_addr and '>' in to_addr:
-            start = to_addr.find('<') + 1
-            end = to_addr.find('>')
-            clean_to_addr = to_addr[start:end]
-        elif '"' in to_addr:
-            clean_to_addr = to_addr.replace('"', '').strip()
-            if '<' in clean_to_addr and '>' in clean_to_addr:
-                start = clean_to_addr.find('<') + 1
-                end = clean_to_addr.find('>')
-                clean_to_addr = clean_to_addr[start:end]
-        
-        # 转义AppleScript字符串 - 修复版本
-        def escape_applescript_string(s):
-            if s is None:
-                return '""'
-            # 移除所有换行符、回车符和制表符
-            s = str(s).replace('\n', ' ').replace('\r', ' ').replace('\t', ' ')
-            # 合并多个空格为单个空格
-            import re
-            s = re.sub(r'\s+', ' ', s).strip()
-            # 转义双引号和反斜杠
-            s = s.replace('\\', '\\\\').replace('"', '\\"')
-            return '"' + s + '"'
+        clean_to_addr = clean_email_address(to_addr)
         
         to_escaped = escape_applescript_string(clean_to_addr)
         subject_escaped = escape_applescript_string(subject)
@@ -238,6 +299,47 @@ class ThunderbirdSender:
             print(f"❌ AppleScript执行失败: {e.stderr}")
             raise Exception(f"AppleScript执行失败: {e.stderr}")
     
+    def send_emails_batch(self, replies, auto_send=True, compose_delay=BATCH_COMPOSE_DELAY):
+        """在一次osascript中依次发送多封邮件，返回成功发送的封数
+        
+        replies: [(收件人, 主题, 正文)]，按顺序发送，出错时前面返回数量的邮件已经发送。
+        """
+        if self.system != "Darwin":
+            raise NotImplementedError("AppleScript只支持macOS")
+        if not replies:
+            return 0
+        
+        # 确保Thunderbird正在运行
+        if not self.is_thunderbird_running():
+            if not self.launch_thunderbird():
+                raise Exception("无法启动Thunderbird")
+            import time
+            time.sleep(3)
+        
+        applescript = build_batch_applescript(replies, auto_send=auto_send, compose_delay=compose_delay)
+        print(f"{'自动发送' if auto_send else '准备'} {len(replies)} 封邮件（单次AppleScript）")
+        
+        try:
+            result = subprocess.run(
+                ['osascript', '-e', applescript],
+                capture_output=True, text=True, check=True
+            )
+        except subprocess.CalledProcessError as e:
+            print(f"❌ AppleScript执行失败: {e.stderr}")
+            raise Exception(f"AppleScript执行失败: {e.stderr}")
+        
+        count, _, error = result.stdout.strip().partition(':')
+        sent_count = int(count) if count.isdigit() else 0
+        if error:
+            print(f"❌ 第{sent_count + 1}封邮件发送失败: {error}")
+        else:
+            print(f"✅ AppleScript执行成功，发送 {sent_count} 封")
+        return sent_count
+    
+    def send_reply(self, reply_msg, to_addr, subject, body_text, auto_send=True):
+        """发送回复邮件（发送后端接口）"""
+        return self.send_email_via_applescript_with_confirmation(to_addr, subject, body_text, auto_send=auto_send)
+    
     def create_draft_file(self, to_addr, subject, body_text, body_html=None, filename=None):
         """创建邮件草稿文件"""
         if not filename: